@@ -0,0 +1,182 @@
+import argparse
+import concurrent.futures
+import csv
+import glob
+import json
+
+from sat import *
+
+# Columns of the rows written to RESULTS, times are in seconds. "iterations" are the iterations of the cycle
+# breaker, 3D+4D calls the solver twice in the iteration in which 3D is proven unsatisfiable.
+BATCH_COLUMNS = ["instance", "theory", "width", "height", "num of paths", "num of variables", "num of clauses",
+                 "sat calls", "iterations", "solvable", "time of run", "sat real time", "generate", "load", "solve", "decode",
+                 "cycle_detect", "error"]
+
+# Formats of the results file.
+BATCH_FORMATS = ["jsonl", "csv"]
+
+
+def find_instances(instances) -> list:
+    """
+    Expands directories and glob patterns to the list of instance files.
+    :param instances: directory, glob pattern, file or a list of them
+    :return: sorted list of paths to the instance files
+    """
+    if isinstance(instances, str):
+        instances = [instances]
+
+    paths = set()
+    for pattern in instances:
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.txt")
+        paths.update(glob.glob(pattern))
+    return sorted(paths)
+
+
+def solve_instance(glucose_executable_path: str, instance_path: str, theory_name: str, options: dict) -> dict:
+    """
+    Solves one instance of the batch, runs in a worker process.
+    :param glucose_executable_path: the path to the executable of the SAT solver
+    :param instance_path: the path to the instance file
+    :param theory_name: the name of the theory to be used
+    :param options: keyword arguments of run_sat
+    :return: row of the results with BATCH_COLUMNS
+    """
+    row = dict.fromkeys(BATCH_COLUMNS)
+    row.update({"instance": instance_path, "theory": theory_name})
+
+    start = time.perf_counter()
+    try:
+        board, instance_result, model, sat_output = run_sat(glucose_executable_path, instance_path, theory_name,
+                                                            **options)
+    # NumberlinkBoard.exit() ends an invalid instance by SystemExit, which must not stop the whole batch
+    except (Exception, SystemExit) as e:
+        row.update({"time of run": time.perf_counter() - start, "error": repr(e)})
+        return row
+
+    row.update({"width": board.width, "height": board.height, "num of paths": board.number_of_paths,
+                "num of variables": len(board.variables), "num of clauses": len(board.clauses),
+                "sat calls": board.sat_calls, "iterations": board.trace.iteration,
+                "solvable": solvable_mark(instance_result),
+                "time of run": time.perf_counter() - start, "sat real time": float(board.sat_real_time)})
+    row.update(board.timings)
+    return row
+
+
+def read_results(results_path: str) -> list:
+    """
+    Reads rows of the results file, an unfinished last line of interrupted batch is skipped.
+    :param results_path: path to .jsonl or .csv file
+    :return: list of rows
+    """
+    if not os.path.exists(results_path):
+        return []
+
+    with open(results_path, "r", encoding="utf-8", newline="") as file:
+        if results_path.endswith(".csv"):
+            return [row for row in csv.DictReader(file) if None not in row.values()]
+
+        rows = []
+        for line in file:
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return rows
+
+
+def run_batch(glucose_executable_path: str, instances, theory_name: str = "3D+4D", workers: int = None,
+              results_name: str = "batch", output_format: str = "jsonl", resume: bool = True,
+              results_dir: str = "RESULTS", _echo: bool = False, **options) -> str:
+    """
+    Solves all instances in a pool of worker processes and writes one row per instance to the results file
+    in RESULTS as soon as the instance is solved. An interrupted batch is resumed - instances already in
+    the results file are skipped.
+    :param glucose_executable_path: the path to the executable of the SAT solver
+    :param instances: directory, glob pattern, file or a list of them
+    :param theory_name: the name of the theory to be used
+    :param workers: number of worker processes, number of CPUs by default
+    :param results_name: name of the results file without extension
+    :param output_format: one of BATCH_FORMATS
+    :param resume: whether to skip instances already in the results file, otherwise the file is overwritten
+    :param results_dir: directory of the results file
+    :param options: other keyword arguments of run_sat, e.g. cardinality or solver. The CNF files are saved
+    to CnfCache() by default - instances with the same file name in different directories get different files.
+    Simplified clauses cannot be cached, they are written to the standard input of glucose.
+    :return: path to the results file
+    """
+    if output_format not in BATCH_FORMATS:
+        raise ValueError(f"Unknown output format: {output_format}")
+
+    if options.get("simplify") or options.get("pipe"):
+        options["pipe"] = True
+    elif options.get("cache") is None:
+        options["cache"] = CnfCache()
+
+    os.makedirs(results_dir, exist_ok=True)
+    results_path = os.path.join(results_dir, f"{results_name}.{output_format}")
+
+    if not resume and os.path.exists(results_path):
+        os.remove(results_path)
+
+    # instances which failed with an error are solved again
+    done = {(os.path.abspath(row["instance"]), row["theory"]) for row in read_results(results_path)
+            if not row["error"]}
+    instance_paths = [path for path in find_instances(instances) if (os.path.abspath(path), theory_name) not in done]
+    if _echo: print(f"Batch: {len(instance_paths)} instances to solve, {len(done)} already solved.")
+
+    write_header = not os.path.exists(results_path) or os.path.getsize(results_path) == 0
+    with open(results_path, "a", encoding="utf-8", newline="") as file:
+        writer = csv.DictWriter(file, BATCH_COLUMNS) if output_format == "csv" else None
+        if writer is not None and write_header:
+            writer.writeheader()
+
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(solve_instance, glucose_executable_path, path, theory_name, options)
+                       for path in instance_paths]
+
+            for future in concurrent.futures.as_completed(futures):
+                row = future.result()
+                if writer is not None:
+                    writer.writerow(row)
+                else:
+                    file.write(json.dumps(row) + "\n")
+                file.flush()
+                if _echo: print(f"Batch: {row['instance']} solvable = {row['solvable']} [{row['time of run']:.4f} s]")
+
+    return results_path
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Solves all Numberlink instances of a directory or glob pattern.")
+    parser.add_argument("instances", nargs="+", help="directories, glob patterns or instance files")
+    parser.add_argument("--glucose", default="/root/glucose2/glucose/parallel/glucose-syrup",
+                        help="path to the glucose executable")
+    parser.add_argument("--theory", default="3D+4D", help="3D, 4D, 3D+4D or acyclic")
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--name", default="batch", help="name of the results file in RESULTS")
+    parser.add_argument("--format", default="jsonl", choices=BATCH_FORMATS)
+    parser.add_argument("--no-resume", action="store_true", help="overwrite the results file")
+    parser.add_argument("--cardinality", default="pairwise", choices=CARDINALITY_ENCODINGS)
+    parser.add_argument("--solver", default="glucose", choices=SOLVER_BACKENDS)
+    parser.add_argument("--timeout", type=float, default=None, help="wall-clock budget of one solver call in seconds")
+    parser.add_argument("--total-timeout", type=float, default=None, help="wall-clock budget of one instance in seconds")
+    parser.add_argument("--cpu-limit", type=float, default=None, help="CPU time budget of one call of glucose in seconds")
+    parser.add_argument("--memory-limit", type=int, default=None, help="memory budget of glucose in MB")
+    parser.add_argument("--simplify", action="store_true", help="simplify the clauses before solving")
+    parser.add_argument("--prune", action="store_true", help="restrict the variables to the cells the paths can reach")
+    parser.add_argument("--forced-moves", action="store_true", help="fix the forced moves before the encoding")
+    parser.add_argument("--cnf-format", default="dimacs", choices=list(CNF_EXTENSIONS),
+                        help="format of the CNF files - plain DIMACS, gzip-compressed DIMACS or binary")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="keep duplicate clauses, saves the memory of remembering the stored clauses")
+    args = parser.parse_args()
+
+    memory_limit = args.memory_limit * 1024 ** 2 if args.memory_limit is not None else None
+    path = run_batch(args.glucose, args.instances, args.theory, args.workers, args.name, args.format,
+                     not args.no_resume, _echo=True, cardinality=args.cardinality, solver=args.solver,
+                     timeout=args.timeout, total_timeout=args.total_timeout, cpu_limit=args.cpu_limit,
+                     memory_limit=memory_limit, simplify=args.simplify, prune=args.prune,
+                     forced_moves=args.forced_moves, cnf_format=args.cnf_format,
+                     deduplicate=False if args.no_dedup else None)
+    print(f"Results saved to {path}")
@@ -0,0 +1,282 @@
+import argparse
+import json
+import platform
+import sys
+
+from sat import *
+from generator import generate_instance, parse_size
+
+# Theories compared by compare_theories(), "4D" breaks the cycles iteratively, "acyclic" in the CNF itself.
+BENCHMARK_THEORIES = ["4D", "acyclic"]
+
+# Measured phases in the order of the pipeline, times are in seconds.
+BENCHMARK_PHASES = ["parse", "variables", "clauses", "dimacs", "solve", "decode", "render", "cycle_detect"]
+
+# Methods generating the variables and the clauses of the theories.
+THEORY_GENERATORS = {
+    "3D": ("generate_all_clauses_3D", "generate_clausess_3D"),
+    "4D": ("generate_all_clauses_4D", "generate_clauses_4D"),
+    "acyclic": ("generate_all_clauses_acyclic", "generate_clauses_acyclic"),
+}
+
+# A phase is a regression when it is slower than the baseline by more than the tolerance and this many seconds,
+# so that the noise of very short phases is ignored.
+REGRESSION_MIN_SECONDS = 0.01
+
+
+def compare_theories(glucose_executable_path: str, instance_paths: list, theory_names: list = BENCHMARK_THEORIES,
+                     solver: str = "glucose") -> list:
+    """
+    Solves every instance with every theory and prints markdown table with the number of SAT solver calls
+    and the time of the whole run including the cycle breaker iterations.
+    :param glucose_executable_path: the path to the executable of the SAT solver
+    :param instance_paths: paths to the instance files
+    :param theory_names: theories to compare
+    :param solver: the solver backend, one of SOLVER_BACKENDS
+    :return: list of rows [instance, theory, solvable, sat calls, num of variables, num of clauses, time of run]
+    """
+
+    rows = []
+    for instance_path in instance_paths:
+        for theory_name in theory_names:
+            start = time.perf_counter()
+            board, instance_result, model, sat_output = run_sat(glucose_executable_path, instance_path, theory_name,
+                                                                solver=solver)
+            time_of_run = time.perf_counter() - start
+            rows.append([instance_path.split("/")[-1], theory_name, solvable_mark(instance_result),
+                         board.sat_calls, len(board.variables), len(board.clauses), time_of_run])
+
+    columns = ["used instance", "theory", "solvable", "sat calls", "num of variables", "num of clauses",
+               "time of run [s]"]
+    print(f"solver = {solver}")
+    print("| " + " | ".join(columns) + " |")
+    print("| " + " | ".join(["---"] * len(columns)) + " |")
+    for row in rows:
+        print("| " + " | ".join(map(str, row[:-1] + [f"{row[-1]:.4f}"])) + " |")
+
+    return rows
+
+
+def synthetic_instance(height: int, width: int, directory: str) -> str:
+    """
+    Writes solvable synthetic instance - every row is one path from its first to its last cell.
+    :param height: number of rows = number of paths
+    :param width: number of columns, at least 2
+    :param directory: directory of the instance file
+    :return: path to the instance file
+    """
+    os.makedirs(directory, exist_ok=True)
+    instance_path = os.path.join(directory, f"synthetic_{height}x{width}.txt")
+    with open(instance_path, "w", encoding="utf-8") as file:
+        for i in range(1, height + 1):
+            file.write(",".join([str(i)] + ["."] * (width - 2) + [str(i)]) + "\n")
+    return instance_path
+
+
+def benchmark_instance(glucose_executable_path: str, instance_path: str, theory_name: str, fake_solver: bool = False,
+                       cardinality: str = "pairwise", solver: str = "glucose") -> dict:
+    """
+    Runs the pipeline once with every phase measured separately, cycles are detected but not broken.
+    :param glucose_executable_path: the path to the executable of the SAT solver
+    :param instance_path: the path to the instance file
+    :param theory_name: "3D", "4D" or "acyclic"
+    :param fake_solver: skip the solver and the phases after it, measures only the encoder
+    :param cardinality: the encoding of the cardinality constraints, one of CARDINALITY_ENCODINGS
+    :param solver: the solver backend, one of SOLVER_BACKENDS
+    :return: row with the board info and the time of every phase of BENCHMARK_PHASES
+    """
+    all_clauses, clauses = THEORY_GENERATORS[theory_name]
+    times = dict.fromkeys(BENCHMARK_PHASES, 0.0)
+
+    start = time.perf_counter()
+    board = NumberlinkBoard(instance_path)
+    board.theory = theory_name
+    board.cardinality_encoding = cardinality
+    times["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    getattr(board, all_clauses)()
+    times["variables"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    getattr(board, clauses)()
+    times["clauses"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    board.save_to_dimacs(instance_path)
+    times["dimacs"] = time.perf_counter() - start
+
+    instance_result = None
+    if not fake_solver:
+        backend = create_backend(solver, glucose_executable_path)
+        start = time.perf_counter()
+        backend.load(board, instance_path)
+        instance_result, model, sat_output = backend.solve()
+        times["solve"] = time.perf_counter() - start
+        backend.close()
+        board.sat_real_time = retrieve_real_time(sat_output)
+
+        if instance_result == 1:
+            start = time.perf_counter()
+            board.get_true_variables(model)
+            board.retrieve_paths_from_models(model)
+            times["decode"] = time.perf_counter() - start
+
+            # the boards are rendered lazily when they are first used
+            start = time.perf_counter()
+            board.solution.numbered_board
+            board.solution.direction_board_string
+            times["render"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            cycle_detect(board)
+            times["cycle_detect"] = time.perf_counter() - start
+
+    row = {"instance": instance_path.split("/")[-1], "theory": theory_name, "width": board.width,
+           "height": board.height, "num of paths": board.number_of_paths, "num of variables": len(board.variables),
+           "num of clauses": len(board.clauses), "sat real time": float(board.sat_real_time),
+           "solvable": "-" if instance_result is None else solvable_mark(instance_result)}
+    row.update(times)
+    row["time of run"] = sum(times.values())
+    return row
+
+
+def run_benchmark(glucose_executable_path: str, instance_paths: list, theory_names: list = ("3D", "4D"),
+                  repeat: int = 1, fake_solver: bool = False, **options) -> list:
+    """
+    Benchmarks every instance with every theory, the minimum of the repeated runs is used for every phase.
+    :param glucose_executable_path: the path to the executable of the SAT solver
+    :param instance_paths: paths to the instance files
+    :param theory_names: theories to benchmark
+    :param repeat: number of runs of every instance
+    :param fake_solver: skip the solver and the phases after it
+    :param options: cardinality or solver passed to benchmark_instance
+    :return: list of rows
+    """
+    rows = []
+    for instance_path in instance_paths:
+        for theory_name in theory_names:
+            runs = [benchmark_instance(glucose_executable_path, instance_path, theory_name, fake_solver, **options)
+                    for _ in range(repeat)]
+            row = runs[0]
+            for phase in BENCHMARK_PHASES + ["time of run", "sat real time"]:
+                row[phase] = min(run[phase] for run in runs)
+            rows.append(row)
+    return rows
+
+
+def save_baseline(rows: list, baseline_path: str):
+    """
+    Saves the benchmark results as baseline for check_regressions.
+    :param rows: rows of run_benchmark
+    :param baseline_path: path to the .json file
+    :return:
+    """
+    baseline = {"platform": platform.platform(), "processor": platform.processor(), "cpus": os.cpu_count(),
+                "results": {f"{row['instance']}|{row['theory']}": row for row in rows}}
+    with open(baseline_path, "w", encoding="utf-8") as file:
+        json.dump(baseline, file, indent=2)
+
+
+def check_regressions(rows: list, baseline: dict, tolerance: float = 0.25) -> list:
+    """
+    Compares the benchmark results with the baseline.
+    :param rows: rows of run_benchmark
+    :param baseline: loaded baseline file
+    :param tolerance: allowed relative slowdown of a phase, 0.25 = 25 %
+    :return: list of (instance, theory, phase, baseline time, time) of the phases slower than allowed
+    """
+    regressions = []
+    for row in rows:
+        reference = baseline["results"].get(f"{row['instance']}|{row['theory']}")
+        if reference is None:
+            continue
+        for phase in BENCHMARK_PHASES:
+            if row[phase] > reference[phase] * (1 + tolerance) and row[phase] - reference[phase] > REGRESSION_MIN_SECONDS:
+                regressions.append((row["instance"], row["theory"], phase, reference[phase], row[phase]))
+    return regressions
+
+
+def print_benchmark_table(rows: list):
+    """
+    Prints the rows as the tables in README, one table for every theory sorted by the number of clauses,
+    followed by the table of the phases.
+    :param rows: rows of run_benchmark
+    :return: None
+    """
+    print(f"HW = {platform.processor() or platform.machine()} | {os.cpu_count()} CPUs | {platform.platform()}")
+    columns = ["width", "height", "num of paths", "sat real time [s]", "time of run [s]", "num of variables",
+               "num of clauses", "encoding", "solvable", "used instance", "clauses per second"]
+    for theory_name in dict.fromkeys(row["theory"] for row in rows):
+        print()
+        print(f"### Zakódování {THEORY_NUMBERS[theory_name]}")
+        print()
+        print("| " + " | ".join(columns) + " |")
+        print("| " + " | ".join(["---"] * len(columns)) + " |")
+        for row in sorted((row for row in rows if row["theory"] == theory_name), key=lambda row: row["num of clauses"]):
+            values = [row["width"], row["height"], row["num of paths"], f"{row['sat real time']:.4f}",
+                      f"{row['time of run']:.4f}", row["num of variables"], row["num of clauses"],
+                      THEORY_NUMBERS[theory_name], row["solvable"], row["instance"],
+                      f"{row['num of clauses'] / row['time of run']:.3f}"]
+            print("| " + " | ".join(map(str, values)) + " |")
+
+    print()
+    columns = ["used instance", "theory"] + BENCHMARK_PHASES
+    print("| " + " | ".join(columns) + " |")
+    print("| " + " | ".join(["---"] * len(columns)) + " |")
+    for row in rows:
+        print("| " + " | ".join([row["instance"], row["theory"]] + [f"{row[phase]:.4f}" for phase in BENCHMARK_PHASES])
+              + " |")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmarks the phases of the solver on the instances.")
+    parser.add_argument("instances", nargs="*", default=["instances/instance_4.txt", "instances/instance_5.txt",
+                                                         "instances/instance_1.txt", "instances/instance_11.txt",
+                                                         "instances/instance_14.txt"])
+    parser.add_argument("--glucose", default="/root/glucose2/glucose/parallel/glucose-syrup",
+                        help="path to the glucose executable")
+    parser.add_argument("--theories", nargs="+", default=["3D", "4D"], choices=list(THEORY_GENERATORS))
+    parser.add_argument("--sweep", nargs="*", type=int, default=[],
+                        help="sizes n of synthetic n x n instances added to the instances")
+    parser.add_argument("--random", nargs="*", default=[],
+                        help="random solvable instances HEIGHTxWIDTH:PATHS added to the instances, see generator.py")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the random instances")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--fake-solver", action="store_true", help="benchmark only the encoder, without glucose")
+    parser.add_argument("--cardinality", default="pairwise", choices=CARDINALITY_ENCODINGS)
+    parser.add_argument("--solver", default="glucose", choices=SOLVER_BACKENDS)
+    parser.add_argument("--baseline", default="RESULTS/benchmark_baseline.json")
+    parser.add_argument("--save-baseline", action="store_true", help="save the results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown of a phase")
+    parser.add_argument("--compare", action="store_true",
+                        help="compare the iterative cycle breaker with the acyclic theory instead")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare_theories(args.glucose, args.instances, solver=args.solver)
+        sys.exit(0)
+
+    instance_paths = list(args.instances)
+    instance_paths += [synthetic_instance(n, n, "RESULTS/synthetic") for n in args.sweep]
+    os.makedirs("RESULTS/random", exist_ok=True)
+    for spec in args.random:
+        size, _, paths = spec.partition(":")
+        instance_paths.append(generate_instance("RESULTS/random", *parse_size(size), int(paths), 0, args.seed))
+
+    rows = run_benchmark(args.glucose, instance_paths, args.theories, args.repeat, args.fake_solver,
+                         cardinality=args.cardinality, solver=args.solver)
+    print_benchmark_table(rows)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        save_baseline(rows, args.baseline)
+        print(f"Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            regressions = check_regressions(rows, json.load(file), args.tolerance)
+        for instance, theory, phase, reference, current in regressions:
+            print(f"REGRESSION {instance} {theory} {phase}: {reference:.4f} s -> {current:.4f} s")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline} (tolerance {args.tolerance:.0%}).")
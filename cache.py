@@ -0,0 +1,123 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from dimacs import CNF_EXTENSIONS
+
+# Must be increased by every change of the clauses generated for the same key - their order, the encoding,
+# the removal of redundant clauses or the format of the file - so that files cached by older versions are not used.
+# 2: vectorized clause generation and its order, duplicates of streamed clauses kept.
+ENCODING_VERSION = 2
+
+
+class CnfCache:
+    """
+    Cache of generated CNF files addressed by a hash of everything the clauses depend on -
+    the board, the theory, the encoding options and the extra clauses eliminating cycles.
+    Two instances with the same file name never share a file and an instance encoded again is not regenerated.
+    Least recently used files are evicted when the size of the cache directory exceeds max_bytes.
+    """
+
+    def __init__(self, directory: str = "CNFS/cache", max_bytes: int = 1 << 30):
+        """
+        :param directory: directory with the cached CNF files, every CNF file in it (any of CNF_EXTENSIONS) is
+        a cache entry
+        :param max_bytes: disk budget of the cache directory
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, board, theory: str, cardinality: str, deduplicate: bool, extra_clauses: list,
+            prune: bool = False, forced_moves: bool = False) -> str:
+        """
+        Returns hash of everything the clauses of the board depend on.
+        :param board: NumberlinkBoard loaded from the instance file
+        :param theory: theory of the board - "3D", "4D" or "acyclic"
+        :param cardinality: the encoding of the cardinality constraints
+        :param deduplicate: whether duplicate clauses are removed
+        :param extra_clauses: cycles eliminated by extra clauses, the order of cycles and their cells does not matter
+        :param prune: whether the variables are restricted to the path domains
+        :param forced_moves: whether the forced moves are fixed
+        :return: hexadecimal hash
+        """
+        content = {
+            "version": ENCODING_VERSION,
+            "board": board.board,
+            "theory": theory,
+            "cardinality": cardinality,
+            "deduplicate": deduplicate,
+            "cycles": sorted(sorted(set(map(tuple, np.asarray(cycle).tolist()))) for cycle in extra_clauses),
+        }
+        # keys of the CNF files cached before pruning was added stay the same
+        if prune or forced_moves:
+            content["prune"] = True
+        if forced_moves:
+            content["forced_moves"] = True
+        return hashlib.sha256(json.dumps(content).encode("utf-8")).hexdigest()[:24]
+
+    def lookup(self, filename: str) -> bool:
+        """
+        Checks whether the CNF file is cached and marks it as recently used.
+        :param filename: path to the CNF file of the cache entry
+        :return: True on cache hit
+        """
+        if os.path.exists(filename):
+            os.utime(filename)
+            self.hits += 1
+            return True
+        self.misses += 1
+        return False
+
+    def store(self, filename: str):
+        """
+        Registers newly generated CNF file and evicts least recently used files over the disk budget.
+        :param filename: path to the CNF file of the cache entry
+        :return:
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry[1])
+        size = sum(entry[2] for entry in entries)
+        for path, _, entry_size in entries:
+            if size <= self.max_bytes:
+                break
+            if os.path.abspath(path) == os.path.abspath(filename):
+                continue
+            os.remove(path)
+            size -= entry_size
+            self.evictions += 1
+
+    def entries(self) -> list:
+        """
+        :return: list of (path, time of last use, size in bytes) of all cached files
+        """
+        entries = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and entry.name.endswith(tuple(CNF_EXTENSIONS.values())):
+                stat = entry.stat()
+                entries.append((entry.path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            os.remove(path)
+
+    @property
+    def statistics(self) -> dict:
+        """
+        :return: hits, misses, evictions, hit rate, number of cached files and their size in bytes
+        """
+        entries = self.entries()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(entries),
+            "bytes": sum(entry[2] for entry in entries),
+        }
@@ -0,0 +1,202 @@
+import itertools
+import math
+
+# Names of the cardinality encodings, pairwise is the original encoding without auxiliary variables.
+CARDINALITY_ENCODINGS = ["pairwise", "sequential", "commander", "product"]
+
+# Below this number of literals the pairwise encoding is never larger than the auxiliary ones.
+PAIRWISE_LIMIT = 5
+
+
+def _conditional(clauses, condition):
+    """
+    Prepends negated condition to every clause, i.e. the clauses only apply when the condition is true.
+    :param clauses: iterable of clauses
+    :param condition: literal or None
+    :return: generator of clauses
+    """
+    if condition is None:
+        yield from clauses
+    else:
+        for clause in clauses:
+            yield [-condition] + clause
+
+
+def at_least_one(literals, condition=None):
+    """
+    At least one literal is true.
+    :param literals: list of literals
+    :param condition: literal, the constraint applies only when it is true
+    :return: generator of clauses
+    """
+    yield from _conditional([list(literals)], condition)
+
+
+def at_most_one(literals, variables, encoding="pairwise", condition=None):
+    """
+    At most one literal is true.
+    :param literals: list of literals
+    :param variables: variable layout used for allocating auxiliary variables
+    :param encoding: one of CARDINALITY_ENCODINGS
+    :param condition: literal, the constraint applies only when it is true
+    :return: generator of clauses
+    """
+    literals = list(literals)
+    if encoding not in CARDINALITY_ENCODINGS:
+        raise ValueError(f"Unknown cardinality encoding: {encoding}")
+
+    if encoding == "pairwise" or len(literals) <= PAIRWISE_LIMIT:
+        clauses = _pairwise(literals)
+    elif encoding == "sequential":
+        clauses = _sequential_counter(literals, 1, variables)
+    elif encoding == "commander":
+        clauses = _commander(literals, variables)
+    else:
+        clauses = _product(literals, variables)
+
+    yield from _conditional(clauses, condition)
+
+
+def exactly_one(literals, variables, encoding="pairwise", condition=None):
+    """
+    Exactly one literal is true.
+    :param literals: list of literals
+    :param variables: variable layout used for allocating auxiliary variables
+    :param encoding: one of CARDINALITY_ENCODINGS
+    :param condition: literal, the constraint applies only when it is true
+    :return: generator of clauses
+    """
+    literals = list(literals)
+    yield from at_least_one(literals, condition)
+    yield from at_most_one(literals, variables, encoding, condition)
+
+
+def at_most_k(literals, k, variables, encoding="pairwise", condition=None):
+    """
+    At most k literals are true. Commander and product encodings are defined only for k = 1,
+    for larger k they fall back to the sequential counter.
+    :param literals: list of literals
+    :param k:
+    :param variables: variable layout used for allocating auxiliary variables
+    :param encoding: one of CARDINALITY_ENCODINGS
+    :param condition: literal, the constraint applies only when it is true
+    :return: generator of clauses
+    """
+    literals = list(literals)
+    if k == 1:
+        yield from at_most_one(literals, variables, encoding, condition)
+        return
+    if encoding not in CARDINALITY_ENCODINGS:
+        raise ValueError(f"Unknown cardinality encoding: {encoding}")
+    if len(literals) <= k:
+        return
+
+    if encoding == "pairwise" or len(literals) <= k + PAIRWISE_LIMIT - 1:
+        # every k + 1 literals contain a false one
+        clauses = ([-literal for literal in subset] for subset in itertools.combinations(literals, k + 1))
+    else:
+        clauses = _sequential_counter(literals, k, variables)
+
+    yield from _conditional(clauses, condition)
+
+
+def at_least_k(literals, k, variables, encoding="pairwise", condition=None):
+    """
+    At least k literals are true, encoded as at most len(literals) - k negated literals.
+    :param literals: list of literals
+    :param k:
+    :param variables: variable layout used for allocating auxiliary variables
+    :param encoding: one of CARDINALITY_ENCODINGS
+    :param condition: literal, the constraint applies only when it is true
+    :return: generator of clauses
+    """
+    literals = list(literals)
+    if k <= 0:
+        return
+    if k > len(literals):
+        yield from _conditional([[]], condition)
+        return
+    if k == 1:
+        yield from at_least_one(literals, condition)
+        return
+
+    if encoding == "pairwise" or len(literals) <= k + PAIRWISE_LIMIT - 1:
+        # every len - k + 1 literals contain a true one
+        clauses = (list(subset) for subset in itertools.combinations(literals, len(literals) - k + 1))
+        yield from _conditional(clauses, condition)
+    else:
+        yield from at_most_k([-literal for literal in literals], len(literals) - k, variables, encoding, condition)
+
+
+def _pairwise(literals):
+    for l1, l2 in itertools.combinations(literals, 2):
+        yield [-l1, -l2]
+
+
+def _sequential_counter(literals, k, variables):
+    """
+    Sequential counter of Sinz (2005), auxiliary variable s[i][j] means that at least j + 1 of the first i + 1
+    literals are true. Uses (n - 1) * k auxiliary variables and O(n * k) clauses.
+    """
+    n = len(literals)
+    first = variables.new_variables((n - 1) * k)
+    s = [[first + i * k + j for j in range(k)] for i in range(n - 1)]
+
+    yield [-literals[0], s[0][0]]
+    for j in range(1, k):
+        yield [-s[0][j]]
+
+    for i in range(1, n - 1):
+        yield [-literals[i], s[i][0]]
+        yield [-s[i - 1][0], s[i][0]]
+        for j in range(1, k):
+            yield [-literals[i], -s[i - 1][j - 1], s[i][j]]
+            yield [-s[i - 1][j], s[i][j]]
+        yield [-literals[i], -s[i - 1][k - 1]]
+
+    yield [-literals[n - 1], -s[n - 2][k - 1]]
+
+
+def _commander(literals, variables, group_size=3):
+    """
+    Commander encoding of Klieber and Kwon (2007). Literals are split into groups with one commander variable,
+    at most one literal per group is true and every true literal implies its commander.
+    The commanders are then constrained recursively.
+    """
+    if len(literals) <= PAIRWISE_LIMIT:
+        yield from _pairwise(literals)
+        return
+
+    commanders = []
+    for start in range(0, len(literals), group_size):
+        group = literals[start:start + group_size]
+        commander = variables.new_variables(1)
+        commanders.append(commander)
+        yield from _pairwise(group)
+        for literal in group:
+            yield [-literal, commander]
+
+    yield from _commander(commanders, variables, group_size)
+
+
+def _product(literals, variables):
+    """
+    Product encoding of Chen (2010). Literals are placed into a grid with one variable for every row and column,
+    a true literal implies its row and column and at most one row and one column are true.
+    """
+    if len(literals) <= PAIRWISE_LIMIT:
+        yield from _pairwise(literals)
+        return
+
+    rows = math.ceil(math.sqrt(len(literals)))
+    columns = math.ceil(len(literals) / rows)
+    first_row = variables.new_variables(rows)
+    first_column = variables.new_variables(columns)
+
+    for index, literal in enumerate(literals):
+        row, column = divmod(index, columns)
+        yield [-literal, first_row + row]
+        yield [-literal, first_column + column]
+
+    yield from _product(list(range(first_row, first_row + rows)), variables)
+    yield from _product(list(range(first_column, first_column + columns)), variables)
@@ -0,0 +1,379 @@
+import os
+from array import array
+
+import numpy as np
+
+from dimacs import DimacsWriter, dimacs_chunks, format_clauses
+
+
+# First bytes of the binary CNF format, followed by the numbers of variables, clauses and literals as int64.
+BINARY_MAGIC = b"NLCNFB01"
+BINARY_HEADER_SIZE = len(BINARY_MAGIC) + 3 * 8
+
+
+class ClauseBuffer:
+    """
+    Compact container of clauses - the literals of all clauses in one flat array of 32-bit integers and
+    the index after the last literal of every clause. A clause costs 4 bytes per literal and 8 bytes
+    for its end instead of a Python list of Python ints. Clauses are returned as lists of ints.
+    A buffer loaded by load_binary is backed by read-only memory-mapped arrays, which are copied to memory
+    before the first modification.
+    """
+
+    def __init__(self, clauses=()):
+        """
+        :param clauses: iterable of clauses stored first
+        """
+        self.literals = array("i")
+        self.ends = array("q")
+        # number of variables in the header of a loaded binary file
+        self.num_variables = None
+        self.extend(clauses)
+
+    def _make_growable(self):
+        if isinstance(self.literals, np.ndarray):
+            self.literals = array("i", self.literals.tobytes())
+            self.ends = array("q", self.ends.tobytes())
+
+    def append(self, clause):
+        """
+        :param clause: iterable of literals
+        :return:
+        """
+        self._make_growable()
+        self.literals.extend(clause)
+        self.ends.append(len(self.literals))
+
+    def extend(self, clauses):
+        """
+        :param clauses: iterable of clauses
+        :return:
+        """
+        for clause in clauses:
+            self.append(clause)
+
+    def extend_array(self, clauses: np.ndarray):
+        """
+        Stores the rows of the integer array as clauses without converting them to Python objects.
+        :param clauses: array [number of clauses, literals] without zeros
+        :return:
+        """
+        self._make_growable()
+        start = len(self.literals)
+        self.literals.frombytes(np.ascontiguousarray(clauses, dtype=np.int32).tobytes())
+        ends = start + np.arange(1, len(clauses) + 1, dtype=np.int64) * clauses.shape[1]
+        self.ends.frombytes(ends.tobytes())
+
+    def arrays(self) -> tuple:
+        """
+        Views of the buffer without copying. The buffer cannot grow while a view exists.
+        :return: array of the literals, array of the ends of the clauses
+        """
+        if isinstance(self.literals, np.ndarray):
+            return self.literals, self.ends
+        return (np.frombuffer(self.literals, dtype=np.int32) if self.literals else np.zeros(0, dtype=np.int32),
+                np.frombuffer(self.ends, dtype=np.int64) if self.ends else np.zeros(0, dtype=np.int64))
+
+    def filter(self, keep: np.ndarray):
+        """
+        Keeps only the selected clauses.
+        :param keep: boolean array with a value for every clause
+        :return:
+        """
+        literals, ends = self.arrays()
+        lengths = np.diff(ends, prepend=0)
+        kept_literals = literals[np.repeat(keep, lengths)]
+        kept_ends = np.cumsum(lengths[keep])
+        del literals, ends
+        self.literals = array("i", kept_literals.tobytes())
+        self.ends = array("q", kept_ends.astype(np.int64).tobytes())
+
+    def dimacs_chunks(self, chunk_size: int = DimacsWriter.chunk_size):
+        """
+        Yields the DIMACS lines of the clauses, every chunk is formatted from the buffer at once.
+        :param chunk_size: number of clauses in one chunk
+        :return: generator of strings
+        """
+        literals, ends = self.arrays()
+        for first in range(0, len(ends), chunk_size):
+            start = int(ends[first - 1]) if first else 0
+            chunk_ends = ends[first:first + chunk_size]
+            yield format_clauses(literals[start:chunk_ends[-1]], chunk_ends - start)
+
+    def save_binary(self, filename: str, num_variables: int):
+        """
+        Saves the buffer in the binary CNF format - the header, the ends of the clauses as int64 and the literals
+        as int32. The arrays are written as they are in memory, see load_binary.
+        :param filename: path to the file
+        :param num_variables: number of variables stored in the header
+        :return:
+        """
+        part_filename = f"{filename}.{os.getpid()}.part"
+        with open(part_filename, "wb") as file:
+            file.write(BINARY_MAGIC)
+            file.write(np.array([num_variables, len(self.ends), len(self.literals)], dtype=np.int64).tobytes())
+            file.write(self.ends)
+            file.write(self.literals)
+        os.replace(part_filename, filename)
+
+    @classmethod
+    def load_binary(cls, filename: str):
+        """
+        Maps the file saved by save_binary to memory, nothing is parsed or copied until the clauses are read.
+        :param filename: path to the file
+        :return: ClauseBuffer, its num_variables is read from the header
+        """
+        with open(filename, "rb") as file:
+            header = file.read(BINARY_HEADER_SIZE)
+        if len(header) != BINARY_HEADER_SIZE or header[:len(BINARY_MAGIC)] != BINARY_MAGIC:
+            raise ValueError(f"{filename} is not a binary CNF file.")
+        num_variables, num_clauses, num_literals = np.frombuffer(header, dtype=np.int64, offset=len(BINARY_MAGIC))
+
+        buffer = cls()
+        # an empty array cannot be memory-mapped
+        buffer.ends = np.memmap(filename, dtype=np.int64, mode="r", offset=BINARY_HEADER_SIZE,
+                                shape=(int(num_clauses),)) if num_clauses else np.zeros(0, dtype=np.int64)
+        literals_offset = BINARY_HEADER_SIZE + 8 * int(num_clauses)
+        buffer.literals = np.memmap(filename, dtype=np.int32, mode="r", offset=literals_offset,
+                                    shape=(int(num_literals),)) if num_literals else np.zeros(0, dtype=np.int32)
+        buffer.num_variables = int(num_variables)
+        return buffer
+
+    @property
+    def nbytes(self) -> int:
+        """
+        :return: size of the literals and the ends in bytes
+        """
+        return self.literals.itemsize * len(self.literals) + self.ends.itemsize * len(self.ends)
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+    def __iter__(self):
+        # the literals are converted to ints in chunks, slicing the arrays for every clause is slow
+        for first in range(0, len(self.ends), DimacsWriter.chunk_size):
+            offset = int(self.ends[first - 1]) if first else 0
+            ends = self.ends[first:first + DimacsWriter.chunk_size].tolist()
+            literals = self.literals[offset:ends[-1]].tolist()
+            start = 0
+            for end in ends:
+                yield literals[start:end - offset]
+                start = end - offset
+
+    def __getitem__(self, index: int) -> list:
+        end = self.ends[index]
+        index = index if index >= 0 else index + len(self.ends)
+        start = self.ends[index - 1] if index > 0 else 0
+        return self.literals[start:end].tolist()
+
+
+class ClauseStore:
+    """
+    Store through which all generated clauses are written.
+    Every clause is canonicalised (duplicate literals removed, literals sorted by variable) and dropped if it is
+    a tautology, a duplicate of an already stored clause or subsumed by an already stored unit clause.
+    Accepted clauses are passed to the target container - ClauseBuffer, list or DimacsWriter.
+    The false variable is removed from the clauses and clauses with its negation are dropped as subsumed.
+    """
+
+    def __init__(self, target=None, deduplicate: bool = True, false_variable: int = None):
+        """
+        :param target: container with append(), ClauseBuffer by default
+        :param deduplicate: whether to remember stored clauses and drop duplicates, costs memory proportional to
+        the number of clauses - the literals of every stored clause as bytes
+        :param false_variable: variable which is always false, see PrunedLayout
+        """
+        self.target = ClauseBuffer() if target is None else target
+        self.deduplicate = deduplicate
+        self.false_variable = false_variable
+        self.units = set()
+        # units stored after longer clauses, remove_subsumed checks only them
+        self._late_units = set()
+        self._longer_clauses = False
+        self.removed = {"duplicates": 0, "tautologies": 0, "subsumed": 0}
+        self._seen = set()
+
+    def append(self, clause):
+        """
+        Canonicalises the clause and stores it unless it is redundant.
+        :param clause: iterable of literals
+        :return: True if the clause was stored
+        """
+        literals = set(clause)
+
+        if self.false_variable is not None:
+            if -self.false_variable in literals:
+                self.removed["subsumed"] += 1
+                return False
+            literals.discard(self.false_variable)
+
+        for literal in literals:
+            if -literal in literals:
+                self.removed["tautologies"] += 1
+                return False
+
+        if len(literals) == 1 and not self.units.isdisjoint(literals):
+            self.removed["duplicates"] += 1
+            return False
+
+        if not self.units.isdisjoint(literals):
+            self.removed["subsumed"] += 1
+            return False
+
+        canonical = tuple(sorted(literals, key=abs))
+
+        if len(canonical) == 1:
+            self.units.add(canonical[0])
+            if self._longer_clauses:
+                self._late_units.add(canonical[0])
+        else:
+            if self.deduplicate:
+                key = array("i", canonical).tobytes()
+                if key in self._seen:
+                    self.removed["duplicates"] += 1
+                    return False
+                self._seen.add(key)
+            self._longer_clauses = True
+
+        self.target.append(list(canonical))
+        return True
+
+    def extend(self, clauses):
+        """
+        Stores all clauses from the iterable.
+        :param clauses: iterable of clauses
+        :return:
+        """
+        for clause in clauses:
+            self.append(clause)
+
+    def extend_array(self, clauses: np.ndarray):
+        """
+        Stores the rows of the integer array as clauses, the same as extend() with the canonicalisation
+        and the removal of tautologies and subsumed clauses done by numpy for the whole array.
+        Literal 0 is ignored, so that the rows can have different lengths.
+        :param clauses: array [number of clauses, literals]
+        :return:
+        """
+        clauses = np.array(clauses, dtype=np.int64, ndmin=2)
+        if clauses.size == 0:
+            return
+
+        if self.false_variable is not None:
+            negated = (clauses == -self.false_variable).any(axis=1)
+            self.removed["subsumed"] += int(negated.sum())
+            clauses = clauses[~negated]
+            clauses[clauses == self.false_variable] = 0
+
+        clauses = self._sort_by_variable(clauses)
+        same_variable = (np.abs(clauses[:, 1:]) == np.abs(clauses[:, :-1])) & (clauses[:, 1:] != 0)
+        tautologies = (same_variable & (clauses[:, 1:] != clauses[:, :-1])).any(axis=1)
+        self.removed["tautologies"] += int(tautologies.sum())
+        clauses = clauses[~tautologies]
+        same_variable = same_variable[~tautologies]
+        if same_variable.any():
+            clauses[:, 1:][same_variable] = 0
+            clauses = self._sort_by_variable(clauses)
+
+        # zeros are sorted first, rows are grouped by their length
+        width = clauses.shape[1]
+        lengths = width - (clauses == 0).sum(axis=1)
+        for length in np.unique(lengths):
+            rows = clauses[lengths == length, width - length:]
+            if length <= 1:
+                # unit and empty clauses go through append, which keeps the set of units
+                for clause in rows.tolist():
+                    self.append(clause)
+            else:
+                self._extend_canonical(rows)
+
+    @staticmethod
+    def _sort_by_variable(clauses: np.ndarray) -> np.ndarray:
+        order = np.argsort(np.abs(clauses), axis=1, kind="stable")
+        return np.take_along_axis(clauses, order, axis=1)
+
+    def _extend_canonical(self, rows: np.ndarray):
+        """
+        Stores canonical clauses of at least two literals without tautologies.
+        :param rows: array [number of clauses, literals]
+        :return:
+        """
+        if self.units:
+            subsumed = np.isin(rows, np.fromiter(self.units, dtype=np.int64, count=len(self.units))).any(axis=1)
+            self.removed["subsumed"] += int(subsumed.sum())
+            rows = rows[~subsumed]
+        if len(rows) == 0:
+            return
+        self._longer_clauses = True
+
+        if self.deduplicate:
+            # the literals of the canonical clause as bytes, the same key as in append()
+            keys = np.ascontiguousarray(rows, dtype=np.int32).view(np.dtype((np.void, 4 * rows.shape[1]))).ravel()
+            keys = keys.tolist()
+            unique = set(keys)
+            if len(unique) == len(keys) and self._seen.isdisjoint(unique):
+                # no duplicates, the usual case
+                self._seen |= unique
+            else:
+                fresh = []
+                for index, key in enumerate(keys):
+                    if key not in self._seen:
+                        self._seen.add(key)
+                        fresh.append(index)
+                self.removed["duplicates"] += len(keys) - len(fresh)
+                rows = rows[fresh]
+
+        if hasattr(self.target, "extend_array"):
+            self.target.extend_array(rows)
+        else:
+            self.target.extend(rows.tolist())
+
+    def remove_subsumed(self):
+        """
+        Removes stored clauses subsumed by unit clauses which were stored after them.
+        Only possible when the clauses are kept in memory, clauses streamed to a file are already written.
+        :return:
+        """
+        if not self.in_memory or not self._late_units:
+            return
+        if isinstance(self.target, ClauseBuffer):
+            literals, ends = self.target.arrays()
+            lengths = np.diff(ends, prepend=0)
+            units = np.fromiter(self._late_units, dtype=np.int32, count=len(self._late_units))
+            subsumed = np.zeros(len(ends), dtype=bool)
+            subsumed[np.repeat(np.arange(len(ends)), lengths)[np.isin(literals, units)]] = True
+            subsumed &= lengths != 1
+            del literals, ends
+            self.target.filter(~subsumed)
+            self.removed["subsumed"] += int(subsumed.sum())
+        else:
+            kept = [clause for clause in self.target if len(clause) == 1 or self._late_units.isdisjoint(clause)]
+            self.removed["subsumed"] += len(self.target) - len(kept)
+            self.target[:] = kept
+        self._late_units.clear()
+
+    @property
+    def in_memory(self) -> bool:
+        """
+        :return: whether the clauses are kept in memory, not streamed to or read from a file
+        """
+        return isinstance(self.target, (ClauseBuffer, list))
+
+    def dimacs_chunks(self, chunk_size: int = DimacsWriter.chunk_size):
+        """
+        Yields the DIMACS lines of the stored clauses, see dimacs.dimacs_chunks.
+        """
+        return dimacs_chunks(self.target, chunk_size)
+
+    @property
+    def number_of_removed(self) -> int:
+        return sum(self.removed.values())
+
+    def __len__(self) -> int:
+        return len(self.target)
+
+    def __iter__(self):
+        return iter(self.target)
+
+    def __getitem__(self, index):
+        return self.target[index]
@@ -0,0 +1,187 @@
+from functools import cached_property
+
+import numpy as np
+
+# Signs of the 4D theory, 1 = │, 2 = ─, 3 = ┘, 4 = └, 5 = ┐, 6 = ┌, index 0 is unused.
+GLYPHS = np.array(["", "│", "─", "┘", "└", "┐", "┌"], dtype=object)
+
+# Bits of the neighbour mask of a cell, the neighbours in the order of NumberlinkBoard.get_neighbors.
+UP, DOWN, LEFT, RIGHT = 1, 2, 4, 8
+
+# Neighbours every sign is linked to as a neighbour mask, index 0 is unused.
+SIGN_MASKS = np.array([0, UP | DOWN, LEFT | RIGHT, UP | LEFT, UP | RIGHT, DOWN | LEFT, DOWN | RIGHT])
+
+
+def _mask_sign(mask: int) -> int:
+    # the first sign whose neighbours are all in the mask, in the order ┌ ┐ └ ┘ │ ─
+    for sign, bits in ((6, DOWN | RIGHT), (5, DOWN | LEFT), (4, UP | RIGHT), (3, UP | LEFT), (1, DOWN), (2, RIGHT)):
+        if mask & bits == bits:
+            return sign
+    return 0
+
+
+# Sign of a cell of the 3D theory by the mask of its neighbours with the same path. Solutions have exactly two
+# such neighbours, other masks get the first sign which fits.
+MASK_SIGNS = np.array([_mask_sign(mask) for mask in range(16)])
+
+
+class Solution:
+    """
+    Decoded model of the solver. The true variables are placed to the grid in one pass, the sign of every cell
+    and its links to the neighbours are looked up from the neighbour masks. The ordered paths, detached cycles
+    and the printed boards are computed only when they are asked for.
+    """
+
+    def __init__(self, board, true_variables):
+        """
+        :param board: NumberlinkBoard
+        :param true_variables: (i, j, p, d) of the true variables of the model
+        """
+        self.board = board
+        height, width = board.height, board.width
+        variables = np.asarray(true_variables, dtype=np.int64).reshape(-1, 4)
+        i, j, p, d = variables.T
+
+        # path of every cell (0 = not decoded) and the sign of the 4D theory (0 = starting or ending point)
+        self.paths_grid = np.zeros((height, width), dtype=np.int64)
+        self.signs = np.zeros((height, width), dtype=np.int64)
+        self.decoded = np.zeros((height, width), dtype=bool)
+        self.endpoints = np.zeros((height, width), dtype=bool)
+        self.paths_grid[i, j] = p
+        self.signs[i, j] = d
+        self.decoded[i, j] = True
+        for path, points in board.start_end_points.items():
+            for i1, j1 in points:
+                self.paths_grid[i1, j1] = path
+                self.endpoints[i1, j1] = True
+
+        # neighbours with the same path
+        grid = self.paths_grid
+        down = (grid[:-1] == grid[1:]) & (grid[:-1] != 0)
+        right = (grid[:, :-1] == grid[:, 1:]) & (grid[:, :-1] != 0)
+        same = np.zeros((height, width), dtype=np.int64)
+        same[:-1] |= down * DOWN
+        same[1:] |= down * UP
+        same[:, :-1] |= right * RIGHT
+        same[:, 1:] |= right * LEFT
+
+        if board.theory == "3D":
+            self.signs = np.where(self.decoded & ~self.endpoints, MASK_SIGNS[same], 0)
+
+        # two cells are linked when both are linked towards each other, starting and ending points to all sides
+        opens = np.where(self.endpoints, UP | DOWN | LEFT | RIGHT, SIGN_MASKS[self.signs]) & same
+        down = (opens[:-1] & DOWN != 0) & (opens[1:] & UP != 0)
+        right = (opens[:, :-1] & RIGHT != 0) & (opens[:, 1:] & LEFT != 0)
+        self.links = np.zeros((height, width), dtype=np.int64)
+        self.links[:-1] |= down * DOWN
+        self.links[1:] |= down * UP
+        self.links[:, :-1] |= right * RIGHT
+        self.links[:, 1:] |= right * LEFT
+
+    @cached_property
+    def _components(self) -> tuple:
+        """
+        Follows the links from the starting and ending points, the linked cells which are not reached
+        are the detached cycles. Every cell is visited once - O(height * width).
+        :return: dictionary path -> flat indices of its cells, list of the flat indices of the cycles
+        """
+        width = self.board.width
+        steps = [(UP, -width), (DOWN, width), (LEFT, -1), (RIGHT, 1)]
+        # the traversal is in plain Python, indexing numpy arrays cell by cell is slower
+        links = self.links.ravel().tolist()
+        visited = bytearray(self.board.height * width)
+
+        def traverse(start):
+            # depth first, so that the cells of a path are in their order along the path
+            order = []
+            stack = [start]
+            while stack:
+                cell = stack.pop()
+                if visited[cell]:
+                    continue
+                visited[cell] = 1
+                order.append(cell)
+                mask = links[cell]
+                for bit, offset in steps:
+                    if mask & bit and not visited[cell + offset]:
+                        stack.append(cell + offset)
+            return order
+
+        paths = {p: [] for p in range(1, self.board.number_of_paths + 1)}
+        for p, points in self.board.start_end_points.items():
+            for i, j in points:
+                if not visited[i * width + j]:
+                    paths[p].extend(traverse(i * width + j))
+
+        cycles = []
+        for cell in np.flatnonzero(self.signs).tolist():
+            if not visited[cell]:
+                cycles.append(traverse(cell))
+
+        return paths, cycles
+
+    @cached_property
+    def paths(self) -> dict:
+        """
+        :return: dictionary path -> cells (i, j) in the order from the starting to the ending point,
+        the cells of the detached cycles of the path follow
+        """
+        width = self.board.width
+        paths, cycles = self._components
+        paths = {p: [divmod(cell, width) for cell in cells] for p, cells in paths.items()}
+        grid = self.paths_grid.ravel()
+        for cells in cycles:
+            paths[int(grid[cells[0]])].extend(divmod(cell, width) for cell in cells)
+        return paths
+
+    @cached_property
+    def cycles(self) -> list:
+        """
+        :return: list of the detached cycles, cycle is an array [number of cells, 4] of (i, j, p, d) - the cells
+        of the cycle, its path and sign
+        """
+        cycles = []
+        for cells in self._components[1]:
+            cells = np.array(cells)
+            i, j = np.divmod(cells, self.board.width)
+            cycles.append(np.column_stack([i, j, self.paths_grid.ravel()[cells], self.signs.ravel()[cells]]))
+        return cycles
+
+    @cached_property
+    def assignment(self) -> np.ndarray:
+        """
+        :return: array [number of cells, 4] of (i, j, p, d) of the decoded cells which are not starting or ending
+        points - the path and the sign of every cell, for the 3D theory the sign given by its neighbours
+        """
+        i, j = np.nonzero(self.decoded & ~self.endpoints)
+        return np.column_stack([i, j, self.paths_grid[i, j], self.signs[i, j]])
+
+    @cached_property
+    def numbered_board(self) -> list:
+        """
+        :return: the board with the path of every decoded cell
+        """
+        numbered = np.array(self.board.board, dtype=object)
+        numbered[self.decoded] = self.paths_grid[self.decoded]
+        return numbered.tolist()
+
+    @cached_property
+    def direction_board_list(self) -> list:
+        """
+        :return: the board with the signs of the cells and the paths of the starting and ending points
+        """
+        labels = np.array([""] + [str(p) for p in range(1, self.board.number_of_paths + 1)], dtype=object)
+        directions = np.array(self.board.board, dtype=object)
+        directions[self.decoded] = labels[self.paths_grid[self.decoded]]
+        signed = self.signs != 0
+        directions[signed] = GLYPHS[self.signs[signed]]
+        return directions.tolist()
+
+    @cached_property
+    def direction_board_string(self) -> str:
+        """
+        :return: direction_board_list with the columns aligned to the right, one line per row
+        """
+        rows = self.direction_board_list
+        widths = [max(len(row[j]) for row in rows) for j in range(len(rows[0]))] if rows else []
+        return "".join("".join(cell.rjust(size) for cell, size in zip(row, widths)) + "\n" for row in rows)
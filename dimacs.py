@@ -0,0 +1,260 @@
+import gzip
+import os
+import shutil
+
+import numpy as np
+
+# Extensions of the CNF files by their format, see NumberlinkBoard.cnf_format.
+CNF_EXTENSIONS = {"dimacs": ".cnf", "gzip": ".cnf.gz", "binary": ".cnfb"}
+
+# Compression level of the gzip format, higher levels are much slower and save little on the DIMACS text.
+GZIP_LEVEL = 6
+
+
+def open_text(filename: str, mode: str = "r", compressed: bool = None):
+    """
+    Opens the DIMACS file as text, gzip-compressed files are compressed and decompressed transparently.
+    :param filename: path to the file
+    :param mode: "r", "w" or "a"
+    :param compressed: whether the file is compressed, by default files with the extension .gz
+    :return: text file object
+    """
+    if compressed is None:
+        compressed = filename.endswith(".gz")
+    if compressed:
+        return gzip.open(filename, mode + "t", encoding="ascii", compresslevel=GZIP_LEVEL)
+    return open(filename, mode, encoding="ascii")
+
+
+class DimacsWriter:
+    """
+    Buffered writer of clauses in DIMACS format.
+    Clauses are written to the file as they are appended, so they are never held in memory.
+    The header is written first as a fixed-width placeholder and patched with the final counts in close().
+    The file is written under a temporary name and renamed in close(), so an unfinished file is never used.
+    Files with the extension .gz are compressed, a header which has to be patched is written to an uncompressed
+    temporary file first, which is compressed in close().
+    """
+
+    header_width = 40
+    chunk_size = 10000
+
+    def __init__(self, filename: str, num_variables: int = None, num_clauses: int = None):
+        """
+        :param filename: path to the .cnf file
+        :param num_variables: number of variables if known beforehand
+        :param num_clauses: number of clauses if known beforehand, the header is then written exactly
+        """
+        self.filename = filename
+        self.number_of_clauses = 0
+        self._chunk = []
+        # number of clauses in the formatted text of _chunk, one item of extend_array holds many clauses
+        self._buffered = 0
+        self._part_filename = f"{filename}.{os.getpid()}.part"
+        self._patch_header = num_variables is None or num_clauses is None
+        self._compress = filename.endswith(".gz") and self._patch_header
+        self._file = open_text(self._part_filename, "w", filename.endswith(".gz") and not self._patch_header)
+        if self._patch_header:
+            self._file.write(self.format_header(0, 0))
+        else:
+            self._file.write(f"p cnf {num_variables} {num_clauses}\n")
+
+    def format_header(self, num_variables: int, num_clauses: int) -> str:
+        """
+        Returns header line padded to the fixed width.
+        :param num_variables:
+        :param num_clauses:
+        :return: header line
+        """
+        return f"p cnf {num_variables} {num_clauses}".ljust(self.header_width - 1) + "\n"
+
+    def append(self, clause):
+        """
+        Writes one clause.
+        :param clause: iterable of literals
+        :return:
+        """
+        self._chunk.append(" ".join(map(str, clause)) + " 0\n")
+        self.number_of_clauses += 1
+        self._buffered += 1
+        if self._buffered >= self.chunk_size:
+            self.flush()
+
+    def extend(self, clauses):
+        """
+        Writes all clauses from the iterable.
+        :param clauses: iterable of clauses, containers with dimacs_chunks(), e.g. ClauseBuffer, are formatted in bulk
+        :return:
+        """
+        if hasattr(clauses, "dimacs_chunks"):
+            self.flush()
+            for text in clauses.dimacs_chunks(self.chunk_size):
+                self._file.write(text)
+            self.number_of_clauses += len(clauses)
+            return
+        for clause in clauses:
+            self.append(clause)
+
+    def extend_array(self, clauses: np.ndarray):
+        """
+        Writes the rows of the integer array as clauses.
+        :param clauses: array [number of clauses, literals] without zeros
+        :return:
+        """
+        width = clauses.shape[1]
+        for start in range(0, len(clauses), self.chunk_size):
+            rows = clauses[start:start + self.chunk_size]
+            self._chunk.append(format_clauses(rows.ravel(), np.arange(1, len(rows) + 1) * width))
+            self.number_of_clauses += len(rows)
+            self._buffered += len(rows)
+            if self._buffered >= self.chunk_size:
+                self.flush()
+
+    def flush(self):
+        self._file.writelines(self._chunk)
+        self._chunk = []
+        self._buffered = 0
+
+    def close(self, num_variables: int):
+        """
+        Flushes remaining clauses and patches the header if the counts were not known beforehand.
+        :param num_variables: number of variables written to the patched header
+        :return:
+        """
+        if self._file.closed:
+            return
+        self.flush()
+        if self._patch_header:
+            self._file.seek(0)
+            self._file.write(self.format_header(num_variables, self.number_of_clauses))
+        self._file.close()
+        if self._compress:
+            with open(self._part_filename, "rb") as source, \
+                    gzip.open(f"{self._part_filename}.gz", "wb", compresslevel=GZIP_LEVEL) as target:
+                shutil.copyfileobj(source, target)
+            os.remove(self._part_filename)
+            self._part_filename = f"{self._part_filename}.gz"
+        os.replace(self._part_filename, self.filename)
+
+    @property
+    def closed(self) -> bool:
+        return self._file.closed
+
+    def __len__(self) -> int:
+        return self.number_of_clauses
+
+
+class DimacsReader:
+    """
+    Clauses of an existing DIMACS file, e.g. a cached one, read lazily from the file on iteration.
+    """
+
+    def __init__(self, filename: str):
+        """
+        :param filename: path to the .cnf or .cnf.gz file
+        """
+        self.filename = filename
+        with open_text(filename) as file:
+            _, _, num_variables, num_clauses = file.readline().split()
+        self.num_variables = int(num_variables)
+        self.number_of_clauses = int(num_clauses)
+
+    def __iter__(self):
+        with open_text(self.filename) as file:
+            for line in file:
+                if line[0] not in "cp\n":
+                    yield [int(literal) for literal in line.split()[:-1]]
+
+    def __len__(self) -> int:
+        return self.number_of_clauses
+
+
+def append_to_dimacs(filename: str, clauses, num_variables: int = None) -> int:
+    """
+    Appends clauses to an existing DIMACS file and updates the number of clauses in its header.
+    The header is patched in place if the new one fits, otherwise the file is rewritten.
+    A gzip-compressed file is always rewritten.
+    :param filename: path to the .cnf or .cnf.gz file
+    :param clauses: iterable of clauses
+    :param num_variables: new number of variables in the header, the number is kept by default
+    :return: number of appended clauses
+    """
+    lines = [" ".join(map(str, clause)) + " 0\n" for clause in clauses]
+    compressed = filename.endswith(".gz")
+
+    with open_text(filename, "r" if compressed else "r+") as file:
+        header = file.readline()
+        _, _, old_num_variables, num_clauses = header.split()
+        num_variables = old_num_variables if num_variables is None else num_variables
+        new_header = f"p cnf {num_variables} {int(num_clauses) + len(lines)}"
+
+        if len(new_header) < len(header) and not compressed:
+            file.seek(0, os.SEEK_END)
+            file.writelines(lines)
+            file.seek(0)
+            file.write(new_header.ljust(len(header) - 1) + "\n")
+            return len(lines)
+
+    part_filename = f"{filename}.{os.getpid()}.part"
+    with open_text(filename) as file, open_text(part_filename, "w", compressed) as part:
+        file.readline()
+        part.write(new_header + "\n")
+        shutil.copyfileobj(file, part)
+        part.writelines(lines)
+    os.replace(part_filename, filename)
+    return len(lines)
+
+
+def format_clauses(literals: np.ndarray, ends: np.ndarray) -> str:
+    """
+    Formats the clauses stored as one flat array of literals in DIMACS format.
+    The literals of all clauses are joined at once with the terminating zeros inserted by numpy,
+    no list is created for a single clause.
+    :param literals: literals of all clauses
+    :param ends: index into literals after the last literal of every clause
+    :return: DIMACS lines of the clauses
+    """
+    if len(ends) == 0:
+        return ""
+    if (np.diff(ends, prepend=0) == 0).any():
+        # the zero of an empty clause could not be told apart from the terminating zeros
+        starts = np.concatenate([[0], ends[:-1]])
+        return "".join(" ".join(map(str, literals[start:end].tolist())) + " 0\n" for start, end in zip(starts, ends))
+    terminated = np.insert(literals, ends, 0)
+    return (" ".join(map(str, terminated.tolist())) + "\n").replace(" 0 ", " 0\n")
+
+
+def dimacs_chunks(clauses, chunk_size: int = DimacsWriter.chunk_size):
+    """
+    Yields the DIMACS lines of the clauses in chunks.
+    :param clauses: iterable of clauses, containers with dimacs_chunks(), e.g. ClauseBuffer, are formatted in bulk
+    :param chunk_size: number of clauses in one chunk
+    :return: generator of strings
+    """
+    if hasattr(clauses, "dimacs_chunks"):
+        yield from clauses.dimacs_chunks(chunk_size)
+        return
+    chunk = []
+    for clause in clauses:
+        chunk.append(" ".join(map(str, clause)) + " 0\n")
+        if len(chunk) >= chunk_size:
+            yield "".join(chunk)
+            chunk = []
+    yield "".join(chunk)
+
+
+def write_dimacs(stream, num_variables: int, num_clauses: int, *clauses, chunk_size: int = DimacsWriter.chunk_size):
+    """
+    Writes the formula in DIMACS format to a binary stream, e.g. the standard input of the solver.
+    The clauses are encoded in chunks, so the whole text of the formula is never held in memory.
+    :param stream: binary stream
+    :param num_variables: number of variables in the header
+    :param num_clauses: number of clauses in the header
+    :param clauses: iterables of clauses written one after another
+    :param chunk_size: number of clauses written at once
+    :return:
+    """
+    stream.write(f"p cnf {num_variables} {num_clauses}\n".encode("ascii"))
+    for part in clauses:
+        for text in dimacs_chunks(part, chunk_size):
+            stream.write(text.encode("ascii"))
@@ -0,0 +1,233 @@
+from collections import deque
+
+import numpy as np
+
+
+def path_domains(board) -> np.ndarray:
+    """
+    Computes the cells every path can occupy. A cell is feasible for the path p when it is reachable from
+    the endpoints of p without crossing the endpoints of other paths, and a path can enter and leave it -
+    cells which are not endpoints of p need two feasible neighbours, endpoints of p need one.
+    :param board: NumberlinkBoard
+    :return: boolean array [height, width, number_of_paths + 1], index 0 of the paths is unused
+    """
+    domains = np.zeros((board.height, board.width, board.number_of_paths + 1), dtype=bool)
+    endpoints = set(board.start_end_points_locs)
+
+    for p, points in board.start_end_points.items():
+        own = set(points)
+
+        # cells reachable from the first endpoint
+        start = points[0]
+        reachable = {start}
+        queue = deque([start])
+        while queue:
+            i, j = queue.popleft()
+            for neighbor in board.get_neighbors(i, j):
+                if neighbor not in reachable and (neighbor not in endpoints or neighbor in own):
+                    reachable.add(neighbor)
+                    queue.append(neighbor)
+
+        if not own <= reachable:
+            continue
+
+        # dead ends cannot be on the path, removing them can create new ones
+        degree = {cell: sum(neighbor in reachable for neighbor in board.get_neighbors(*cell)) for cell in reachable}
+        queue = deque(cell for cell in reachable if degree[cell] < (1 if cell in own else 2))
+        while queue:
+            cell = queue.popleft()
+            if cell not in reachable:
+                continue
+            reachable.discard(cell)
+            for neighbor in board.get_neighbors(*cell):
+                if neighbor in reachable:
+                    degree[neighbor] -= 1
+                    if degree[neighbor] < (1 if neighbor in own else 2):
+                        queue.append(neighbor)
+
+        for i, j in reachable:
+            domains[i, j, p] = True
+
+    return domains
+
+
+def unsat_reason(board, domains: np.ndarray):
+    """
+    Detects boards without solution which do not need the SAT solver.
+    - the endpoints of a path are not connected
+    - a cell cannot be occupied by any path
+    - parity - in the checkerboard colouring every path alternates the colours, so a path with both endpoints
+      on the same colour has one more cell of that colour and a path with endpoints on different colours
+      has the same number of cells of both colours, the paths must cover all cells of the board
+    :param board: NumberlinkBoard
+    :param domains: result of path_domains
+    :return: description of the reason or None
+    """
+    for p, points in board.start_end_points.items():
+        if not all(domains[i, j, p] for i, j in points):
+            return f"endpoints of the path {p} are not connected"
+
+    empty = np.argwhere(~domains.any(axis=2))
+    if len(empty) != 0:
+        return f"no path can occupy the cell {tuple(empty[0].tolist())}"
+
+    colours = np.indices((board.height, board.width)).sum(axis=0) % 2
+    difference = int((colours == 0).sum() - (colours == 1).sum())
+    paths_difference = 0
+    for p, ((i1, j1), (i2, j2)) in board.start_end_points.items():
+        if (i1 + j1) % 2 == (i2 + j2) % 2:
+            paths_difference += 1 if (i1 + j1) % 2 == 0 else -1
+    if difference != paths_difference:
+        return f"parity - the paths cover {paths_difference:+d} more black than white cells instead of {difference:+d}"
+
+    return None
+
+
+# signs of the 4D theory by the directions of their two links, 1 = │, 2 = ─, 3 = ┘, 4 = └, 5 = ┐, 6 = ┌
+SIGNS = {frozenset([(-1, 0), (1, 0)]): 1, frozenset([(0, -1), (0, 1)]): 2, frozenset([(-1, 0), (0, -1)]): 3,
+         frozenset([(-1, 0), (0, 1)]): 4, frozenset([(1, 0), (0, -1)]): 5, frozenset([(1, 0), (0, 1)]): 6}
+
+
+class ForcedMoves:
+    """
+    Deduction of the forced moves before the encoding. Every solution links each endpoint to one neighbour
+    and every other cell to two neighbours of the same path. The rules are applied until nothing changes:
+    - a cell with exactly as many possible links as it needs is linked to all of them - endpoints with a single
+      free neighbour, corridors and corners which can continue only one way
+    - linked cells belong to the same path, their domains are intersected
+    - a path whose endpoints are connected by the links is finished, no other cell can belong to it
+    A cell without any path or possible link proves that the board has no solution.
+    """
+
+    def __init__(self, board, domains: np.ndarray):
+        """
+        :param board: NumberlinkBoard
+        :param domains: result of path_domains, it is not modified
+        """
+        self.board = board
+        self.domains = domains.copy()
+        self.links = {}
+        self.contradiction = None
+        self.rounds = 0
+        self.endpoints = {cell: p for p, points in board.start_end_points.items() for cell in points}
+        self.neighbors = {(i, j): board.get_neighbors(i, j) for i in range(board.height) for j in range(board.width)}
+        for cell in self.neighbors:
+            self.links[cell] = set()
+
+        self.contradiction = self._propagate()
+
+    def required(self, cell: tuple) -> int:
+        return 1 if cell in self.endpoints else 2
+
+    def _link(self, a: tuple, b: tuple):
+        self.links[a].add(b)
+        self.links[b].add(a)
+
+    def _propagate(self):
+        domains = self.domains
+        finished = set()
+        changed = True
+        while changed:
+            changed = False
+            self.rounds += 1
+
+            for cell, neighbors in self.neighbors.items():
+                links = self.links[cell]
+                if len(links) > self.required(cell):
+                    return f"the cell {cell} has more than {self.required(cell)} forced links"
+
+                # linked cells belong to the same path
+                for neighbor in links:
+                    common = domains[cell] & domains[neighbor]
+                    if (common != domains[cell]).any() or (common != domains[neighbor]).any():
+                        domains[cell] = domains[neighbor] = common
+                        changed = True
+                if not domains[cell].any():
+                    return f"no path can occupy the cell {cell}"
+
+                if len(links) == self.required(cell):
+                    continue
+                candidates = [neighbor for neighbor in neighbors if neighbor not in links
+                              and len(self.links[neighbor]) < self.required(neighbor)
+                              and (domains[cell] & domains[neighbor]).any()]
+                if len(links) + len(candidates) < self.required(cell):
+                    return f"the cell {cell} cannot be linked to {self.required(cell)} neighbours"
+                if len(links) + len(candidates) == self.required(cell):
+                    for neighbor in candidates:
+                        self._link(cell, neighbor)
+                    changed = True
+
+            # finished paths
+            for p, (start, end) in self.board.start_end_points.items():
+                if p in finished:
+                    continue
+                segment = self.segment(start)
+                if segment[-1] == end:
+                    finished.add(p)
+                    on_path = np.zeros((self.board.height, self.board.width), dtype=bool)
+                    for i, j in segment:
+                        on_path[i, j] = True
+                    domains[~on_path, p] = False
+                    changed = True
+
+        return None
+
+    def segment(self, start: tuple) -> list:
+        """
+        Follows the forced links from the cell.
+        :param start: endpoint
+        :return: list of the linked cells from start
+        """
+        segment = [start]
+        previous = None
+        while True:
+            following = [neighbor for neighbor in self.links[segment[-1]] if neighbor != previous]
+            if len(following) != 1 or (len(segment) > 1 and segment[-1] in self.endpoints):
+                return segment
+            previous = segment[-1]
+            segment.append(following[0])
+
+    def fixed_cells(self) -> dict:
+        """
+        :return: dictionary cell -> path of the cells which can belong to a single path only, without endpoints
+        """
+        fixed = {}
+        for cell in self.neighbors:
+            if cell not in self.endpoints and self.domains[cell].sum() == 1:
+                fixed[cell] = int(np.argmax(self.domains[cell]))
+        return fixed
+
+    def signs(self) -> dict:
+        """
+        :return: dictionary cell -> sign of the 4D theory of the cells with both links forced, without endpoints
+        """
+        signs = {}
+        for cell, links in self.links.items():
+            if cell not in self.endpoints and len(links) == 2:
+                signs[cell] = SIGNS[frozenset((i - cell[0], j - cell[1]) for i, j in links)]
+        return signs
+
+    def iter_links(self):
+        """
+        Yields every forced link once.
+        :return: generator of (cell, cell) pairs
+        """
+        for cell, links in self.links.items():
+            for neighbor in links:
+                if cell < neighbor:
+                    yield cell, neighbor
+
+    @property
+    def statistics(self) -> dict:
+        """
+        :return: number of the cells, the cells fixed to a single path (without endpoints), the cells
+        with a fixed sign, the forced links and the rounds of the propagation
+        """
+        return {
+            "cells": self.board.height * self.board.width,
+            "endpoints": len(self.endpoints),
+            "fixed cells": len(self.fixed_cells()),
+            "fixed signs": len(self.signs()),
+            "links": sum(len(links) for links in self.links.values()) // 2,
+            "rounds": self.rounds,
+        }
@@ -0,0 +1,111 @@
+import argparse
+
+from sat import *
+
+
+def enumerate_solutions(glucose_executable_path: str, instance_path: str, theory_name: str = "3D+4D",
+                        limit: int = 2, _echo: bool = False, solver: str = "pysat", **options) -> tuple:
+    """
+    Finds up to limit different solutions of the instance. The board of every theory is generated and loaded
+    to the solver once (SolveSession). After every solution a clause blocking its paths and directions
+    (iter_solution_clauses) is added and the same solver continues - the incremental "pysat" backend keeps
+    its learned clauses, glucose is restarted on the CNF file with the clause appended.
+    Models with detached cycles are not solutions, their cycles are blocked as by the cycle breaker of run_sat.
+    With "3D+4D" the solutions found by 3D are blocked in 4D too, the enumeration continues in 4D when 3D
+    has no more solutions.
+    :param glucose_executable_path: the path to the executable of the SAT solver
+    :param instance_path: the path to the instance file
+    :param theory_name: the name of the theory to be used
+    :param limit: maximal number of solutions, None = all solutions
+    :param _echo: print the found solutions
+    :param solver: the solver backend, one of SOLVER_BACKENDS
+    :param options: keyword arguments of SolveSession
+    :return: list of the solutions (decoder.Solution), instance result - UNSAT when all solutions were found,
+    SAT when the limit was reached, TIMEOUT or MEMOUT when the budget ran out
+    """
+    session = SolveSession(glucose_executable_path, instance_path, theory_name, _echo, solver=solver, **options)
+    tracer = session.tracer
+    solutions = []
+    try:
+        while True:
+            if limit is not None and len(solutions) >= limit:
+                instance_result = Status.SAT
+                break
+
+            tracer.iteration += 1
+            with tracer.phase("iteration"):
+                board, instance_result, model, sat_string = session.solve()
+                if instance_result != Status.SAT:
+                    break
+
+                with tracer.phase("decode"):
+                    board.clear_solution()
+                    board.get_true_variables(model, _print=False)
+                    board.retrieve_paths_from_models(model)
+                with tracer.phase("cycle_detect"):
+                    cycles = cycle_detect(board)
+                if len(cycles) != 0:
+                    session.add_cycles(cycles)
+                    continue
+
+                solutions.append(board.solution)
+                if _echo: print(f"Solution {len(solutions)} [{board.theory}]:\n{board.solution.direction_board_string}")
+                session.add_solutions([board.solution.assignment])
+    finally:
+        session.close()
+
+    if _echo: print(f"Solutions: {len(solutions)}, SAT calls: {session.sat_calls}, "
+                    f"all found: {instance_result == Status.UNSAT}")
+    return solutions, instance_result
+
+
+def is_unique(glucose_executable_path: str, instance_path: str, theory_name: str = "3D+4D", **options):
+    """
+    Checks whether the instance has exactly one solution. The enumeration stops after the second solution
+    or when no other solution than the first one exists.
+    :param glucose_executable_path: the path to the executable of the SAT solver
+    :param instance_path: the path to the instance file
+    :param theory_name: the name of the theory to be used
+    :param options: keyword arguments of enumerate_solutions
+    :return: True = exactly one solution, False = no solution or more solutions, None = the budget ran out
+    """
+    solutions, instance_result = enumerate_solutions(glucose_executable_path, instance_path, theory_name, limit=2,
+                                                     **options)
+    if instance_result not in (Status.SAT, Status.UNSAT):
+        return None
+    return len(solutions) == 1
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Enumerates the solutions of a Numberlink instance and checks "
+                                                 "whether the solution is unique.")
+    parser.add_argument("instance", help="instance file")
+    parser.add_argument("--glucose", default="/root/glucose2/glucose/parallel/glucose-syrup",
+                        help="path to the glucose executable")
+    parser.add_argument("--theory", default="3D+4D", help="3D, 4D, 3D+4D or acyclic")
+    parser.add_argument("--limit", type=int, default=2, help="maximal number of solutions, 0 = all solutions")
+    parser.add_argument("--solver", default="pysat", choices=SOLVER_BACKENDS)
+    parser.add_argument("--cardinality", default="pairwise", choices=CARDINALITY_ENCODINGS)
+    parser.add_argument("--timeout", type=float, default=None, help="wall-clock budget of one solver call in seconds")
+    parser.add_argument("--total-timeout", type=float, default=None,
+                        help="wall-clock budget of the whole enumeration in seconds")
+    parser.add_argument("--prune", action="store_true", help="restrict the variables to the cells the paths can reach")
+    parser.add_argument("--forced-moves", action="store_true", help="fix the forced moves before the encoding")
+    parser.add_argument("--quiet", action="store_true", help="print only the number of solutions")
+    args = parser.parse_args()
+
+    solutions, instance_result = enumerate_solutions(args.glucose, args.instance, args.theory, args.limit or None,
+                                                     solver=args.solver, cardinality=args.cardinality,
+                                                     timeout=args.timeout, total_timeout=args.total_timeout,
+                                                     prune=args.prune, forced_moves=args.forced_moves)
+    if not args.quiet:
+        for index, solution in enumerate(solutions, 1):
+            print(f"Solution {index}:")
+            print(solution.direction_board_string)
+
+    if instance_result == Status.UNSAT:
+        print(f"Solutions: {len(solutions)} (all), unique = {len(solutions) == 1}")
+    elif len(solutions) > 1:
+        print(f"Solutions: at least {len(solutions)}, unique = False")
+    else:
+        print(f"Solutions: at least {len(solutions)}, unique = unknown, {solvable_mark(instance_result)}")
@@ -0,0 +1,168 @@
+import argparse
+import concurrent.futures
+import os
+
+import numpy as np
+
+# Number of backbite moves per cell of the board, the serpentine starting path is mixed well after a few passes.
+BACKBITE_MOVES = 10
+
+# Shortest generated path. Paths of two cells have both endpoints next to each other,
+# which the 4D theory cannot link, see NumberlinkBoard.get_se_points_neigbors.
+MIN_PATH_LENGTH = 3
+
+
+def hamiltonian_path(height: int, width: int, rng: np.random.Generator, moves: int = None) -> np.ndarray:
+    """
+    Random Hamiltonian path of the grid, the serpentine path through the rows is changed by backbite moves:
+    one end of the path is connected to a random neighbour and the part of the path behind the neighbour
+    is reversed, so that the path stays Hamiltonian.
+    :param height: number of rows
+    :param width: number of columns
+    :param rng: random generator
+    :param moves: number of backbite moves, BACKBITE_MOVES per cell by default
+    :return: array of the flat indices i * width + j of the cells in the order of the path
+    """
+    cells = height * width
+    path = np.arange(cells).reshape(height, width)
+    path[1::2] = path[1::2, ::-1]
+    path = path.ravel().copy()
+    position = np.empty(cells, dtype=np.int64)
+    position[path] = np.arange(cells)
+    index = np.arange(cells)
+
+    if moves is None:
+        moves = BACKBITE_MOVES * cells
+    offsets = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    # the random numbers are drawn at once, drawing them one by one is slower than the move itself
+    for tail, direction in zip(rng.integers(0, 2, moves).tolist(), rng.integers(0, 4, moves).tolist()):
+        end = int(path[-1] if tail else path[0])
+        di, dj = offsets[direction]
+        i, j = divmod(end, width)
+        if not (0 <= i + di < height and 0 <= j + dj < width):
+            continue
+        k = int(position[(i + di) * width + j + dj])
+        if tail and k != cells - 2:
+            path[k + 1:] = path[k + 1:][::-1]
+            position[path[k + 1:]] = index[k + 1:]
+        elif not tail and k != 1:
+            path[:k] = path[:k][::-1]
+            position[path[:k]] = index[:k]
+
+    return path
+
+
+def random_instance(height: int, width: int, paths: int, seed=None, min_length: int = MIN_PATH_LENGTH,
+                    moves: int = None) -> tuple:
+    """
+    Generates random solvable board. A random Hamiltonian path of the grid is cut into the given number of paths
+    of random lengths, the ends of every part are its starting and ending point. The parts cover all cells,
+    so they are a solution of the board - a solution of the 4D and acyclic theories. Parts may touch
+    themselves, the 3D theory can find another solution or none.
+    :param height: number of rows
+    :param width: number of columns
+    :param paths: number of paths
+    :param seed: seed of the random generator, the same seed gives the same board
+    :param min_length: minimal number of cells of a path, at least MIN_PATH_LENGTH
+    :param moves: number of backbite moves, see hamiltonian_path
+    :return: board as list of rows in the format of NumberlinkBoard.load_from_file, solution as array
+    [height, width] of the paths of the cells
+    """
+    cells = height * width
+    if min_length < MIN_PATH_LENGTH:
+        raise ValueError(f"Paths must have at least {MIN_PATH_LENGTH} cells.")
+    if paths < 1 or paths * min_length > cells:
+        raise ValueError(f"{paths} paths of at least {min_length} cells do not fit the {height}x{width} board.")
+
+    rng = np.random.default_rng(seed)
+    path = hamiltonian_path(height, width, rng, moves)
+
+    # uniformly random lengths of at least min_length cells with the sum cells - stars and bars
+    extra = cells - paths * min_length
+    bars = np.sort(rng.choice(extra + paths - 1, paths - 1, replace=False))
+    lengths = np.diff(np.concatenate([[-1], bars, [extra + paths - 1]])) - 1 + min_length
+    ends = np.cumsum(lengths)
+
+    # the paths are numbered in random order, so that the numbers do not follow the Hamiltonian path
+    labels = rng.permutation(paths) + 1
+    solution = np.repeat(labels, lengths)[np.argsort(path)].reshape(height, width)
+
+    board = np.full(cells, ".", dtype=object)
+    board[path[ends - lengths]] = labels.astype(str)
+    board[path[ends - 1]] = labels.astype(str)
+    return board.reshape(height, width).tolist(), solution
+
+
+def write_instance(instance_path: str, board: list, solution: np.ndarray = None):
+    """
+    Writes the board in the comma separated format of NumberlinkBoard.load_from_file.
+    :param instance_path: path to the instance file
+    :param board: list of rows
+    :param solution: paths of the cells, written in the same format to the .sol file next to the instance
+    :return:
+    """
+    with open(instance_path, "w", encoding="utf-8") as file:
+        file.write("".join(",".join(row) + "\n" for row in board))
+    if solution is not None:
+        with open(os.path.splitext(instance_path)[0] + ".sol", "w", encoding="utf-8") as file:
+            file.write("".join(",".join(map(str, row)) + "\n" for row in solution.tolist()))
+
+
+def generate_instance(directory: str, height: int, width: int, paths: int, index: int, seed: int,
+                      min_length: int = MIN_PATH_LENGTH, moves: int = None) -> str:
+    """
+    Generates one instance of the corpus, runs in a worker process. The seed of the board is derived from
+    the seed of the corpus and the parameters of the board, so the corpus does not depend on the workers.
+    :return: path to the instance file
+    """
+    instance_path = os.path.join(directory, f"random_{height}x{width}_{paths}_{index}.txt")
+    board, solution = random_instance(height, width, paths, [seed, height, width, paths, index], min_length, moves)
+    write_instance(instance_path, board, solution)
+    return instance_path
+
+
+def generate_corpus(directory: str, sizes: list, paths: list, count: int = 1, seed: int = 0, workers: int = None,
+                    min_length: int = MIN_PATH_LENGTH, moves: int = None) -> list:
+    """
+    Generates count random instances for every size and number of paths in a pool of worker processes.
+    :param directory: directory of the instance files
+    :param sizes: list of (height, width)
+    :param paths: list of numbers of paths
+    :param count: number of instances of every combination
+    :param seed: seed of the corpus
+    :param workers: number of worker processes, number of CPUs by default
+    :param min_length: minimal number of cells of a path
+    :param moves: number of backbite moves of every board, see hamiltonian_path
+    :return: sorted list of paths to the instance files
+    """
+    os.makedirs(directory, exist_ok=True)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(generate_instance, directory, height, width, p, index, seed, min_length, moves)
+                   for height, width in sizes for p in paths for index in range(count)]
+        return sorted(future.result() for future in futures)
+
+
+def parse_size(size: str) -> tuple:
+    """
+    :param size: "HEIGHTxWIDTH" or "N" for N x N
+    :return: (height, width)
+    """
+    height, _, width = size.lower().partition("x")
+    return int(height), int(width or height)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generates random solvable Numberlink instances.")
+    parser.add_argument("directory", help="directory of the generated instances")
+    parser.add_argument("--sizes", nargs="+", default=["10x10"], help="sizes HEIGHTxWIDTH or N for N x N")
+    parser.add_argument("--paths", nargs="+", type=int, default=[10], help="numbers of paths")
+    parser.add_argument("--count", type=int, default=1, help="number of instances of every size and number of paths")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--min-length", type=int, default=MIN_PATH_LENGTH, help="minimal number of cells of a path")
+    parser.add_argument("--moves", type=int, default=None, help="number of backbite moves of every board")
+    args = parser.parse_args()
+
+    instance_paths = generate_corpus(args.directory, [parse_size(size) for size in args.sizes], args.paths,
+                                     args.count, args.seed, args.workers, args.min_length, args.moves)
+    print(f"{len(instance_paths)} instances saved to {args.directory}")
@@ -6,6 +6,14 @@ from pathlib import Path
 import matplotlib.pyplot as plt
 import numpy as np
 import matplotlib.colors as mcolors
+from variables import PrunedLayout, VariableLayout3D, VariableLayout4D
+from domains import ForcedMoves, path_domains, unsat_reason
+from vectorized import clause_arrays_3D, clause_arrays_4D
+from dimacs import CNF_EXTENSIONS, DimacsWriter, DimacsReader
+from simplify import Simplification
+from decoder import Solution
+from clauses import ClauseBuffer, ClauseStore
+from cardinality import exactly_one, at_most_one, at_most_k, at_least_k
 
 class NumberlinkBoard:
     """
@@ -16,21 +24,23 @@ class NumberlinkBoard:
         self.width = 0
         self.height = 0
         self.board = []
-        self.all_clauses = {}
-        self.clauses = []
+        self.variables = {}
+        self.clauses = ClauseStore()
+        # decoded model and the views assigned instead of it, see retrieve_paths_from_models
+        self.solution = None
+        self._views = {}
         self.load_from_file(filename)
         self.number_of_paths = self.get_number_of_paths()
-        self.paths = {}
         self.theory = ""
         self.start_end_points = {}
         self.start_end_points_locs = []
         self.direction_signs = ["│", "─", "┘", "└", "┐", "┌"]
         self.true_clauses = []
-        self.result_board1 = []
-        self.numbered_board = []
-        self.direction_board_list = []
-        self.direction_board_string = ""
         self.cnf_dir_name = "CNFS"
+        self.cnf_key = ""
+        # format of the CNF file, one of CNF_EXTENSIONS - "dimacs", "gzip" (compressed DIMACS) or "binary"
+        self.cnf_format = "dimacs"
+        self.cardinality_encoding = "pairwise"
         self.results_dir_name = "RESULTS"
 
         self.sat_output = ""
@@ -38,6 +48,19 @@ class NumberlinkBoard:
         self.model = ""
 
         self.sat_real_time = 0
+        self.sat_calls = 0
+        self.timings = {}
+        # Tracer with the events of the phases of run_sat
+        self.trace = None
+        # Simplification of the clauses, the CNF file and the models use its numbering of variables
+        self.simplification = None
+        # cells every path can occupy and the reason why the board has no solution, see prune_domains
+        self.domains = None
+        self.unsat_reason = None
+        # forced moves deduced before the encoding, see prune_domains
+        self.forced_moves = None
+        # per-cell rules of the pairwise encoding are generated by numpy, see vectorized.py
+        self.vectorized = True
 
 
         self.get_start_end_points()
@@ -63,15 +86,19 @@ class NumberlinkBoard:
 
     def create_dirs(self):
         """
-        Create directories for CNF files and results
+        Create directories for CNF files and results, a read-only working directory is allowed
+        for the zero-disk mode of run_sat
         :return: None
         """
-        path = Path(self.cnf_dir_name)
-        if not path.exists():
-            path.mkdir()
-        path = Path(self.results_dir_name)
-        if not path.exists():
-            path.mkdir()
+        try:
+            path = Path(self.cnf_dir_name)
+            if not path.exists():
+                path.mkdir()
+            path = Path(self.results_dir_name)
+            if not path.exists():
+                path.mkdir()
+        except OSError:
+            pass
 
     def load_from_file(self, filename):
         """
@@ -110,7 +137,7 @@ class NumberlinkBoard:
         print(f"height = {self.height}")
         print(f"number of paths = {self.number_of_paths}")
         print(f"sat real time = {self.sat_real_time} s")
-        print(f"number of variables = {len(self.all_clauses)}")
+        print(f"number of variables = {len(self.variables)}")
         print(f"number of clauses = {len(self.clauses)}")
 
     def get_cell(self, i, j):
@@ -157,21 +184,9 @@ class NumberlinkBoard:
         :param echo: print status
         :return:
         """
-        counter = 1
-        for i in range(self.height):
-            for j in range(self.width):
-                for p in range(1, self.number_of_paths + 1):
-                    for d in range(1, 7):
-                        if (i, j) in self.start_end_points[p]:
-                            if (i, j, p, 0) not in self.all_clauses:
-                                self.all_clauses[(i, j, p, 0)] = counter
-                                counter += 1
-                        else:
-                            if (i, j, p, d) not in self.all_clauses:
-                                self.all_clauses[(i, j, p, d)] = counter
-                                counter += 1
+        self.variables = VariableLayout4D(self.height, self.width, self.number_of_paths, self.start_end_points)
         if echo:
-            print(f"All clauses generated. [{len(self.all_clauses)}]")
+            print(f"All clauses generated. [{len(self.variables)}]")
 
     def get_se_points_neigbors(self, i, j, p) -> []:
         """
@@ -319,149 +334,317 @@ class NumberlinkBoard:
         :param _extra_clauses: extra clauses to eliminate cycles
         :return:
         """
+        self.extend_clauses_4D(_extra_clauses)
+        self.clauses.remove_subsumed()
+        if echo:
+            print(f"Clauses generated. [{len(self.clauses)}]")
+            print(f"Redundant clauses removed. [{self.clauses.number_of_removed}] {self.clauses.removed}")
 
-        # 0. Add clauses to eliminate cycles
-        if len(_extra_clauses) != 0:
-            for cycle in _extra_clauses:
-                cycle = set(cycle)
-                for p in range(1, self.number_of_paths + 1):
-                    clause = []
-                    for extra_clause in cycle:
-                        i1, j1, p1, d1 = extra_clause
-                        clause.append(-self.all_clauses[(i1, j1, p, d1)])
-                    self.clauses.append(clause)
+    def extend_clauses_4D(self, _extra_clauses = []):
+        """
+        Stores clauses for 4D theory, the per-cell rules are generated by numpy for the pairwise encoding.
+        :param _extra_clauses: extra clauses to eliminate cycles
+        :return:
+        """
+        if not self.vectorized or self.cardinality_encoding != "pairwise":
+            self.clauses.extend(self.iter_clauses_4D(_extra_clauses))
+            return
+
+        self.clauses.extend(self.iter_fixed_clauses_4D(_extra_clauses))
+        for clauses in clause_arrays_4D(self):
+            self.clauses.extend_array(clauses)
+        for i, j in self.start_end_points_locs:
+            self.clauses.extend(self.iter_endpoint_clauses_4D(i, j))
+
+    def iter_clauses_4D(self, _extra_clauses = []):
+        """
+        Yields clauses for 4D theory one by one.
+        :param _extra_clauses: extra clauses to eliminate cycles
+        :return: generator of clauses
+        """
+        yield from self.iter_fixed_clauses_4D(_extra_clauses)
 
         # Iterate over all cells in the number link board.
         for i in range(self.height):
             for j in range(self.width):
 
-                # 1. All starting and ending points are fixed.
-                if self.board[i][j] != "." :
-                    path = int(self.board[i][j])
-                    # starting and ending points have direction 0
-                    self.clauses.append([self.all_clauses[(i, j, path, 0)]])
-                    for variable in self.all_clauses.items():
-                        if variable[0][0] == i and variable[0][1] == j and variable[0][2] != path:
-                            self.clauses.append([-variable[1]])   # negating all other paths on the same position
-
                 # 2. Every cell has exactly one path and direction.
                 if (i, j) not in self.start_end_points_locs:
                     clause = []
-                    combinations = []
 
-                    # At least one is true.
                     for p in range(1, self.number_of_paths + 1):
                         for d in range(1, 7):
-                            clause.append(self.all_clauses[(i, j, p, d)])
-                            combinations.append((i, j, p, d))
-                    self.clauses.append(clause)
+                            clause.append(self.variables[(i, j, p, d)])
 
-                    # At most one is true.
-                    for c1 in combinations:
-                        for c2 in combinations:
-                            if c1 != c2:
-                                self.clauses.append([-self.all_clauses[c1], -self.all_clauses[c2]])
+                    # At least one is true and at most one is true.
+                    yield from exactly_one(clause, self.variables, self.cardinality_encoding)
 
                 # 3. Every starting and ending point has one neighbor with the same path and possible direction.
                 if (i, j) in self.start_end_points_locs:
-                    path = int(self.board[i][j])
-                    neighbors = self.get_se_points_neigbors(i, j, path)
-                    clause = []
-
-                    # At least one neighbor is true.
-                    for neighbor in neighbors:
-                        clause.append(self.all_clauses[neighbor])
-                        for p in range(1, self.number_of_paths + 1):
-                            if p != path:
-                                n1, n2, p1, d1 = neighbor
-                                self.clauses.append([-self.all_clauses[(n1, n2, p, d1)]])
-                    self.clauses.append(clause)
-
-                    # At most one neighbor is true.
-                    for c1 in neighbors:
-                        for c2 in neighbors:
-                            if c1 != c2:
-                                self.clauses.append([-self.all_clauses[c1], -self.all_clauses[c2]])
+                    yield from self.iter_endpoint_clauses_4D(i, j)
 
                 # 4. Every non-starting and non-ending point has exactly two neighbors with the same path and possible direction.
                 if (i, j) not in self.start_end_points_locs:
-                    for p in range(1, self.number_of_paths + 1):
-                        for d in range(1, 7):
-                            neighbors = self.get_not_se_points_neighbours(i, j, d)
-
-                            # Adding path to neighbor tuple.
-                            _ = []
-                            for index in range(len(neighbors)):
-                                i1, j1, d1 = neighbors[index]
-                                _.append((i1, j1, p, d1))
-                            neighbors = _
-
-                            # If the cell is neighbor to the starting or ending point, it must have the same path.
-                            for neighbor in neighbors:
-                                i1, j1, p1, d1 = neighbor
-                                if (i1, j1) in self.start_end_points_locs:
-                                    if p != int(self.board[neighbor[0]][neighbor[1]]):
-                                        neighbors.remove(neighbor)
-
-                            current_cell = self.all_clauses[(i, j, p, d)]
-
-                            # Unique combinations of neighbors.
-                            # Basically each neighbor has to be connected to exactly two neighbors.
-                            # And the two neighbors must have different locations.
-                            # We will separate neighbors into two groups based on their (i,j) location.
-                            # Exactly one neighbor from each group must be true when the current cell is true.
-
-                            unique = set()
-                            for neighbor in neighbors:
-                                i1, j1, p1, d1 = neighbor
-                                unique.add((i1, j1))
-                            unique = list(unique)
-
-                            g_1 = []
-                            g_2 = []
-
-                            for neighbor in neighbors:
-                                i1, j1, p1, d1 = neighbor
-                                if (i1, j1) == unique[0]:
-                                    g_1.append(neighbor)
-                                else:
-                                    g_2.append(neighbor)
-
-                            if len(g_1) > len(g_2):
-                                g_1, g_2 = g_2, g_1
-
-                            if len(g_1) == 0 or len(g_2) == 0:
-                                self.clauses.append([-self.all_clauses[(i, j, p, d)]])
-                                continue
-
-                            # At least one neighbor from g_1 is true when current_cell is true.
-                            g_1_clause = [-current_cell] + [self.all_clauses[var] for var in g_1]
-                            self.clauses.append(g_1_clause)
-
-                            # At least one neighbor from g_2 is true when current_cell is true.
-                            g_2_clause = [-current_cell] + [self.all_clauses[var] for var in g_2]
-                            self.clauses.append(g_2_clause)
-
-                            # At most one neighbor from g_1 is true when current_cell is true.
-                            for n1 in g_1:
-                                for n2 in g_1:
-                                    if n1 != n2:
-                                        self.clauses.append(
-                                            # if current_cell is true, than only one of the neighbors from g_1 can be true
-                                            # current_cell => -n1 or -n2 <=> -current_cell or -n1 or -n2
-                                            [-current_cell, -self.all_clauses[n1], -self.all_clauses[n2]])
-
-                            # At most one neighbor from g_2 is true when current_cell is true.
-                            for n1 in g_2:
-                                for n2 in g_2:
-                                    if n1 != n2:
-                                        self.clauses.append(
-                                            # if current_cell is true, than only one of the neighbors from g_2 can be true
-                                            # current_cell => -var1 or -var2 <=> -current_cell or -var1 or -var2
-                                            [-current_cell, -self.all_clauses[n1], -self.all_clauses[n2]])
+                    yield from self.iter_cell_clauses_4D(i, j)
+
+    def iter_fixed_clauses_4D(self, _extra_clauses = []):
+        """
+        Yields clauses eliminating the cycles and unit clauses of the starting and ending points
+        and of the forced moves for 4D theory.
+        :param _extra_clauses: extra clauses to eliminate cycles
+        :return: generator of clauses
+        """
 
+        # 0. Add clauses to eliminate cycles
+        yield from self.iter_cycle_clauses(_extra_clauses)
+
+        # 1. All starting and ending points are fixed.
+        # - unit clauses go first, so that the clause store drops the clauses they subsume
+        for i, j in self.start_end_points_locs:
+            path = int(self.board[i][j])
+            # starting and ending points have direction 0
+            yield [self.variables[(i, j, path, 0)]]
+            for variable in self.variables.cell_variables(i, j):
+                if variable[0][2] != path:
+                    yield [-variable[1]]   # negating all other paths on the same position
+
+        # 1b. Cells with both links forced have a fixed sign.
+        if self.forced_moves is not None:
+            for (i, j), sign in self.forced_moves.signs().items():
+                for variable in self.variables.cell_variables(i, j):
+                    if variable[0][3] != sign:
+                        yield [-variable[1]]
+
+    def iter_endpoint_clauses_4D(self, i, j):
+        """
+        Yields clauses of the starting or ending point i, j for 4D theory - it has one neighbor with the same path
+        and possible direction.
+        :return: generator of clauses
+        """
+        path = int(self.board[i][j])
+        neighbors = self.get_se_points_neigbors(i, j, path)
+        clause = []
+
+        # At least one neighbor is true.
+        for neighbor in neighbors:
+            clause.append(self.variables[neighbor])
+            for p in range(1, self.number_of_paths + 1):
+                if p != path:
+                    n1, n2, p1, d1 = neighbor
+                    yield [-self.variables[(n1, n2, p, d1)]]
+        yield clause
+
+        # At most one neighbor is true.
+        yield from at_most_one(clause, self.variables, self.cardinality_encoding)
+
+    def iter_cell_clauses_4D(self, i, j):
+        """
+        Yields clauses of the non-starting and non-ending point i, j for 4D theory - it has exactly two neighbors
+        with the same path and possible direction.
+        :return: generator of clauses
+        """
+        for p in range(1, self.number_of_paths + 1):
+            for d in range(1, 7):
+                neighbors = self.get_not_se_points_neighbours(i, j, d)
+
+                # Adding path to neighbor tuple.
+                _ = []
+                for index in range(len(neighbors)):
+                    i1, j1, d1 = neighbors[index]
+                    _.append((i1, j1, p, d1))
+                neighbors = _
+
+                # If the cell is neighbor to the starting or ending point, it must have the same path.
+                for neighbor in neighbors:
+                    i1, j1, p1, d1 = neighbor
+                    if (i1, j1) in self.start_end_points_locs:
+                        if p != int(self.board[neighbor[0]][neighbor[1]]):
+                            neighbors.remove(neighbor)
+
+                current_cell = self.variables[(i, j, p, d)]
+
+                # Unique combinations of neighbors.
+                # Basically each neighbor has to be connected to exactly two neighbors.
+                # And the two neighbors must have different locations.
+                # We will separate neighbors into two groups based on their (i,j) location.
+                # Exactly one neighbor from each group must be true when the current cell is true.
+
+                unique = set()
+                for neighbor in neighbors:
+                    i1, j1, p1, d1 = neighbor
+                    unique.add((i1, j1))
+                unique = list(unique)
+
+                g_1 = []
+                g_2 = []
+
+                for neighbor in neighbors:
+                    i1, j1, p1, d1 = neighbor
+                    if (i1, j1) == unique[0]:
+                        g_1.append(neighbor)
+                    else:
+                        g_2.append(neighbor)
+
+                if len(g_1) > len(g_2):
+                    g_1, g_2 = g_2, g_1
+
+                if len(g_1) == 0 or len(g_2) == 0:
+                    yield [-self.variables[(i, j, p, d)]]
+                    continue
+
+                # At least one neighbor from g_1 is true when current_cell is true.
+                g_1_clause = [-current_cell] + [self.variables[var] for var in g_1]
+                yield g_1_clause
+
+                # At least one neighbor from g_2 is true when current_cell is true.
+                g_2_clause = [-current_cell] + [self.variables[var] for var in g_2]
+                yield g_2_clause
+
+                # At most one neighbor from g_1 is true when current_cell is true.
+                # current_cell => -n1 or -n2 <=> -current_cell or -n1 or -n2
+                yield from at_most_one(g_1_clause[1:], self.variables, self.cardinality_encoding,
+                                       condition=current_cell)
+
+                # At most one neighbor from g_2 is true when current_cell is true.
+                yield from at_most_one(g_2_clause[1:], self.variables, self.cardinality_encoding,
+                                       condition=current_cell)
+
+    def generate_all_clauses_acyclic(self, echo=False):
+        """
+        Generates all combinations of clauses for acyclic theory - the 4D variables, the labels and parents
+        are allocated as auxiliary variables while generating the clauses.
+        :param echo: print status
+        :return:
+        """
+        self.generate_all_clauses_4D(echo)
+
+    def generate_clauses_acyclic(self, echo=False, _extra_clauses = []):
+        """
+        Generates clauses for acyclic theory = clauses of 4D theory and clauses ruling out detached cycles.
+        :param echo: print status
+        :param _extra_clauses: extra clauses to eliminate cycles
+        :return:
+        """
+        self.extend_clauses_4D(_extra_clauses)
+        self.clauses.extend(self.iter_clauses_acyclic())
+        self.clauses.remove_subsumed()
         if echo:
-            print(f"Clauses generated. [{len(self.clauses)}]")
+            print(f"Clauses generated. [{len(self.clauses)}] variables [{len(self.variables)}]")
+            print(f"Redundant clauses removed. [{self.clauses.number_of_removed}] {self.clauses.removed}")
+
+    def iter_clauses_acyclic(self):
+        """
+        Yields clauses ruling out detached cycles in 4D theory.
+        Every non starting and ending point has a label (binary number) and a parent - one of the two neighbours
+        it is connected to, which is a starting or ending point or has a smaller label. Following the parents
+        the labels decrease, so every cell leads to a starting or ending point and a cycle without them is impossible.
+        Every solution satisfies the clauses with labels = distance from the starting point of the path.
+        :return: generator of clauses
+        """
+
+        # neighbours in the direction of the openings of the signs, 1 = │, 2 = ─, 3 = ┘, 4 = └, 5 = ┐, 6 = ┌
+        openings = {(-1, 0): [1, 3, 4], (1, 0): [1, 5, 6], (0, -1): [2, 3, 5], (0, 1): [2, 4, 6]}
+
+        cells = [(i, j) for i in range(self.height) for j in range(self.width)
+                 if (i, j) not in self.start_end_points_locs]
+        bits = len(cells).bit_length()
+
+        # bit 0 is the most significant one
+        labels = {cell: self.variables.new_variables(bits) for cell in cells}
+
+        # equal_prefix[(a, b)] + k is true only if the labels of a and b are equal in the bits 0..k
+        equal_prefix = {}
+
+        for i, j in cells:
+            parents = []
+
+            for (di, dj), directions in openings.items():
+                i1, j1 = i + di, j + dj
+                if not (0 <= i1 < self.height and 0 <= j1 < self.width):
+                    continue
+
+                parent = self.variables.new_variables(1)
+                parents.append(parent)
+
+                # 5. The parent is connected to the cell.
+                yield [-parent] + [self.variables[(i, j, p, d)]
+                                   for p in range(1, self.number_of_paths + 1) for d in directions]
+
+                if (i1, j1) in self.start_end_points_locs:
+                    continue
+
+                # 6. The parent has a smaller label - the labels are equal before the first different bit k,
+                # which is 0 in the label of the parent and 1 in the label of the cell.
+                pair = tuple(sorted([(i, j), (i1, j1)]))
+                if pair not in equal_prefix:
+                    equal_prefix[pair] = self.variables.new_variables(bits - 1) if bits > 1 else 0
+                    first = equal_prefix[pair]
+                    a, b = labels[pair[0]], labels[pair[1]]
+                    for k in range(bits - 1):
+                        if k > 0:
+                            yield [-(first + k), first + k - 1]
+                        yield [-(first + k), -(a + k), b + k]
+                        yield [-(first + k), a + k, -(b + k)]
+
+                first_different = self.variables.new_variables(bits)
+                yield [-parent] + list(range(first_different, first_different + bits))
+                for k in range(bits):
+                    yield [-(first_different + k), -(labels[(i1, j1)] + k)]
+                    yield [-(first_different + k), labels[(i, j)] + k]
+                    if k > 0:
+                        yield [-(first_different + k), equal_prefix[pair] + k - 1]
+
+            # 7. Every non starting and ending point has a parent.
+            yield parents
+
+    def iter_cycle_clauses(self, cycles):
+        """
+        Yields clauses eliminating the cycles found by cycle_detect - the cycle cells must not all have
+        the same directions (4D, acyclic) or the same path (3D) again, for every path.
+        The clauses of a simplified board are mapped to the simplified variables.
+        :param cycles: list of cycles, cycle is list or array of (i, j, p, d) cells
+        :return: generator of clauses
+        """
+        if self.simplification is not None:
+            yield from self.simplification.map_clauses(self._iter_cycle_clauses(cycles))
+        else:
+            yield from self._iter_cycle_clauses(cycles)
+
+    def _iter_cycle_clauses(self, cycles):
+        paths = np.arange(1, self.number_of_paths + 1)
+        for cycle in cycles:
+            cells = np.unique(np.asarray(cycle, dtype=np.int64).reshape(-1, 4), axis=0)
+            i, j, d = cells[:, 0], cells[:, 1], cells[:, 3] if self.theory != "3D" else 0
+            # clause of the path p = row p - 1
+            clauses = -self.variables.encode_array(i, j, paths[:, None], d)
+            # the path p cannot occupy some of the cells, the clause is satisfied
+            if self.variables.false_variable is not None:
+                clauses = clauses[~(clauses == -self.variables.false_variable).any(axis=1)]
+            yield from clauses.tolist()
+
+    def iter_solution_clauses(self, solutions):
+        """
+        Yields clauses blocking the solutions found by the enumeration - the cells which are not starting
+        or ending points must not all have the same directions (4D, acyclic) or the same paths (3D) again.
+        The auxiliary variables are not blocked, so every solution is found once.
+        The clauses of a simplified board are mapped to the simplified variables.
+        :param solutions: list of solutions, solution is list or array of (i, j, p, d) cells, see Solution.assignment
+        :return: generator of clauses
+        """
+        if self.simplification is not None:
+            yield from self.simplification.map_clauses(self._iter_solution_clauses(solutions))
+        else:
+            yield from self._iter_solution_clauses(solutions)
+
+    def _iter_solution_clauses(self, solutions):
+        for solution in solutions:
+            cells = np.asarray(solution, dtype=np.int64).reshape(-1, 4)
+            d = cells[:, 3] if self.theory != "3D" else 0
+            clause = -self.variables.encode_array(cells[:, 0], cells[:, 1], cells[:, 2], d)
+            # some cell cannot have the path, the solution is not a solution of this board
+            if self.variables.false_variable is not None and (clause == -self.variables.false_variable).any():
+                continue
+            yield clause.tolist()
 
     def generate_all_clauses_3D(self, echo=False):
         """
@@ -470,15 +653,9 @@ class NumberlinkBoard:
         :return:
         """
 
-        counter = 1
-        for i in range(self.height):
-            for j in range(self.width):
-                for p in range(1, self.number_of_paths + 1):
-                    if (i, j, p, 0) not in self.all_clauses:
-                        self.all_clauses[(i, j, p, 0)] = counter
-                        counter += 1
+        self.variables = VariableLayout3D(self.height, self.width, self.number_of_paths)
         if echo:
-            print(f"All clauses generated. [{len(self.all_clauses)}]")
+            print(f"All clauses generated. [{len(self.variables)}]")
 
     def generate_clausess_3D(self, echo=False, _extra_clauses = []):
         """
@@ -486,45 +663,93 @@ class NumberlinkBoard:
         :param echo:
         :return:
         """
+        self.extend_clauses_3D(_extra_clauses)
+        self.clauses.remove_subsumed()
+        if echo:
+            print(f"Clauses generated. [{len(self.clauses)}]")
+            print(f"Redundant clauses removed. [{self.clauses.number_of_removed}] {self.clauses.removed}")
+
+    def extend_clauses_3D(self, _extra_clauses = []):
+        """
+        Stores clauses for 3D theory, the per-cell rules are generated by numpy for the pairwise encoding.
+        :param _extra_clauses: extra clauses to eliminate cycles
+        :return:
+        """
+        if not self.vectorized or self.cardinality_encoding != "pairwise":
+            self.clauses.extend(self.iter_clauses_3D(_extra_clauses))
+            return
+
+        self.clauses.extend(self.iter_fixed_clauses_3D(_extra_clauses))
+        for clauses in clause_arrays_3D(self):
+            self.clauses.extend_array(clauses)
+        for i, j in self.start_end_points_locs:
+            self.clauses.extend(self.iter_endpoint_clauses_3D(i, j))
+
+    def iter_fixed_clauses_3D(self, _extra_clauses = []):
+        """
+        Yields clauses eliminating the cycles, unit clauses of the starting and ending points
+        and clauses of the forced moves for 3D theory.
+        :param _extra_clauses: extra clauses to eliminate cycles
+        :return: generator of clauses
+        """
 
         # 0. Add clauses to eliminate cycles
-        if len(_extra_clauses) != 0:
-            for cycle in _extra_clauses:
-                cycle = set(cycle)
+        yield from self.iter_cycle_clauses(_extra_clauses)
+
+
+        # 1. All starting and ending points are fixed.
+        # - unit clauses go first, so that the clause store drops the clauses they subsume
+        for i, j in self.start_end_points_locs:
+            path = int(self.board[i][j])
+            yield [self.variables[(i, j, path, 0)]]
+            for _clause in self.variables.cell_variables(i, j):
+                if _clause[0][2] != path:
+                    yield [-_clause[1]]
+
+        # 1b. Cells with a forced link belong to the same path.
+        if self.forced_moves is not None:
+            for (i1, j1), (i2, j2) in self.forced_moves.iter_links():
                 for p in range(1, self.number_of_paths + 1):
-                    clause = []
-                    for extra_clause in cycle:
-                        i1, j1, p1, d1 = extra_clause
-                        clause.append(-self.all_clauses[(i1, j1, p, 0)])
-                    self.clauses.append(clause)
+                    yield [-self.variables[(i1, j1, p, 0)], self.variables[(i2, j2, p, 0)]]
+                    yield [self.variables[(i1, j1, p, 0)], -self.variables[(i2, j2, p, 0)]]
+
+    def iter_endpoint_clauses_3D(self, i, j):
+        """
+        Yields clauses of the starting or ending point i, j for 3D theory - it has one neighbor with the same path.
+        - this ensures that path will not connect back to itself
+        - this constraint eliminates some possible solution, especially zigzag ines
+        :return: generator of clauses
+        """
+        for p in range(1, self.number_of_paths + 1):
+            if (i, j) in self.start_end_points[p]:
+                neighbors = self.get_neighbors(i, j)
+
+                # At least one neighbor is in the same path
+                _clause = [self.variables[(n[0], n[1], p, 0)] for n in neighbors]
+                yield _clause
 
+                # At most one neighbor is in the same path
+                yield from at_most_one(_clause, self.variables, self.cardinality_encoding)
+
+    def iter_clauses_3D(self, _extra_clauses = []):
+        """
+        Yields clauses for 3D theory one by one.
+        :param _extra_clauses: extra clauses to eliminate cycles
+        :return: generator of clauses
+        """
+        yield from self.iter_fixed_clauses_3D(_extra_clauses)
 
         # Iterate over all cells in the number link board.
         for i in range(self.height):
             for j in range(self.width):
 
-                # 1. All starting and ending points are fixed.
-                if self.board[i][j] != ".":
-                    path = int(self.board[i][j])
-                    self.clauses.append([self.all_clauses[(i, j, path, 0)]])
-                    for _clause in self.all_clauses.items():
-                        if _clause[0][0] == i and _clause[0][1] == j and _clause[0][2] != path:
-                            self.clauses.append([-_clause[1]])
-
                 # 2. Every cell which is not start or end point has exactly one path.
                 if (i, j) not in self.start_end_points_locs:
-                    # At least one path is in the cell
+                    # At least one path is in the cell and at most one path is in the cell
                     _clause = []
                     for p in range(1, self.number_of_paths + 1):
-                        _clause.append(self.all_clauses[(i, j, p, 0)])
-                    self.clauses.append(_clause)
-
-                    # At most one path is in the cell
-                    for p1 in range(1, self.number_of_paths + 1):
-                        for p2 in range(1, self.number_of_paths + 1):
-                            if p1 != p2:
-                                _clause = [-self.all_clauses[(i, j, p1, 0)], -self.all_clauses[(i, j, p2, 0)]]
-                                self.clauses.append(_clause)
+                        _clause.append(self.variables[(i, j, p, 0)])
+                    yield from exactly_one(_clause, self.variables, self.cardinality_encoding)
 
                 # 3. Points which are not start or end points have exactly two neighbors with same path.
                 if (i, j) not in self.start_end_points_locs:
@@ -549,11 +774,11 @@ class NumberlinkBoard:
                         # every time we say that if (i, j, p, 0) is true, then at least one from each combination must be true and since every 2 combinations
                         # have len(combination) - 1 common neighbors, we can say that at least 2 neighbors must be true
                         # if only one neighbor is true, despite that if we iterate over all combinations we will get that at least 2 neighbors must be true
-                        for _neighbors in itertools.combinations(neighbors, len(neighbors) - 1):
-                            _clause = [-self.all_clauses[(i, j, p, 0)]]
-                            for _n in _neighbors:
-                                _clause.append(self.all_clauses[(_n[0], _n[1], p, 0)])
-                            self.clauses.append(_clause)
+                        # (with the pairwise encoding, the other encodings use auxiliary variables)
+                        current_cell = self.variables[(i, j, p, 0)]
+                        _neighbors = [self.variables[(_n[0], _n[1], p, 0)] for _n in neighbors]
+                        yield from at_least_k(_neighbors, 2, self.variables, self.cardinality_encoding,
+                                              condition=current_cell)
 
                         # Adding path and direction to neighbor tuple.
                         _ = []
@@ -563,36 +788,15 @@ class NumberlinkBoard:
                         neighbors = _
 
                         # At most 2 neighbors are true.
-                        for n1 in neighbors:
-                            for n2 in neighbors:
-                                for n3 in neighbors:
-                                    if n1 != n2 and n1 != n3 and n2 != n3:
-                                        self.clauses.append([-self.all_clauses[(i, j, p, 0)], -self.all_clauses[n1], -self.all_clauses[n2], -self.all_clauses[n3]])
+                        yield from at_most_k(_neighbors, 2, self.variables, self.cardinality_encoding,
+                                             condition=current_cell)
 
                         if len(neighbors) == 4:
-                            self.clauses.append([-self.all_clauses[(i, j, p, 0)], -self.all_clauses[neighbors[0]], -self.all_clauses[neighbors[1]], -self.all_clauses[neighbors[2]], -self.all_clauses[neighbors[3]]])
+                            yield [-self.variables[(i, j, p, 0)], -self.variables[neighbors[0]], -self.variables[neighbors[1]], -self.variables[neighbors[2]], -self.variables[neighbors[3]]]
 
                 # 4. Every starting and ending point has one neighbor with the same path.
-                # - this ensures that path will not connect back to itself
-                # - this constraint eliminates some possible solution, especially zigzag ines
-                for p in range(1, self.number_of_paths + 1):
-                    if (i, j) in self.start_end_points[p]:
-                        neighbors = self.get_neighbors(i, j)
-
-                        # At least one neighbor is in the same path
-                        _clause = [self.all_clauses[(n[0], n[1], p, 0)] for n in neighbors]
-                        self.clauses.append(_clause)
-
-                        # At most one neighbor is in the same path
-                        for n1 in neighbors:
-                            for n2 in neighbors:
-                                if n1 != n2:
-                                    self.clauses.append([
-                                        -self.all_clauses[(n1[0], n1[1], p, 0)],
-                                        -self.all_clauses[(n2[0], n2[1], p, 0)]])
-
-        if echo:
-            print(f"Clauses generated. [{len(self.clauses)}]")
+                if (i, j) in self.start_end_points_locs:
+                    yield from self.iter_endpoint_clauses_3D(i, j)
 
     def print_clauses_variables(self, clause):
         """
@@ -603,14 +807,14 @@ class NumberlinkBoard:
 
         result = ""
         for c in clause:
-            # find key by value
-            index = abs(c)
-            for key, value in self.all_clauses.items():
-                if value == index:
-                    if c < 0:
-                        result += "-" + str(key) + " "
-                    else:
-                        result += str(key) + " "
+            if abs(c) > self.variables.base_count:
+                key = f"aux{abs(c)}"
+            else:
+                key = self.variables.decode(abs(c))
+            if c < 0:
+                result += "-" + str(key) + " "
+            else:
+                result += str(key) + " "
 
         print(result)
 
@@ -632,62 +836,207 @@ class NumberlinkBoard:
             neighbors.append((i, j + 1))
         return neighbors
 
+    def get_cnf_filename(self, filename):
+        """
+        Returns relative path to the CNF file of the instance.
+        :param filename:
+        :return:
+        """
+        filename = filename.split("/")[-1].split(".")[0]
+        extension = CNF_EXTENSIONS[self.cnf_format]
+        if self.cnf_key:
+            return f"{self.cnf_dir_name}/{self.theory}-{filename}-{self.cnf_key}{extension}"
+        return f"{self.cnf_dir_name}/{self.theory}-{filename}{extension}"
+
+    def open_dimacs_stream(self, filename):
+        """
+        Switches to streaming mode - clauses are written to the DIMACS file while they are generated
+        instead of being kept in self.clauses. Must be called before the clauses are generated.
+        The binary format cannot be streamed.
+        :param filename:
+        :return:
+        """
+        if self.cnf_format == "binary":
+            raise ValueError("The binary CNF format needs the clauses in memory, it cannot be streamed.")
+        self.clauses = ClauseStore(DimacsWriter(self.get_cnf_filename(filename)), self.clauses.deduplicate,
+                                   self.clauses.false_variable)
+
+    def prune_domains(self, echo=False, forced_moves=False):
+        """
+        Restricts the variables to the cells every path can reach, must be called after generate_all_clauses_*
+        and before the clauses are generated. Detects boards which have no solution, see domains.unsat_reason.
+        :param echo: print status
+        :param forced_moves: deduce the forced moves, the cells they fix keep the variables of a single path
+        and the 4D theory gets unit clauses for their signs, see domains.ForcedMoves
+        :return:
+        """
+        self.domains = path_domains(self)
+        if forced_moves:
+            self.forced_moves = ForcedMoves(self, self.domains)
+            self.domains = self.forced_moves.domains
+            if echo:
+                print(f"Forced moves deduced. {self.forced_moves.statistics}")
+        if self.forced_moves is not None and self.forced_moves.contradiction is not None:
+            self.unsat_reason = self.forced_moves.contradiction
+        else:
+            self.unsat_reason = unsat_reason(self, self.domains)
+
+        base_count = self.variables.base_count
+        self.variables = PrunedLayout(self.variables, self.domains)
+        self.clauses.false_variable = self.variables.false_variable
+        if echo:
+            print(f"Domains pruned. [{base_count} -> {self.variables.base_count}] variables")
+            if self.unsat_reason is not None:
+                print(f"No solution: {self.unsat_reason}")
+
+    def load_cached_dimacs(self, filename):
+        """
+        Uses already generated DIMACS file instead of generating the clauses.
+        The clauses are read from the file only when iterated, the variables must be already generated.
+        :param filename:
+        :return:
+        """
+        if self.cnf_format == "binary":
+            # memory-mapped, nothing is parsed
+            reader = ClauseBuffer.load_binary(self.get_cnf_filename(filename))
+        else:
+            reader = DimacsReader(self.get_cnf_filename(filename))
+        self.clauses = ClauseStore(reader, self.clauses.deduplicate, self.clauses.false_variable)
+        # auxiliary variables of the encodings
+        self.variables.count = reader.num_variables
+
     def save_to_dimacs(self, filename):
         """
-        Saves clauses to DIMACS format.
+        Saves clauses to DIMACS format, gzip-compressed DIMACS or the binary format by self.cnf_format.
+        In streaming mode only the header is patched.
         """
 
-        filename = filename.split("/")[-1].split(".")[0]
-        num_variables = len(self.all_clauses)
-        num_clauses = len(self.clauses)
-        with open(f"CNFS/{self.theory}-{filename}.cnf", "w") as file:
-            file.write(f"p cnf {num_variables} {num_clauses}\n")
-            for clause in self.clauses:
-                file.write(" ".join(map(str, clause)) + " 0\n")
+        if isinstance(self.clauses.target, DimacsWriter):
+            self.clauses.target.close(self.number_of_cnf_variables)
+            return
+        if isinstance(self.clauses.target, DimacsReader):
+            return
+
+        if self.cnf_format == "binary":
+            buffer = self.clauses.target if isinstance(self.clauses.target, ClauseBuffer) else ClauseBuffer(self.clauses)
+            buffer.save_binary(self.get_cnf_filename(filename), self.number_of_cnf_variables)
+            return
+
+        writer = DimacsWriter(self.get_cnf_filename(filename), self.number_of_cnf_variables, len(self.clauses))
+        writer.extend(self.clauses)
+        writer.close(self.number_of_cnf_variables)
+
+    @property
+    def number_of_cnf_variables(self) -> int:
+        """
+        :return: number of variables of the formula given to the solver, less than len(self.variables)
+        when the board is simplified
+        """
+        return self.simplification.count if self.simplification is not None else len(self.variables)
+
+    def simplify(self, pure_literals: bool = True, echo: bool = False):
+        """
+        Simplifies the generated clauses by unit propagation and pure literal elimination and renumbers the
+        remaining variables. Models of the simplified formula are mapped back by get_true_variables.
+        :param pure_literals: whether to eliminate pure literals
+        :param echo: print how much the formula shrank
+        :return:
+        """
+        if not self.clauses.in_memory:
+            raise ValueError("Only clauses kept in memory can be simplified.")
+
+        self.simplification = Simplification(self.clauses, len(self.variables), pure_literals)
+        self.clauses = ClauseStore(self.simplification.clauses, self.clauses.deduplicate)
+
+        if echo:
+            statistics = self.simplification.statistics
+            print(f"Simplified: variables {statistics['variables']} -> {statistics['simplified variables']}, "
+                  f"clauses {statistics['clauses']} -> {statistics['simplified clauses']}, "
+                  f"literals {statistics['literals']} -> {statistics['simplified literals']} "
+                  f"[{statistics['units']} units, {statistics['pure literals']} pure literals]")
 
     def retrieve_paths_from_models(self, models):
         """
-        Retrieves paths from models.
+        Decodes the true variables of the model in one pass, the paths and the printed boards are computed
+        from board.solution when they are first used.
         :param models:
         :return:
         """
+        self.solution = Solution(self, self.true_clauses)
+        self._views = {}
 
-        # construct empty paths
-        for i in range(1, self.number_of_paths + 1):
-            self.paths[i] = []
+    def clear_solution(self):
+        """
+        Forgets the decoded solution, so that the board can decode the next model of the same formula.
+        :return:
+        """
+        self.true_clauses = []
+        self.solution = None
+        self._views = {}
 
-        for true_clause in self.true_clauses:
-            i, j, p, d = true_clause
-            self.paths[p].append((i, j))
+    def _solution_view(self, name: str, default):
+        if name in self._views:
+            return self._views[name]
+        return getattr(self.solution, name) if self.solution is not None else default
+
+    @property
+    def paths(self) -> dict:
+        """
+        :return: dictionary path -> cells from the starting to the ending point, see Solution.paths
+        """
+        return self._solution_view("paths", {})
+
+    @paths.setter
+    def paths(self, value: dict):
+        self._views["paths"] = value
+
+    @property
+    def numbered_board(self) -> list:
+        return self._solution_view("numbered_board", [])
+
+    @numbered_board.setter
+    def numbered_board(self, value: list):
+        self._views["numbered_board"] = value
+
+    @property
+    def direction_board_list(self) -> list:
+        return self._solution_view("direction_board_list", [])
+
+    @direction_board_list.setter
+    def direction_board_list(self, value: list):
+        self._views["direction_board_list"] = value
+
+    @property
+    def direction_board_string(self) -> str:
+        return self._solution_view("direction_board_string", "")
+
+    @direction_board_string.setter
+    def direction_board_string(self, value: str):
+        self._views["direction_board_string"] = value
 
     def get_true_variables(self, models, _print=False):
         """
         Retrieves true clauses from models.
-        :param models:
+        :param models: Model or the "v ... 0" line of the solver output
         :param _print:
         :return:
         """
 
-        models = map(int, models.split(" ")[1:-1])
+        if isinstance(models, str):
+            # skip the leading "v" and decode all positive literals at once
+            literals = np.array(models.split()[1:], dtype=np.int64)
+        else:
+            # Model parsed from the solver output
+            literals = models.true_variables()
+        if self.simplification is not None:
+            literals = self.simplification.true_variables(literals[literals > 0])
+        true_vars = self.variables.decode_model(literals)
+        self.true_clauses.extend(true_vars)
 
         if _print:
             print("-" * 50)
-
-        for model in models:
-            abs_model = abs(model)  # Compute absolute value once
-            if model > 0:  # Only consider positive models
-                true_vars = [
-                    (i, j, p, d)
-                    for (i, j, p, d), var in self.all_clauses.items()
-                    if var == abs_model
-                ]
-                self.true_clauses.extend(true_vars)  # Add all matching variables
-
-                if _print:
-                    for (i, j, p, d) in true_vars:
-                        print(f"Variable {abs_model} is True: {i, j, p, d}")
-
-        if _print:
+            for (i, j, p, d) in true_vars:
+                print(f"Variable {self.variables[(i, j, p, d)]} is True: {i, j, p, d}")
             print("-" * 50)
 
     def print_paths(self):
@@ -701,76 +1050,27 @@ class NumberlinkBoard:
     def print_modified_board(self, _true_claues: [], print_numbered_board=True, print_direction_board_list=True,
                              print_direction_board_string=True, print_heatmap=True):
         """
-        Method responsible for visualization of solutions.
+        Method responsible for visualization of solutions. The boards are rendered only when they are printed.
+        :param _true_claues: true variables decoded when retrieve_paths_from_models was not called
         :param print_numbered_board:
         :param print_direction_board_list:
         :param print_direction_board_string:
         :param print_heatmap:
         :return:
         """
-
-        # deep copy of board
-        modified_board = [row[:] for row in self.board]
-        modified_board2 = [row[:] for row in self.board]
-
-        for path, cells in self.paths.items():
-            for cell in cells:
-                modified_board[cell[0]][cell[1]] = path
-                modified_board2[cell[0]][cell[1]] = str(path)
-
-        board_string = ""
-
-        if self.theory == "3D":
-            modified_board2 = self.get_direction_board(modified_board)
-        else:
-            for true_var in _true_claues:
-                i, j, p, d = true_var
-                if d != 0:
-                    modified_board2[i][j] = self.direction_signs[d - 1]
-
-        def correct_formatting(_board):
-            """
-            This function takes a board and corrects the formatting of the board so that all the cells have the same length.
-            :param _board: list of lists of strings
-            :return: list of lists of strings
-            """
-            modified_board = [row[:] for row in _board]
-
-            for width in range(len(_board[0])):
-                max_len_in_column = 0
-                for height in range(len(_board)):
-                    max_len_in_column = max(max_len_in_column, len(_board[height][width]))
-
-                for height in range(len(_board)):
-                    if len(_board[height][width]) < max_len_in_column:
-                        modified_board[height][width] = " " * (max_len_in_column - len(_board[height][width])) + \
-                                                        _board[height][width]
-
-            return modified_board
-
-        formated_modified_board = correct_formatting(modified_board2)
-
-        for i in range(self.height):
-            for j in range(self.width):
-                board_string += str(formated_modified_board[i][j])
-            board_string += "\n"
-
-        self.result_board1 = modified_board
-        self.direction_board_string = board_string
-        self.direction_board_list = modified_board2
-        self.numbered_board = modified_board
+        solution = self.solution if self.solution is not None else Solution(self, _true_claues)
 
         if print_numbered_board:
-            self.print_board(modified_board)
+            self.print_board(solution.numbered_board)
             print()
         if print_direction_board_list:
-            self.print_board(modified_board2)
+            self.print_board(solution.direction_board_list)
             print()
         if print_direction_board_string:
-            print(board_string)
+            print(solution.direction_board_string)
 
         if print_heatmap:
-            self.get_heatmap(modified_board)
+            self.get_heatmap(solution.numbered_board)
 
     def get_heatmap(self, modified_board: []):
         """
@@ -814,137 +1114,13 @@ class NumberlinkBoard:
 
         plt.show()
 
-    def get_direction_board(self, _board):
-        """
-        Generates direction board for 3D theory.
-        :param _board:
-        :return:
-        """
-
-        modified_board = [row[:] for row in self.board]
-
-        signs = ["│", "─", "┘", "└", "┐", "┌"]
-        solved = set()
-
-        # set corners
-        if self.board[0][0] == ".":
-            modified_board[0][0] = "┌"
-            solved.add((0, 0))
-        if self.board[0][self.width - 1] == ".":
-            modified_board[0][self.width - 1] = "┐"
-            solved.add((0, self.width - 1))
-        if self.board[self.height - 1][0] == ".":
-            modified_board[self.height - 1][0] = "└"
-            solved.add((self.height - 1, 0))
-        if self.board[self.height - 1][self.width - 1] == ".":
-            modified_board[self.height - 1][self.width - 1] = "┘"
-            solved.add((self.height - 1, self.width - 1))
-
-        for i in range(self.height):
-            for j in range(self.width):
-                if (i, j) not in self.start_end_points_locs and (i, j) not in solved:
-                    for p in range(1, self.number_of_paths + 1):
-                        if (i, j) in solved:
-                            break
-                        else:
-
-                            try:
-                                if _board[i][j] == _board[i + 1][j] and _board[i][j] == _board[i][j + 1]:
-                                    # print(_board[4][1], _board[3][1], _board[3][2])
-                                    modified_board[i][j] = "┌"
-                                    solved.add((i, j))
-                                    continue
-                            except:
-                                pass
-        for i in range(self.height):
-            for j in range(self.width):
-                if (i, j) not in self.start_end_points_locs and (i, j) not in solved:
-                    for p in range(1, self.number_of_paths + 1):
-                        if (i, j) in solved:
-                            break
-                        else:
-                            try:
-
-                                if j - 1 < 0:
-                                    continue
-
-                                if _board[i][j] == _board[i + 1][j] and _board[i][j] == _board[i][j - 1]:
-                                    modified_board[i][j] = "┐"
-                                    solved.add((i, j))
-                                    continue
-                            except:
-                                pass
-        for i in range(self.height):
-            for j in range(self.width):
-                if (i, j) not in self.start_end_points_locs and (i, j) not in solved:
-                    for p in range(1, self.number_of_paths + 1):
-                        if (i, j) in solved:
-                            break
-                        else:
-                            try:
-
-                                if i - 1 < 0:
-                                    continue
-                                if _board[i][j] == _board[i - 1][j] and _board[i][j] == _board[i][j + 1]:
-
-
-                                    modified_board[i][j] = "└"
-                                    solved.add((i, j))
-                                    continue
-
-                            except:
-                                pass
-
-        for i in range(self.height):
-            for j in range(self.width):
-                if (i, j) not in self.start_end_points_locs and (i, j) not in solved:
-                    for p in range(1, self.number_of_paths + 1):
-                        if (i, j) in solved:
-                            break
-                        else:
-
-                            try:
-                                if i - 1 < 0 or j - 1 < 0:
-                                    continue
-
-                                if _board[i][j] == _board[i - 1][j] and _board[i][j] == _board[i][j - 1]:
-                                    modified_board[i][j] = "┘"
-                                    solved.add((i, j))
-                                    continue
-                            except:
-                                pass
-
-        for i in range(self.height):
-            for j in range(self.width):
-                if (i, j) not in self.start_end_points_locs and (i, j) not in solved:
-                    for p in range(1, self.number_of_paths + 1):
-                        if (i, j) in solved:
-                            break
-                        else:
-                            try:
-                                if _board[i][j] == _board[i + 1][j]:
-                                    modified_board[i][j] = "│"
-                                    solved.add((i, j))
-                                    continue
-                            except:
-                                pass
-
-                            try:
-                                if _board[i][j] == _board[i][j + 1]:
-                                    modified_board[i][j] = "─"
-                                    solved.add((i, j))
-                                    continue
-                            except:
-                                pass
-        return modified_board
-
     def get_cnf_path(self, instance_path: str):
         """
         Returns path to CNF file.
         :param instance_path:
         :return:
         """
-        return str(os.getcwd()) + "/" + "CNFS/" + f"{self.theory}-{instance_path.split("/")[-1].split(".")[0]}.cnf"
+        return os.path.join(os.getcwd(), self.get_cnf_filename(instance_path))
 
     def exit(self):
         print("Error: Invalid input.")
@@ -1,180 +1,148 @@
 from numberlink import *
-
-def run_glucose(instance_cnf_path: str, glucose_executable_path: str, echo: bool = False) -> tuple:
+import multiprocessing
+import queue
+import signal
+import time
+from cardinality import CARDINALITY_ENCODINGS
+from cache import CnfCache
+from dimacs import dimacs_chunks, open_text
+import solvers
+from solvers import (SOLVER_BACKENDS, GlucoseBackend, Model, PysatBackend, Status, create_backend, parse_solver_output,
+                     run_glucose, solvable_mark)
+from tracing import Tracer
+
+# Numbers of the encodings as in README, "3D+4D" is not a separate encoding.
+THEORY_NUMBERS = {"3D": 1, "4D": 2, "acyclic": 3}
+
+# Contenders of run_portfolio, each is solved in its own process. Missing options have the run_sat defaults.
+DEFAULT_PORTFOLIO = [{"theory": "3D"}, {"theory": "4D"}]
+
+def load_board(instance_path: str, theory_name: str, echo: bool = False, tracer: Tracer = None, prune: bool = False,
+               forced_moves: bool = False):
     """
-    Starts SAT solver.
-    :param instance_cnf_path: path to the instance in DIMACS format (.cnf)
-    :param glucose_executable_path: path to the executable of the SAT solver
-    :return:
+    Loads the board and generates the variables of the selected theory, no clauses are generated.
+    The board can decode models of the theory.
+    With prune=True the variables are restricted to the cells every path can reach, see NumberlinkBoard.prune_domains.
+    forced_moves=True deduces the forced moves too and implies prune.
     """
-
-    try:
-        if echo: print(f"Running SAT solver on {instance_cnf_path} with {glucose_executable_path}")
-
-        result = subprocess.run([rf"{glucose_executable_path}", '-model', f"{instance_cnf_path}"],
-                                stdout=subprocess.PIPE)
-
-        sat_output = result.stdout.decode('utf-8').strip()
-        sat_output_lines = sat_output.split("\n")
-
-        instace_result = 0
-        model = "No model"
-
-        if "s" in sat_output_lines[-1]:
-            instace_result = 0  # 0 = unsatisfiable
-            model = "No model"
-
-        elif "v" in sat_output_lines[-1]:
-            instace_result = 1  # 1 = satisfiable
-            model = sat_output_lines[-1]
-
-        if echo: print(f"Glucose finished with result {instace_result}")
-
-        return instace_result, model, sat_output
-
-    except FileNotFoundError:
-        print("Executable not found at the specified path.")
-    except Exception as e:
-        print(f"An error occurred: {e}")
-
-def select_theory(instance_path: str, theory_name: str, echo: bool = False, _extra_clauses = []):
-    """Generates clauses for selected theory and saves to DIMACS format."""
-    _board = NumberlinkBoard(f"{instance_path}")
+    tracer = tracer or Tracer()
+    with tracer.phase("parse"):
+        _board = NumberlinkBoard(f"{instance_path}")
 
     if theory_name == "4D":
         _board.theory = "4D"
-        _board.generate_all_clauses_4D(echo)
-        _board.generate_clauses_4D(echo, _extra_clauses)
-
-    elif theory_name == "3D":
+    elif theory_name == "3D" or theory_name == "3D+4D":
         _board.theory = "3D"
-        _board.generate_all_clauses_3D(echo)
-        _board.generate_clausess_3D(echo, _extra_clauses)
+    elif theory_name == "acyclic":
+        _board.theory = "acyclic"
 
-    elif theory_name == "3D+4D":
-        _board.theory = "3D"
-        _board.generate_all_clauses_3D(echo)
-        _board.generate_clausess_3D(echo, _extra_clauses)
+    with tracer.phase("variables"):
+        if _board.theory == "4D":
+            _board.generate_all_clauses_4D(echo)
+        elif _board.theory == "3D":
+            _board.generate_all_clauses_3D(echo)
+        elif _board.theory == "acyclic":
+            _board.generate_all_clauses_acyclic(echo)
 
-    _board.save_to_dimacs(f"{instance_path}.cnf")
+    if prune or forced_moves:
+        with tracer.phase("prune"):
+            _board.prune_domains(echo, forced_moves)
 
     return _board
 
-def cycle_detect(_board):
+def select_theory(instance_path: str, theory_name: str, echo: bool = False, _extra_clauses = [], stream: bool = False,
+                  cardinality: str = "pairwise", deduplicate: bool = None, cache: CnfCache = None,
+                  tracer: Tracer = None, save: bool = True, simplify: bool = False, prune: bool = False,
+                  forced_moves: bool = False, cnf_format: str = "dimacs"):
     """
-    Detects cycles in the solved board and returns the clauses to break them = their negation is used for sat solver.
-    :param _board:
-    :return:
+    Generates clauses for selected theory and saves to DIMACS format.
+    With stream=True the clauses are written to the file while they are generated and never kept in memory.
+    cardinality selects the encoding of the exactly-one and at-most constraints, see CARDINALITY_ENCODINGS.
+    deduplicate=False turns off the removal of duplicate clauses, which keeps the literals of every stored clause
+    in memory. By default duplicates are removed unless the clauses are streamed - streaming would not save memory.
+    With cache the DIMACS file is saved to the cache directory and on a cache hit the clauses are not generated,
+    they are read from the cached file when needed.
+    With tracer the phases parse, variables, clauses and dimacs are recorded.
+    save=False keeps the clauses only in memory, nothing is written to disk.
+    simplify=True runs unit propagation and pure literal elimination before the clauses are saved.
+    prune=True generates variables and clauses only for the cells every path can reach.
+    forced_moves=True fixes the cells and signs deduced by the forced moves, implies prune.
+    cnf_format selects the format of the CNF file - "dimacs", "gzip" or "binary", see CNF_EXTENSIONS.
     """
+    if cnf_format not in CNF_EXTENSIONS:
+        raise ValueError(f"Unknown CNF format {cnf_format}, use one of {list(CNF_EXTENSIONS)}.")
+    if not save and (stream or cache is not None):
+        raise ValueError("The clauses must be saved to the CNF file with stream or cache.")
+    if simplify and (stream or cache is not None):
+        raise ValueError("Only clauses kept in memory can be simplified, not with stream or cache.")
+
+    if deduplicate is None:
+        deduplicate = not stream
+
+    tracer = tracer or Tracer()
+    _board = load_board(instance_path, theory_name, echo, tracer, prune, forced_moves)
+    _board.cardinality_encoding = cardinality
+    _board.clauses.deduplicate = deduplicate
+    _board.cnf_format = cnf_format
+
+    # no solution, the solver is not needed
+    if _board.unsat_reason is not None:
+        return _board
+
+    if cache is not None:
+        _board.cnf_dir_name = cache.directory
+        _board.cnf_key = cache.key(_board, _board.theory, cardinality, deduplicate, _extra_clauses, prune,
+                                   forced_moves)
+        if cache.lookup(_board.get_cnf_filename(instance_path)):
+            if echo: print(f"Cache hit. [{_board.get_cnf_filename(instance_path)}]")
+            _board.load_cached_dimacs(instance_path)
+            return _board
+
+    if stream:
+        _board.open_dimacs_stream(f"{instance_path}.cnf")
+
+    with tracer.phase("clauses"):
+        if _board.theory == "4D":
+            _board.generate_clauses_4D(echo, _extra_clauses)
+        elif _board.theory == "3D":
+            _board.generate_clausess_3D(echo, _extra_clauses)
+        elif _board.theory == "acyclic":
+            _board.generate_clauses_acyclic(echo, _extra_clauses)
+
+    if simplify:
+        with tracer.phase("simplify"):
+            _board.simplify(echo=echo)
+
+    if save:
+        with tracer.phase("dimacs"):
+            _board.save_to_dimacs(f"{instance_path}.cnf")
+
+    if cache is not None:
+        cache.store(_board.get_cnf_filename(instance_path))
 
-    _paths = dict()
-
-    for path in range(1, _board.number_of_paths + 1):
-
-        _paths[path] = []
-        signs = {"│": 1, "─": 2, "┘": 3, "└": 4, "┐": 5, "┌": 6}
-        se_point = _board.start_end_points[path]
-        start = se_point[0]
-        end = se_point[1]
-        j1 = j1 = 0
-
-        _paths[path].append((start[0], start[1]))
-
-        neigbors = _board.get_se_points_neigbors(start[0], start[1], path)
-        n = neigbors[0]
-
-        for neighbor in neigbors:
-            # check if it is real one
-            i1, j1, p1, d1 = neighbor
-
-            if _board.numbered_board[i1][j1] == p1 and signs[_board.direction_board_list[i1][j1]] == d1:
-                n = (i1, j1, p1, d1)
-                break
-
-        visited = set()
-        visited.add(n)
-        _paths[path].append((i1, j1))
-        found_end = False
-
-        _ = [1, 2, 3, 4, 5, 6, 7, 8]
-
-        while not found_end:
-            neigbors = _board.get_not_se_points_neighbours(n[0], n[1], n[3])
-            _.append(n)
-
-            if _[-1] == _[-2] and _[-2] == _[-3] and _[-3] == _[-4]:
-                break
-            for neighbor in neigbors:
-                i1, j1, d1 = neighbor
-                neighbor = (i1, j1, path, d1)
-
-                if (i1, j1) == end and _board.numbered_board[i1][j1] == path:
-                    found_end = True
-                    _paths[path].append((i1, j1))
-
-                try:
-                    x = signs[_board.direction_board_list[i1][j1]]
-                except:
-                    continue
-
-                if _board.numbered_board[i1][j1] == p1 and signs[
-                    _board.direction_board_list[i1][j1]] == d1 and neighbor not in visited:
-                    n = (i1, j1, p1, d1)
-                    visited.add(n)
-                    _paths[path].append((i1, j1))
-                    break
+    return _board
 
+def solution_grids(_board) -> tuple:
+    """
+    Arrays of the decoded solution.
+    :param _board: board with the decoded solution, see NumberlinkBoard.retrieve_paths_from_models
+    :return: path of every cell (0 = not decoded), sign of every cell (0 = starting or ending point or not decoded)
+    and the mask of the starting and ending points, arrays [height, width]
+    """
+    return _board.solution.paths_grid, _board.solution.signs, _board.solution.endpoints
 
-    path_cells = []
-    cycle_cells = []
-    for path, cells in _paths.items():
-        path_cells.extend(cells)
-
-    for i in range(_board.height):
-        for j in range(_board.width):
-            if (i, j) not in path_cells:
-                try:
-                    cycle_cells.append((i, j, _board.numbered_board[i][j], signs[_board.direction_board_list[i][j]]))
-                except:
-                    continue
-    cycles = []
-    visited_cells = set()
-    for cell in cycle_cells:
-        if cell in visited_cells:
-            continue
-        neighbour = ()
-        stack = [cell]
-        cycle = [cell]
-        visited = set()
-        visited.add(cell)
-
-        while neighbour != cell:
-            try:
-                i, j, p, d = stack[-1][0], stack[-1][1], stack[-1][2], stack[-1][3]
-            except:
-                break
-            neigbors = _board.get_not_se_points_neighbours(i, j, d)
-
-            _ = []
-            for neighbor in neigbors:
-                i1, j1, d1 = neighbor
-                if (i1, j1, p, d1) in cycle_cells:
-                    _.append((i1, j1, p, d1))
-            neigbors = _
-
-            for n in neigbors:
-                if n not in visited:
-                    visited.add(n)
-                    visited_cells.add(n)
-                    cycle.append(n)
-                    stack.append(n)
-            try:
-                stack.pop()
-            except:
-                break
-        cycles.append(cycle)
 
-    return cycles
+def cycle_detect(_board):
+    """
+    Detects cycles in the solved board and returns the clauses to break them = their negation is used for sat solver.
+    Two neighbouring cells are linked when they have the same path and both signs open towards each other,
+    starting and ending points open to all sides. The links are followed from the starting and ending points,
+    the linked cells which are not reached are the detached cycles. Every cell is visited once - O(height * width).
+    :param _board:
+    :return: list of cycles, cycle is an array [number of cells, 4] of (i, j, p, d) - the cells of the cycle,
+    its path and sign
+    """
+    return _board.solution.cycles
 
 def retrieve_real_time(_sat_output: str):
     """
@@ -190,7 +158,192 @@ def retrieve_real_time(_sat_output: str):
 
     return 0
 
-def run_sat(glucose_executable_path:str, instance_path:str, theory_name:str, cycle_breaker:bool=True, _echo:bool=False):
+class SolveSession:
+    """
+    Repeated solving of one instance by the cycle breaker and the enumeration of solutions. The board of every
+    theory is generated and loaded to the solver backend once, the clauses blocking the found cycles
+    and solutions are only appended to it.
+    With "3D+4D" the session remembers that 3D was proven unsatisfiable - more blocking clauses cannot make
+    it satisfiable again - and the following calls use only 4D.
+    """
+
+    def __init__(self, glucose_executable_path: str, instance_path: str, theory_name: str, echo: bool = False,
+                 stream: bool = False, cardinality: str = "pairwise", solver: str = "glucose", cache: CnfCache = None,
+                 glucose_options: list = None, tracer: Tracer = None, timeout: float = None, cpu_limit: float = None,
+                 memory_limit: int = None, total_timeout: float = None, pipe: bool = False, simplify: bool = False,
+                 prune: bool = False, forced_moves: bool = False, cnf_format: str = "dimacs",
+                 deduplicate: bool = None):
+        """
+        :param glucose_executable_path: the path to the executable of the SAT solver
+        :param instance_path: the path to the instance file
+        :param theory_name: the name of the theory to be used
+        :param echo: print status
+        :param stream: whether to stream the clauses to the DIMACS file instead of keeping them in memory
+        :param cardinality: the encoding of the cardinality constraints, one of CARDINALITY_ENCODINGS
+        :param solver: the solver backend, one of SOLVER_BACKENDS
+        :param cache: cache of the generated CNF files
+        :param glucose_options: additional command line options of glucose
+        :param tracer: event log of the phases
+        :param timeout: wall-clock budget of one solver call in seconds
+        :param cpu_limit: CPU time budget of one call of glucose in seconds
+        :param memory_limit: address space budget of glucose in bytes
+        :param total_timeout: wall-clock budget of the whole session in seconds, including all cycle breaker iterations
+        :param pipe: zero-disk mode, no CNF file is written and glucose reads the formula from a pipe
+        :param simplify: simplify the clauses before they are given to the solver
+        :param prune: restrict the variables to the path domains, boards without solution detected by the domains
+        are answered without the solver
+        :param forced_moves: fix the cells deduced by the forced moves before the encoding, implies prune
+        :param cnf_format: format of the CNF files - "dimacs", "gzip" or "binary"
+        :param deduplicate: remove duplicate clauses, by default only when the clauses are not streamed
+        """
+        self.glucose_executable_path = glucose_executable_path
+        self.instance_path = instance_path
+        self.echo = echo
+        self.stream = stream
+        self.cardinality = cardinality
+        self.solver = solver
+        self.cache = cache
+        self.glucose_options = glucose_options
+
+        # theories which are not proven unsatisfiable yet, the first one is used
+        self.theories = ["3D", "4D"] if theory_name == "3D+4D" else [theory_name]
+        self.boards = {}
+        self.backends = {}
+        self.cycles = []
+        self.solutions = []
+        self.sat_calls = 0
+        self.tracer = tracer or Tracer()
+        self.timeout = timeout
+        self.cpu_limit = cpu_limit
+        self.memory_limit = memory_limit
+        self.deadline = time.perf_counter() + total_timeout if total_timeout is not None else None
+        self.pipe = pipe
+        self.simplify = simplify
+        self.prune = prune
+        self.forced_moves = forced_moves
+        self.cnf_format = cnf_format
+        self.deduplicate = deduplicate
+
+    @property
+    def timings(self) -> dict:
+        """
+        :return: total time of the main phases in seconds, decode and cycle_detect are measured by run_sat
+        """
+        return self.tracer.totals(["generate", "load", "solve", "decode", "cycle_detect"])
+
+    @property
+    def theory(self) -> str:
+        return self.theories[0]
+
+    def get_board(self, theory: str) -> tuple:
+        """
+        Returns the board of the theory and its backend, generates and loads the base encoding on first use.
+        :param theory:
+        :return: board, backend
+        """
+        if theory not in self.boards:
+            self.tracer.theory = theory
+            with self.tracer.phase("generate"):
+                board = select_theory(self.instance_path, theory, self.echo, stream=self.stream,
+                                      cardinality=self.cardinality, cache=self.cache, tracer=self.tracer,
+                                      save=not self.pipe, simplify=self.simplify, prune=self.prune,
+                                      forced_moves=self.forced_moves, cnf_format=self.cnf_format,
+                                      deduplicate=self.deduplicate)
+
+            if board.unsat_reason is not None:
+                self.boards[theory] = board
+                self.backends[theory] = None
+                return board, None
+
+            with self.tracer.phase("load"):
+                backend = create_backend(self.solver, self.glucose_executable_path, self.glucose_options,
+                                         self.cpu_limit, self.memory_limit, self.pipe)
+                backend.load(board, self.instance_path, self.echo)
+                if len(self.cycles) != 0:
+                    backend.add_clauses(board.iter_cycle_clauses(self.cycles))
+                if len(self.solutions) != 0:
+                    backend.add_clauses(board.iter_solution_clauses(self.solutions))
+            self.boards[theory] = board
+            self.backends[theory] = backend
+        return self.boards[theory], self.backends[theory]
+
+    def remaining_time(self):
+        """
+        :return: wall-clock budget of the next solver call in seconds, None = unlimited
+        """
+        if self.deadline is None:
+            return self.timeout
+        remaining = max(0.0, self.deadline - time.perf_counter())
+        return remaining if self.timeout is None else min(self.timeout, remaining)
+
+    def solve(self) -> tuple:
+        """
+        Solves the current formula, a theory proven unsatisfiable is replaced by the next one.
+        :return: board, instance result (Status), model, sat output
+        """
+        while True:
+            board, backend = self.get_board(self.theory)
+            self.tracer.theory = self.theory
+            # the domains prove that no theory has a solution
+            if board.unsat_reason is not None:
+                if self.echo: print(f"Trivially unsatisfiable - {board.unsat_reason}")
+                return board, Status.UNSAT, "No model", f"c trivially unsatisfiable: {board.unsat_reason}\ns UNSATISFIABLE"
+            timeout = self.remaining_time()
+            if timeout == 0.0:
+                if self.echo: print("Total time budget exhausted.")
+                return board, Status.TIMEOUT, "No model", "s INDETERMINATE"
+            with self.tracer.phase("solve", solver=self.solver):
+                instance_result, model, sat_string = backend.solve(self.echo, timeout)
+            self.sat_calls += 1
+
+            if instance_result == Status.UNSAT and len(self.theories) > 1:
+                if self.echo: print(f"{self.theory} - UNSAT, continuing with {self.theories[1]}")
+                self.close_theory(self.theories.pop(0))
+                continue
+
+            return board, instance_result, model, sat_string
+
+    def add_cycles(self, cycles: list):
+        """
+        Appends the clauses blocking the cycles to the formulas of all remaining theories.
+        :param cycles: cycles found by cycle_detect
+        :return:
+        """
+        with self.tracer.phase("load", cycles=len(cycles)):
+            self.cycles.extend(cycles)
+            for theory, backend in self.backends.items():
+                if backend is not None:
+                    backend.add_clauses(self.boards[theory].iter_cycle_clauses(cycles))
+
+    def add_solutions(self, solutions: list):
+        """
+        Appends the clauses blocking the solutions to the formulas of all remaining theories.
+        :param solutions: solutions of the enumeration, see Solution.assignment
+        :return:
+        """
+        with self.tracer.phase("load", solutions=len(solutions)):
+            self.solutions.extend(solutions)
+            for theory, backend in self.backends.items():
+                if backend is not None:
+                    backend.add_clauses(self.boards[theory].iter_solution_clauses(solutions))
+
+    def close_theory(self, theory: str):
+        if theory in self.backends:
+            self.boards.pop(theory)
+            backend = self.backends.pop(theory)
+            if backend is not None:
+                backend.close()
+
+    def close(self):
+        for theory in list(self.backends):
+            self.close_theory(theory)
+
+
+def run_sat(glucose_executable_path:str, instance_path:str, theory_name:str, cycle_breaker:bool=True, _echo:bool=False, stream:bool=False,
+            cardinality:str="pairwise", solver:str="glucose", cache:CnfCache=None, glucose_options:list=None,
+            tracer:Tracer=None, timeout:float=None, cpu_limit:float=None, memory_limit:int=None,
+            total_timeout:float=None, pipe:bool=False, simplify:bool=False, prune:bool=False,
+            forced_moves:bool=False, cnf_format:str="dimacs", deduplicate:bool=None):
     """
     Method for running SAT solver. It encapsulates the whole process of selecting
     the theory, running the solver and choosing whether to break the cycles in the solved board.
@@ -198,63 +351,284 @@ def run_sat(glucose_executable_path:str, instance_path:str, theory_name:str, cyc
     :param instance_path: the path to the instance file
     :param theory_name: the name of the theory to be used
     :param cycle_breaker: whether to break the cycles in the solved board and find another solution
-    :return: solved board, instance result, model, sat output
+    :param stream: whether to stream the clauses to the DIMACS file instead of keeping them in memory
+    :param cardinality: the encoding of the cardinality constraints, one of CARDINALITY_ENCODINGS
+    :param solver: the solver backend, one of SOLVER_BACKENDS
+    :param cache: cache of the generated CNF files, the clauses are generated every time without it
+    :param glucose_options: additional command line options of glucose, e.g. ["-nthreads=4"]
+    :param tracer: event log of the phases and the iterations, a new one without memory tracing by default
+    :param timeout: wall-clock budget of one solver call in seconds
+    :param cpu_limit: CPU time budget of one call of glucose in seconds
+    :param memory_limit: address space budget of glucose in bytes
+    :param total_timeout: wall-clock budget of all solver calls together in seconds
+    :param pipe: zero-disk mode - the clauses are kept in memory and written to the standard input of glucose,
+    no CNF file is written, cannot be combined with stream or cache
+    :param simplify: unit propagation, pure literal elimination and renumbering of the variables before solving,
+    board.simplification.statistics reports the shrinking of the formula, cannot be combined with stream or cache
+    :param prune: variables and clauses only for the cells every path can reach, boards without solution found
+    by the reachability and parity checks are answered UNSAT without calling the solver, see domains.py
+    :param forced_moves: endpoints with a single free neighbour, corridors and other forced moves are deduced
+    on the grid and fixed before the encoding, board.forced_moves.statistics reports the fixed cells, implies prune
+    :param cnf_format: format of the CNF file - "dimacs", "gzip" (compressed DIMACS, read by glucose directly)
+    or "binary" (int32 literals, reloaded from the cache by memory mapping, written to the standard input of glucose)
+    :param deduplicate: remove duplicate clauses, remembering the stored clauses costs memory proportional
+    to the formula - by default True, with stream False
+    :return: solved board, instance result (Status - UNSAT, SAT, TIMEOUT or MEMOUT), model, sat output
     """
 
-    extra_clauses = []
-    it = 1
-    if cycle_breaker:
+    session = SolveSession(glucose_executable_path, instance_path, theory_name, _echo, stream, cardinality, solver,
+                           cache, glucose_options, tracer, timeout, cpu_limit, memory_limit, total_timeout, pipe,
+                           simplify, prune, forced_moves, cnf_format, deduplicate)
+    tracer = session.tracer
+    try:
         while True:
-            if _echo:
-                print("Iteration", it)
-                it += 1
-            board = select_theory(instance_path, theory_name, _echo, _extra_clauses=extra_clauses)
-            instance_result, model, sat_string = run_glucose(board.get_cnf_path(instance_path), glucose_executable_path, echo=_echo)
-            if instance_result == 0 and theory_name == "3D+4D":
-                board = select_theory(instance_path, "4D", _echo, _extra_clauses=extra_clauses)
-                instance_result, model, sat_string = run_glucose(board.get_cnf_path(instance_path), glucose_executable_path, echo=_echo)
-                if instance_result == 0:
+            tracer.iteration += 1
+            if _echo: print("Iteration", tracer.iteration)
+            with tracer.phase("iteration"):
+                board, instance_result, model, sat_string = session.solve()
+                if instance_result != Status.SAT:
                     break
-            elif instance_result == 0:
-                break
 
-            if instance_result == 1:
-                board.get_true_variables(model, _print=False)
-                board.retrieve_paths_from_models(model)
-                board.print_modified_board(board.true_clauses, False, _echo, _echo, False)
-                # print("USING PYSAT")
-                # board.use_pysat()
+                with tracer.phase("decode"):
+                    board.clear_solution()
+                    board.get_true_variables(model, _print=False)
+                    board.retrieve_paths_from_models(model)
+                    with tracer.phase("render"):
+                        board.print_modified_board(board.true_clauses, False, _echo, _echo, False)
+                if not cycle_breaker:
+                    break
 
-                # print possible direction of [0,0]
                 if _echo: print("Cycle detection...")
-                to_extend = cycle_detect(board)
+                with tracer.phase("cycle_detect"):
+                    to_extend = cycle_detect(board)
                 if _echo: print("Cycle detection finished.")
                 if len(to_extend) == 0:
                     break
-                extra_clauses.extend(to_extend)
-                if len(extra_clauses) == 0:
-                    break
-    else:
-        board = select_theory(instance_path, theory_name, _echo, _extra_clauses=extra_clauses)
-        instance_result, model, sat_string = run_glucose(board.get_cnf_path(instance_path), glucose_executable_path, echo=_echo)
-        if instance_result == 0 and theory_name == "3D+4D":
+                session.add_cycles(to_extend)
+    finally:
+        session.close()
+        tracer.close()
+
+    if not cycle_breaker and theory_name == "3D+4D":
+        if session.theory == "4D":
             print("3D - FAIL")
-            board = select_theory(instance_path, "4D", _echo, _extra_clauses=extra_clauses)
-            instance_result, model, sat_string = run_glucose(board.get_cnf_path(instance_path), glucose_executable_path, echo=_echo)
-            if instance_result == 0:
-                print("3D+4D - FAIL")
+        if instance_result == Status.UNSAT:
+            print("3D+4D - FAIL")
+
+    board.sat_output = sat_string
+    board.instance_result = instance_result
+    board.model = model
+    board.sat_real_time = retrieve_real_time(sat_string)
+    board.sat_calls = session.sat_calls
+    board.timings = session.timings
+    board.trace = tracer
+    return board, instance_result, model, sat_string
+
+def _portfolio_contender(results, index: int, glucose_executable_path: str, instance_path: str, contender: dict,
+                         cycle_breaker: bool, cache: CnfCache):
+    """
+    Solves the instance with one contender of the portfolio, runs in a child process.
+    The process starts its own process group and glucose is started in it, so that killing the group
+    kills the glucose subprocess too.
+    CNF files are saved to the cache, so that contenders with different options do not overwrite each other's files.
+    Simplified clauses cannot be cached, they are kept in memory and written to the standard input of glucose,
+    the model is mapped back to the original variables, which the parent decodes.
+    """
+    os.setpgid(0, 0)
+    solvers.SOLVER_NEW_SESSION = False
+    simplify = contender.get("simplify", False)
+    start = time.perf_counter()
+    try:
+        board, instance_result, model, sat_string = run_sat(glucose_executable_path, instance_path,
+                                                            contender.get("theory", "3D+4D"), cycle_breaker,
+                                                            cardinality=contender.get("cardinality", "pairwise"),
+                                                            solver=contender.get("solver", "glucose"),
+                                                            cache=None if simplify else cache,
+                                                            glucose_options=contender.get("options"),
+                                                            timeout=contender.get("timeout"),
+                                                            cpu_limit=contender.get("cpu_limit"),
+                                                            memory_limit=contender.get("memory_limit"),
+                                                            total_timeout=contender.get("total_timeout"),
+                                                            pipe=simplify, simplify=simplify,
+                                                            prune=contender.get("prune", False),
+                                                            forced_moves=contender.get("forced_moves", False),
+                                                            cnf_format=contender.get("cnf_format", "dimacs"))
+        if instance_result == Status.SAT and board.simplification is not None:
+            model = Model.from_literals(board.simplification.true_variables(model.true_variables()))
+        results.put((index, instance_result, model, sat_string, board.theory, len(board.clauses), board.sat_calls,
+                     time.perf_counter() - start, None))
+    except Exception as e:
+        results.put((index, Status.ERROR, "No model", "", contender.get("theory", "3D+4D"), 0, 0,
+                     time.perf_counter() - start, repr(e)))
 
-        if instance_result == 1:
-            board.get_true_variables(model, _print=False)
-            board.retrieve_paths_from_models(model)
-            board.print_modified_board(board.true_clauses, False, False, False, False)
+def _kill_contender(process):
+    """
+    Kills the contender process with its whole process group.
+    """
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        # the process group does not exist yet or anymore
+        pass
+    process.kill()
+    process.join()
+
+def run_portfolio(glucose_executable_path: str, instance_path: str, contenders: list = DEFAULT_PORTFOLIO,
+                  cycle_breaker: bool = True, _echo: bool = False, cache: CnfCache = None):
+    """
+    Solves the instance with all contenders in parallel processes and uses the first valid answer,
+    the other contenders are killed. Satisfiable answer is always valid, unsatisfiable answer of 3D is
+    inconclusive - the instance may be solvable with zigzag paths. Contenders which run out of their budget
+    or fail with an error do not stop the others, ERROR is returned only when all contenders fail.
+    :param glucose_executable_path: the path to the executable of the SAT solver
+    :param instance_path: the path to the instance file
+    :param contenders: list of dicts with run_sat options "theory", "cardinality", "solver" and
+    "options" = command line options of glucose, and the budgets "timeout", "cpu_limit", "memory_limit"
+    and "total_timeout" - a contender out of its budget does not stop the others, "simplify" simplifies the clauses
+    in memory without the cache, "prune" restricts the variables to the path domains, "forced_moves" fixes
+    the forced moves, "cnf_format" selects the format of the CNF file
+    :param cycle_breaker: whether to break the cycles in the solved board and find another solution
+    :param cache: cache of the generated CNF files, CnfCache() by default
+    :return: solved board, instance result, model, sat output, board.portfolio contains the report of all contenders
+    """
+
+    cache = CnfCache() if cache is None else cache
+    results = multiprocessing.Queue()
+    start = time.perf_counter()
+    processes = []
+    report = []
+
+    for index, contender in enumerate(contenders):
+        process = multiprocessing.Process(target=_portfolio_contender, args=(results, index, glucose_executable_path,
+                                                                             instance_path, contender, cycle_breaker,
+                                                                             cache))
+        process.start()
+        processes.append(process)
+        report.append({"contender": " ".join(f"{key}={value}" for key, value in contender.items()),
+                       "status": "running", "time of run": None, "sat real time": None, "sat calls": None,
+                       "num of clauses": None})
+
+    winner = None
+    answer = None
+    # answer of a failed contender, used only when all contenders fail
+    failure = None
+    running = set(range(len(contenders)))
+    try:
+        while running and winner is None:
+            try:
+                index, instance_result, model, sat_string, theory, clauses, calls, time_of_run, error = \
+                    results.get(timeout=0.05)
+            except queue.Empty:
+                # a contender which died without an answer, e.g. killed by the system
+                for index in list(running):
+                    if processes[index].exitcode not in (None, 0):
+                        running.remove(index)
+                        report[index].update({"status": "crashed", "time of run": time.perf_counter() - start})
+                continue
+
+            running.discard(index)
+            report[index].update({"time of run": time_of_run, "sat real time": float(retrieve_real_time(sat_string)),
+                                  "sat calls": calls, "num of clauses": clauses})
+            if instance_result == Status.SAT or (instance_result == Status.UNSAT and theory != "3D"):
+                report[index]["status"] = "winner"
+                winner = answer = (index, instance_result, model, sat_string, theory)
+            elif instance_result == Status.UNSAT:
+                report[index]["status"] = "inconclusive"
+                answer = answer or (index, instance_result, model, sat_string, theory)
+            elif instance_result in (Status.TIMEOUT, Status.MEMOUT):
+                report[index]["status"] = solvable_mark(instance_result)
+                answer = answer or (index, instance_result, model, sat_string, theory)
+            else:
+                # crashed solver, the other contenders continue
+                report[index]["status"] = f"error {error}" if error is not None else solvable_mark(instance_result)
+                failure = failure or (index, instance_result, model, sat_string, theory)
+            if _echo: print(f"Portfolio: {report[index]['contender']} - {report[index]['status']}")
+    finally:
+        for index in running:
+            _kill_contender(processes[index])
+            report[index].update({"status": "killed", "time of run": time.perf_counter() - start})
+        for process in processes:
+            process.join()
+
+    answer = answer or failure
+    if answer is None:
+        raise RuntimeError(f"No contender of the portfolio finished: {report}")
+
+    index, instance_result, model, sat_string, theory = answer
+    # the model is numbered by the variables of the winning contender
+    board = load_board(instance_path, theory, prune=contenders[index].get("prune", False),
+                       forced_moves=contenders[index].get("forced_moves", False))
+    if instance_result == 1:
+        board.get_true_variables(model, _print=False)
+        board.retrieve_paths_from_models(model)
+        board.print_modified_board(board.true_clauses, False, False, False, False)
 
     board.sat_output = sat_string
     board.instance_result = instance_result
     board.model = model
     board.sat_real_time = retrieve_real_time(sat_string)
+    board.portfolio = report
+    if _echo: print_portfolio_report(report)
     return board, instance_result, model, sat_string
 
+def print_portfolio_report(report: list):
+    """
+    Prints the report of run_portfolio as markdown table.
+    :param report: board.portfolio
+    :return: None
+    """
+    columns = ["contender", "status", "time of run", "sat real time", "sat calls", "num of clauses"]
+    print("| " + " | ".join(columns) + " |")
+    print("| " + " | ".join(["---"] * len(columns)) + " |")
+    for row in report:
+        values = [f"{row[column]:.4f}" if isinstance(row[column], float) else
+                  "-" if row[column] is None else str(row[column]) for column in columns]
+        print("| " + " | ".join(values) + " |")
+
+def print_statistics_table(glucose_executable_path: str, instance_paths: list, theory_name: str, cardinality: str = "pairwise",
+                           solver: str = "glucose", memory: bool = False):
+    """
+    Solves the instances and prints the results as markdown table in the format of the README table.
+    :param glucose_executable_path: the path to the executable of the SAT solver
+    :param instance_paths: paths to the instance files
+    :param theory_name: the name of the theory to be used
+    :param cardinality: the encoding of the cardinality constraints, one of CARDINALITY_ENCODINGS
+    :param solver: the solver backend, one of SOLVER_BACKENDS
+    :param memory: whether to measure the peak memory of the program (without the glucose process) by tracemalloc,
+    the times are then longer
+    :return: None
+    """
+
+    rows = []
+    for instance_path in instance_paths:
+        tracer = Tracer(memory=memory)
+        start = time.perf_counter()
+        board, instance_result, model, sat_output = run_sat(glucose_executable_path, instance_path, theory_name,
+                                                            cardinality=cardinality, solver=solver, tracer=tracer)
+        time_of_run = time.perf_counter() - start
+        tracer.close()
+        peak_memory = max((event["peak_memory"] or 0 for event in tracer.events), default=0) / 2 ** 20
+        rows.append([board.width, board.height, board.number_of_paths, float(board.sat_real_time), time_of_run,
+                     len(board.variables), len(board.clauses), THEORY_NUMBERS[board.theory],
+                     solvable_mark(instance_result), instance_path.split("/")[-1],
+                     len(board.clauses) / time_of_run, peak_memory if memory else "-"])
+
+    # sorted by number of clauses as in README
+    rows.sort(key=lambda row: row[6])
+
+    columns = ["width", "height", "num of paths", "sat real time [s]", "time of run [s]", "num of variables",
+               "num of clauses", "encoding", "solvable", "used instance", "clauses per second", "peak memory [MB]"]
+    print(f"cardinality encoding = {cardinality}")
+    print("| " + " | ".join(columns) + " |")
+    print("| " + " | ".join(["---"] * len(columns)) + " |")
+    for row in rows:
+        row[3] = f"{row[3]:.4f}"
+        row[4] = f"{row[4]:.4f}"
+        row[10] = f"{row[10]:.3f}"
+        if memory:
+            row[11] = f"{row[11]:.1f}"
+        print("| " + " | ".join(map(str, row)) + " |")
+
 def print_dimacs(_board, _instance_path: str):
     """
     Prints the DIMACS format of the instance.
@@ -262,9 +636,12 @@ def print_dimacs(_board, _instance_path: str):
     :return:
     """
 
-    file = open(_board.get_cnf_path(_instance_path), "r")
-    print(file.read())
-    file.close()
+    if _board.cnf_format == "binary":
+        print(f"p cnf {_board.number_of_cnf_variables} {len(_board.clauses)}")
+        print("".join(dimacs_chunks(_board.clauses)), end="")
+        return
+    with open_text(_board.get_cnf_path(_instance_path)) as file:
+        print(file.read())
 
 def print_sat_result(_board, _instance_result, _instance_path:str, board_info:bool, original_board: bool, numbered_board:bool, direction_board_list:bool, direction_board_string:bool, _dimacs:bool,_model:bool, _sat_output:bool, heatmap:bool):
     """
@@ -284,7 +661,10 @@ def print_sat_result(_board, _instance_result, _instance_path:str, board_info:bo
 
     print("Numberlink")
     print("-" * 40)
-    print(f"Solvable = {_instance_result == 1}")
+    if _instance_result in (Status.TIMEOUT, Status.MEMOUT):
+        print(f"Solvable = unknown, {solvable_mark(_instance_result)}")
+    else:
+        print(f"Solvable = {_instance_result == 1}")
     print("-" * 40)
     if (original_board):
         _board.print_board_info()
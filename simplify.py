@@ -0,0 +1,199 @@
+import numpy as np
+
+
+class Simplification:
+    """
+    Simplified formula - unit propagation and pure literal elimination followed by dense renumbering
+    of the remaining variables. The clauses are kept in the new numbering, the assignment of the eliminated
+    variables is remembered, so that a model of the simplified formula is mapped back to the original variables.
+
+    Clauses added later, e.g. the clauses blocking cycles, are mapped by map_clauses(). A pure literal is only
+    an assumption which keeps the formula satisfiable, when an added clause contains its negation the variable
+    is restored together with the clauses it satisfied.
+    """
+
+    def __init__(self, clauses, num_variables: int, pure_literals: bool = True):
+        """
+        :param clauses: clauses of the formula in the original numbering
+        :param num_variables: number of variables of the original formula
+        :param pure_literals: whether to eliminate pure literals
+        """
+        self.original_variables = num_variables
+        self.original_clauses = 0
+        self.original_literals = 0
+        # value of the eliminated variables in the original numbering, 1 = true, -1 = false, 0 = not fixed
+        self.fixed = np.zeros(num_variables + 1, dtype=np.int8)
+        self.old_to_new = np.zeros(num_variables + 1, dtype=np.int64)
+        self.new_to_old = [0]
+        # variable -> clauses satisfied by its pure literal, restored when the variable is needed again
+        self.pure = {}
+        self.units = 0
+        self.clauses = self._simplify(clauses, pure_literals)
+
+    @property
+    def count(self) -> int:
+        """
+        :return: number of variables of the simplified formula
+        """
+        return len(self.new_to_old) - 1
+
+    def _simplify(self, clauses, pure_literals: bool) -> list:
+        fixed = self.fixed
+        formula = []
+        occurrences = {}
+        for clause in clauses:
+            clause = list(clause)
+            self.original_clauses += 1
+            self.original_literals += len(clause)
+            for literal in clause:
+                occurrences.setdefault(literal, []).append(len(formula))
+            formula.append(clause)
+
+        satisfied = bytearray(len(formula))
+        # number of literals of the clause which are not false
+        active = [len(clause) for clause in formula]
+
+        def is_true(literal):
+            return fixed[abs(literal)] == (1 if literal > 0 else -1)
+
+        def assign(literal):
+            fixed[abs(literal)] = 1 if literal > 0 else -1
+
+        # unit propagation
+        queue = [clause[0] for clause in formula if len(clause) == 1]
+        conflict = any(len(clause) == 0 for clause in formula)
+        while queue and not conflict:
+            literal = queue.pop()
+            if fixed[abs(literal)] != 0:
+                if not is_true(literal):
+                    conflict = True
+                continue
+            assign(literal)
+            self.units += 1
+            for index in occurrences.get(literal, ()):
+                satisfied[index] = 1
+            for index in occurrences.get(-literal, ()):
+                if satisfied[index]:
+                    continue
+                active[index] -= 1
+                if active[index] == 0:
+                    conflict = True
+                    break
+                if active[index] == 1:
+                    unit = next(other for other in formula[index] if fixed[abs(other)] == 0 or is_true(other))
+                    if is_true(unit):
+                        satisfied[index] = 1
+                    else:
+                        queue.append(unit)
+
+        if conflict:
+            self.units = 0
+            self.pure = {}
+            fixed[:] = 0
+            return [[]]
+
+        # pure literal elimination, removing the satisfied clauses can make other literals pure
+        if pure_literals:
+            counts = {}
+            for index, clause in enumerate(formula):
+                if not satisfied[index]:
+                    for literal in clause:
+                        if fixed[abs(literal)] == 0:
+                            counts[literal] = counts.get(literal, 0) + 1
+            candidates = [literal for literal in counts if counts.get(-literal, 0) == 0]
+            while candidates:
+                literal = candidates.pop()
+                if fixed[abs(literal)] != 0 or counts.get(-literal, 0) != 0 or counts.get(literal, 0) == 0:
+                    continue
+                assign(literal)
+                removed = self.pure[abs(literal)] = []
+                for index in occurrences.get(literal, ()):
+                    if satisfied[index]:
+                        continue
+                    satisfied[index] = 1
+                    removed.append(formula[index])
+                    for other in formula[index]:
+                        if other != literal and fixed[abs(other)] == 0:
+                            counts[other] -= 1
+                            if counts[other] == 0 and counts.get(-other, 0) != 0:
+                                candidates.append(-other)
+
+        simplified = []
+        for index, clause in enumerate(formula):
+            if not satisfied[index]:
+                simplified.append([self._new_literal(literal) for literal in clause if fixed[abs(literal)] == 0])
+        return simplified
+
+    def _new_literal(self, literal: int) -> int:
+        """
+        Returns the literal in the new numbering, the variable gets new number on its first use.
+        """
+        variable = abs(literal)
+        if self.old_to_new[variable] == 0:
+            self.old_to_new[variable] = len(self.new_to_old)
+            self.new_to_old.append(variable)
+        new = int(self.old_to_new[variable])
+        return new if literal > 0 else -new
+
+    def _restore(self, variable: int, mapped: list):
+        """
+        Makes the pure variable free again and maps the clauses satisfied by it.
+        """
+        self.fixed[variable] = 0
+        for clause in self.pure.pop(variable):
+            self._map_clause(clause, mapped)
+
+    def _map_clause(self, clause, mapped: list):
+        for literal in clause:
+            variable = abs(literal)
+            if variable in self.pure and self.fixed[variable] != (1 if literal > 0 else -1):
+                self._restore(variable, mapped)
+
+        literals = []
+        for literal in clause:
+            value = self.fixed[abs(literal)]
+            if value == 0:
+                literals.append(self._new_literal(literal))
+            elif value == (1 if literal > 0 else -1):
+                if abs(literal) in self.pure:
+                    self.pure[abs(literal)].append(clause)
+                return
+        mapped.append(literals)
+
+    def map_clauses(self, clauses) -> list:
+        """
+        Maps clauses in the original numbering to the simplified formula.
+        :param clauses: iterable of clauses
+        :return: list of clauses in the new numbering, clauses satisfied by fixed variables are left out
+        """
+        mapped = []
+        for clause in clauses:
+            self._map_clause(list(clause), mapped)
+        return mapped
+
+    def true_variables(self, true_variables) -> np.ndarray:
+        """
+        Maps the true variables of a model of the simplified formula to the original numbering.
+        :param true_variables: array of the true variables in the new numbering
+        :return: sorted array of the true original variables, including the eliminated ones
+        """
+        new_to_old = np.array(self.new_to_old, dtype=np.int64)
+        true_variables = np.asarray(true_variables, dtype=np.int64)
+        true_variables = true_variables[true_variables <= self.count]
+        return np.union1d(np.flatnonzero(self.fixed == 1), new_to_old[true_variables])
+
+    @property
+    def statistics(self) -> dict:
+        """
+        :return: size of the formula before and after the simplification and the number of eliminated variables
+        """
+        return {
+            "variables": self.original_variables,
+            "clauses": self.original_clauses,
+            "literals": self.original_literals,
+            "simplified variables": self.count,
+            "simplified clauses": len(self.clauses),
+            "simplified literals": sum(len(clause) for clause in self.clauses),
+            "units": self.units,
+            "pure literals": len(self.pure),
+        }
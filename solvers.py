@@ -0,0 +1,524 @@
+import enum
+import os
+import resource
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from dimacs import CNF_EXTENSIONS, DimacsReader, append_to_dimacs, write_dimacs
+
+# Names of the solver backends accepted by run_sat.
+SOLVER_BACKENDS = ["glucose", "pysat"]
+
+# Glucose is started in its own session, so that a timeout kills it with all its children. Contenders of
+# run_portfolio turn it off - glucose stays in the process group of the contender, which is killed as a whole.
+SOLVER_NEW_SESSION = True
+
+
+class Status(enum.IntEnum):
+    """
+    Result of a solver call, UNSAT and SAT keep the values 0 and 1 used for the instance result.
+    TIMEOUT and MEMOUT mean that the solver was stopped by a budget and nothing is known about the instance.
+    UNKNOWN is reported by the solver itself (s UNKNOWN / s INDETERMINATE), ERROR means that the solver
+    crashed or its output could not be parsed.
+    """
+    UNSAT = 0
+    SAT = 1
+    TIMEOUT = 2
+    MEMOUT = 3
+    UNKNOWN = 4
+    ERROR = 5
+
+
+def solvable_mark(instance_result) -> str:
+    """
+    :param instance_result: Status or 0/1
+    :return: "T", "F", "timeout", "memout", "unknown" or "error" as in the tables and the results files
+    """
+    if instance_result == Status.SAT:
+        return "T"
+    if instance_result == Status.UNSAT:
+        return "F"
+    return Status(instance_result).name.lower()
+
+
+class Model:
+    """
+    Satisfying assignment of the formula stored as a boolean array, assignment[v] is the value of the variable v,
+    index 0 is unused. str() returns the model as the "v ... 0" line of the solver output.
+    """
+
+    def __init__(self, assignment: np.ndarray):
+        """
+        :param assignment: boolean array of length number of variables + 1
+        """
+        self.assignment = assignment
+
+    @classmethod
+    def from_literals(cls, literals):
+        """
+        :param literals: iterable of literals, e.g. the model of pysat
+        :return: Model
+        """
+        literals = np.asarray(literals, dtype=np.int64)
+        assignment = np.zeros(int(np.abs(literals).max(initial=0)) + 1, dtype=bool)
+        assignment[literals[literals > 0]] = True
+        return cls(assignment)
+
+    def true_variables(self) -> np.ndarray:
+        """
+        :return: sorted array of the true variables
+        """
+        return np.flatnonzero(self.assignment)
+
+    def __getitem__(self, variable: int) -> bool:
+        return bool(self.assignment[variable])
+
+    def __len__(self):
+        return len(self.assignment) - 1
+
+    def __str__(self):
+        literals = np.arange(1, len(self.assignment), dtype=np.int64)
+        literals[~self.assignment[1:]] *= -1
+        return "v " + " ".join(map(str, literals.tolist())) + " 0"
+
+
+class SolverResult:
+    """
+    Parsed output of the solver - the status, the model of a satisfiable formula and the comment lines.
+    The "v" lines are decoded directly to the Model and are not kept as text.
+    """
+
+    def __init__(self):
+        self.status = None
+        self.model = None
+        self.comments = []
+        self.status_line = ""
+        self.error = None
+
+    @property
+    def output(self) -> str:
+        """
+        :return: the solver output without the "v" lines
+        """
+        return "\n".join(self.comments + [self.status_line]).strip()
+
+
+def parse_solver_output(lines) -> SolverResult:
+    """
+    Parses the output of a SAT solver in the format of the SAT competition line by line as it is read.
+    Models printed on more "v" lines are supported, positive literals are stored to the boolean assignment.
+    :param lines: iterable of str or bytes lines, e.g. stdout of the solver process
+    :return: SolverResult, status is None when there is no "s" line
+    """
+    result = SolverResult()
+    assignment = np.zeros(1, dtype=bool)
+    size = 0
+    model_lines = 0
+
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8", errors="replace")
+        line = line.strip()
+        if not line:
+            continue
+
+        if line[0] == "v":
+            literals = np.array(line.split()[1:], dtype=np.int64)
+            if len(literals) == 0:
+                continue
+            model_lines += 1
+            size = max(size, int(np.abs(literals).max()))
+            if size >= len(assignment):
+                assignment = np.concatenate([assignment, np.zeros(max(size + 1, 2 * len(assignment)) - len(assignment),
+                                                                  dtype=bool)])
+            assignment[literals[literals > 0]] = True
+        elif line[0] == "s":
+            result.status_line = line
+            answer = line[1:].strip()
+            if answer == "SATISFIABLE":
+                result.status = Status.SAT
+            elif answer == "UNSATISFIABLE":
+                result.status = Status.UNSAT
+            else:
+                result.status = Status.UNKNOWN
+        elif line[0] == "c":
+            result.comments.append(line)
+
+    if result.status == Status.SAT:
+        if model_lines == 0:
+            result.status = Status.ERROR
+            result.error = "satisfiable without model"
+        else:
+            result.model = Model(assignment[:size + 1].copy())
+    return result
+
+
+class SolverBackend:
+    """
+    Interface of the SAT solver backends used by run_sat.
+    A backend is loaded with the clauses of one board, solved, extended with the cycle-blocking clauses
+    and solved again without regenerating the board.
+    """
+
+    # whether the solver keeps learned clauses between solve() calls
+    incremental = False
+
+    def load(self, board, instance_path: str, echo: bool = False):
+        """
+        Loads the clauses of the generated board.
+        :param board: NumberlinkBoard with generated clauses saved to DIMACS format
+        :param instance_path: path to the instance file
+        :param echo: print status
+        :return:
+        """
+        raise NotImplementedError
+
+    def add_clauses(self, clauses):
+        """
+        Adds clauses to the loaded formula.
+        :param clauses: iterable of clauses
+        :return:
+        """
+        raise NotImplementedError
+
+    def solve(self, echo: bool = False, timeout: float = None) -> tuple:
+        """
+        Solves the loaded formula.
+        :param echo: print status
+        :param timeout: wall-clock budget of the call in seconds
+        :return: instance result (Status), model as "v ... 0" line, solver output
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class GlucoseBackend(SolverBackend):
+    """
+    Glucose executable started as a subprocess on the CNF file of the board.
+    The solver is cold-started on every call, added clauses are appended to a temporary copy of the CNF file,
+    so the board does not have to be generated again.
+    With pipe=True nothing is written to disk - the clauses of the board and the added clauses are written
+    to the standard input of glucose on every call. Glucose reads gzip-compressed CNF files directly, boards
+    saved in the binary format are written to its standard input as with pipe=True.
+    """
+
+    def __init__(self, glucose_executable_path: str, options: list = None, cpu_limit: float = None,
+                 memory_limit: int = None, pipe: bool = False):
+        """
+        :param glucose_executable_path: path to the executable of the SAT solver
+        :param options: additional command line options of glucose
+        :param cpu_limit: CPU time limit of one call in seconds
+        :param memory_limit: address space limit of the glucose process in bytes
+        :param pipe: write the formula to the standard input of glucose instead of the CNF file
+        """
+        self.glucose_executable_path = glucose_executable_path
+        self.options = options or []
+        self.cpu_limit = cpu_limit
+        self.memory_limit = memory_limit
+        self.pipe = pipe
+        self.cnf_path = None
+        self._board_cnf_path = None
+        self._board = None
+        self._added_clauses = []
+        # the formula is written to the standard input of glucose
+        self._stdin = pipe
+
+    def load(self, board, instance_path: str, echo: bool = False):
+        self._board = board
+        self._stdin = self.pipe or board.cnf_format == "binary"
+        if self._stdin:
+            self._added_clauses = []
+            return
+        self.cnf_path = self._board_cnf_path = board.get_cnf_path(instance_path)
+
+    def add_clauses(self, clauses):
+        if self._stdin:
+            self._added_clauses.extend(clauses)
+            return
+        # the CNF file of the board may be cached, the clauses are appended to its copy in the temporary directory,
+        # so that the copy is not counted or evicted by the cache
+        if self.cnf_path == self._board_cnf_path:
+            extension = CNF_EXTENSIONS[self._board.cnf_format]
+            name = os.path.basename(self._board_cnf_path)[:-len(extension)]
+            descriptor, self.cnf_path = tempfile.mkstemp(suffix=extension, prefix=f"{name}-extended-")
+            os.close(descriptor)
+            shutil.copyfile(self._board_cnf_path, self.cnf_path)
+        # clauses of a simplified board may use new variables
+        clauses = list(clauses)
+        append_to_dimacs(self.cnf_path, clauses, self._board.number_of_cnf_variables)
+
+    def close(self):
+        if self.cnf_path is not None and self.cnf_path != self._board_cnf_path and os.path.exists(self.cnf_path):
+            os.remove(self.cnf_path)
+        self.cnf_path = self._board_cnf_path
+
+    def solve(self, echo: bool = False, timeout: float = None) -> tuple:
+        formula = None
+        if self._stdin:
+            formula = (self._board.number_of_cnf_variables, len(self._board.clauses) + len(self._added_clauses),
+                       self._board.clauses, self._added_clauses)
+        return run_glucose(self.cnf_path, self.glucose_executable_path, echo, self.options, timeout, self.cpu_limit,
+                           self.memory_limit, formula)
+
+
+class PysatBackend(SolverBackend):
+    """
+    In-process incremental solver from the python-sat package.
+    The solver is kept between the iterations of the cycle breaker, so learned clauses are reused
+    and only the blocking clauses are added.
+    The solver runs in this process, so only the wall-clock timeout is supported - the solver is interrupted
+    when it expires. MemoryError of the solver is reported as MEMOUT.
+    """
+
+    incremental = True
+
+    def __init__(self, solver_name: str = "glucose4"):
+        """
+        :param solver_name: name of the pysat solver, see pysat.solvers.SolverNames
+        """
+        try:
+            from pysat.solvers import Solver
+        except ImportError:
+            raise ImportError("The pysat backend requires the python-sat package: pip install python-sat")
+
+        self._solver_class = Solver
+        self.solver_name = solver_name
+        self.solver = None
+
+    def load(self, board, instance_path: str, echo: bool = False):
+        self.close()
+        if echo: print(f"Loading {len(board.clauses)} clauses to {self.solver_name}")
+
+        self.solver = self._solver_class(name=self.solver_name)
+        if board.clauses.in_memory:
+            self.solver.append_formula(board.clauses)
+        else:
+            # streamed clauses are only in the CNF file
+            for clause in DimacsReader(board.get_cnf_path(instance_path)):
+                self.solver.add_clause(clause)
+
+    def add_clauses(self, clauses):
+        for clause in clauses:
+            self.solver.add_clause(clause)
+
+    def solve(self, echo: bool = False, timeout: float = None) -> tuple:
+        if echo: print(f"Running SAT solver {self.solver_name}")
+
+        timer = threading.Timer(timeout, self.solver.interrupt) if timeout is not None else None
+        start = time.perf_counter()
+        try:
+            if timer is None:
+                satisfiable = self.solver.solve()
+            else:
+                timer.start()
+                satisfiable = self.solver.solve_limited(expect_interrupt=True)
+        except MemoryError:
+            satisfiable = Status.MEMOUT
+        finally:
+            if timer is not None:
+                timer.cancel()
+                self.solver.clear_interrupt()
+        real_time = time.perf_counter() - start
+
+        # same format as the glucose output, so that retrieve_real_time works for both backends
+        sat_output = f"c real time : {real_time} s\n"
+        model = "No model"
+        if satisfiable is True:
+            model = Model.from_literals(self.solver.get_model())
+            sat_output += "s SATISFIABLE"
+            instance_result = Status.SAT
+        elif satisfiable is False:
+            sat_output += "s UNSATISFIABLE"
+            instance_result = Status.UNSAT
+        else:
+            instance_result = Status.MEMOUT if satisfiable == Status.MEMOUT else Status.TIMEOUT
+            sat_output += "s INDETERMINATE"
+
+        if echo: print(f"{self.solver_name} finished with result {instance_result}")
+
+        return instance_result, model, sat_output
+
+    def close(self):
+        if self.solver is not None:
+            self.solver.delete()
+            self.solver = None
+
+
+def create_backend(solver: str, glucose_executable_path: str, glucose_options: list = None, cpu_limit: float = None,
+                   memory_limit: int = None, pipe: bool = False) -> SolverBackend:
+    """
+    Creates solver backend by its name.
+    :param solver: one of SOLVER_BACKENDS
+    :param glucose_executable_path: path to the executable of the SAT solver, used by the glucose backend
+    :param glucose_options: additional command line options of glucose
+    :param cpu_limit: CPU time limit of one call of glucose in seconds
+    :param memory_limit: address space limit of glucose in bytes
+    :param pipe: glucose reads the formula from its standard input, the pysat backend never uses the CNF file
+    :return: SolverBackend
+    """
+    if solver == "glucose":
+        return GlucoseBackend(glucose_executable_path, glucose_options, cpu_limit, memory_limit, pipe)
+    if solver == "pysat":
+        return PysatBackend()
+    raise ValueError(f"Unknown solver backend: {solver}")
+
+
+def _limit_resources(cpu_limit: float, memory_limit: int):
+    """
+    Returns function setting the limits of the solver process, runs in the child before exec.
+    The kernel sends SIGXCPU at the CPU limit and SIGKILL one second later.
+    """
+    def limit():
+        if cpu_limit is not None:
+            seconds = max(1, int(cpu_limit + 0.999))
+            resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 1))
+        if memory_limit is not None:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+    return limit
+
+
+def _kill_process_group(process):
+    """
+    Kills the solver process with all its children when the process is the leader of its own session,
+    see SOLVER_NEW_SESSION.
+    """
+    try:
+        if os.getpgid(process.pid) == process.pid:
+            os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+    process.kill()
+
+
+# Messages of the solver on its standard error showing that it ran out of memory - glucose reports std::bad_alloc,
+# the Python runtime MemoryError and the dynamic loader fails to map the libraries under the address space limit.
+MEMORY_ERRORS = ("bad_alloc", "MemoryError", "out of memory", "Out of memory", "Cannot allocate memory",
+                 "failed to map segment")
+
+
+def _wait_process(process, waited: list):
+    """
+    Waits for the solver process by os.wait4, which returns the resource usage of this process only, unlike
+    RUSAGE_CHILDREN summed over all children. Runs in a thread, so that the main thread can wait for the budget.
+    """
+    try:
+        waited.append(os.wait4(process.pid, 0))
+    except ChildProcessError:
+        # reaped by Popen.poll() when the solver was killed
+        waited.append(None)
+
+
+def _write_formula(stream, formula: tuple):
+    """
+    Writes the formula to the standard input of the solver and closes it, runs in a thread.
+    """
+    try:
+        write_dimacs(stream, *formula)
+        stream.close()
+    except (BrokenPipeError, ValueError):
+        # the solver was killed before it read the whole formula
+        pass
+
+
+def run_glucose(instance_cnf_path: str, glucose_executable_path: str, echo: bool = False, options: list = None,
+                timeout: float = None, cpu_limit: float = None, memory_limit: int = None,
+                formula: tuple = None) -> tuple:
+    """
+    Starts SAT solver. Its output is parsed by parse_solver_output as it is printed.
+    :param instance_cnf_path: path to the instance in DIMACS format (.cnf)
+    :param glucose_executable_path: path to the executable of the SAT solver
+    :param options: additional command line options of glucose, e.g. ["-nthreads=4"]
+    :param timeout: wall-clock limit in seconds, the solver is killed when it expires
+    :param cpu_limit: CPU time limit of the solver process in seconds
+    :param memory_limit: address space limit of the solver process in bytes
+    :param formula: (number of variables, number of clauses, iterables of clauses...) written to the standard input
+    of the solver while it is parsing, instance_cnf_path is not used
+    :return: instance result (Status), Model or "No model", sat output without the "v" lines. TIMEOUT is reported
+    when the solver was killed by the timeout or used its CPU budget, MEMOUT only when it reported that it ran out
+    of memory (MEMORY_ERRORS on its standard error), UNKNOWN of the solver is kept and a solver which stopped
+    without a result is ERROR.
+    """
+
+    process = None
+    writer = None
+    try:
+        if echo: print(f"Running SAT solver on {instance_cnf_path or 'standard input'} with {glucose_executable_path}")
+
+        limit = _limit_resources(cpu_limit, memory_limit) if cpu_limit is not None or memory_limit is not None else None
+        arguments = [rf"{glucose_executable_path}", '-model', *(options or [])]
+        if formula is None:
+            arguments.append(f"{instance_cnf_path}")
+        process = subprocess.Popen(arguments, stdin=subprocess.PIPE if formula is not None else None,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   start_new_session=SOLVER_NEW_SESSION, preexec_fn=limit)
+
+        if formula is not None:
+            writer = threading.Thread(target=_write_formula, args=(process.stdin, formula), daemon=True)
+            writer.start()
+
+        # the output is parsed while the solver runs, the main thread only waits for the budget
+        parsed = []
+        reader = threading.Thread(target=lambda: parsed.append(parse_solver_output(process.stdout)), daemon=True)
+        reader.start()
+        errors = []
+        error_reader = threading.Thread(target=lambda: errors.append(process.stderr.read()), daemon=True)
+        error_reader.start()
+
+        waited = []
+        waiter = threading.Thread(target=_wait_process, args=(process, waited), daemon=True)
+        waiter.start()
+        waiter.join(timeout)
+        timed_out = waiter.is_alive()
+        if timed_out:
+            _kill_process_group(process)
+            waiter.join()
+        usage = None
+        if waited[0] is not None:
+            _, wait_status, usage = waited[0]
+            process.returncode = os.waitstatus_to_exitcode(wait_status)
+        reader.join()
+        error_reader.join()
+        if writer is not None:
+            writer.join()
+        result = parsed[0]
+        stderr = errors[0].decode("utf-8", errors="replace").strip()
+
+        cpu_time = usage.ru_utime + usage.ru_stime if usage is not None else 0
+        if timed_out:
+            result.status = Status.TIMEOUT
+        elif result.status in (Status.SAT, Status.UNSAT):
+            pass
+        elif cpu_limit is not None and (process.returncode == -signal.SIGXCPU or cpu_time >= cpu_limit):
+            result.status = Status.TIMEOUT
+        elif memory_limit is not None and any(message in stderr for message in MEMORY_ERRORS):
+            result.status = Status.MEMOUT
+        elif result.status is None:
+            result.status = Status.ERROR
+            result.error = f"no result, exit code {process.returncode}" + (f": {stderr}" if stderr else "")
+
+        if result.status != Status.SAT:
+            result.model = None
+        if echo: print(f"Glucose finished with result {result.status.name}"
+                       + (f" - {result.error}" if result.error is not None else ""))
+
+        return result.status, result.model if result.model is not None else "No model", result.output
+
+    except FileNotFoundError:
+        print("Executable not found at the specified path.")
+        return Status.ERROR, "No model", ""
+    except Exception as e:
+        print(f"An error occurred: {e}")
+        return Status.ERROR, "No model", ""
+    finally:
+        # interrupted run, e.g. KeyboardInterrupt, must not leave the solver running
+        if process is not None and process.poll() is None:
+            _kill_process_group(process)
+            process.wait()
@@ -1,8 +1,23 @@
+import io
+import os
 import shutil
+import tempfile
+import types
 import unittest
+import unittest.mock
 import warnings
 
+import cache as cache_module
+import sat
 from sat import *
+from batch import *
+from benchmark import *
+from clauses import ClauseBuffer
+from vectorized import SIGN_OPENINGS
+from decoder import Solution
+from enumeration import enumerate_solutions, is_unique
+from generator import MIN_PATH_LENGTH, generate_corpus, hamiltonian_path, random_instance, write_instance
+from dimacs import CNF_EXTENSIONS, DimacsReader, DimacsWriter, dimacs_chunks, write_dimacs
 
 # GLUCOSE PARALLEL EXECUTABLE PATH - parallel version is mandatory for cycle_breaker=True which is used in tests
 glucose_path = "/root/glucose2/glucose/parallel/glucose-syrup"
@@ -575,5 +590,1421 @@ class TestNumberlinkClass(unittest.TestCase):
         )
 
 
+class TestVariableLayout(unittest.TestCase):
+    """
+    Test class for the numbering of variables.
+    """
+
+    def test_instance_1_3D_encode_decode(self):
+
+        board = NumberlinkBoard("/root/glucose2/glucose/Numberlink/instances/instance_1.txt")
+        board.generate_all_clauses_3D()
+
+        self.assertEqual(245, len(board.variables))
+        self.assertEqual(1, board.variables[(0, 0, 1, 0)])
+        self.assertEqual(245, board.variables[(6, 6, 5, 0)])
+        for variable in range(1, len(board.variables) + 1):
+            self.assertEqual(variable, board.variables[board.variables.decode(variable)])
+
+    def test_instance_1_4D_encode_decode(self):
+
+        board = NumberlinkBoard("/root/glucose2/glucose/Numberlink/instances/instance_1.txt")
+        board.generate_all_clauses_4D()
+
+        self.assertEqual(1420, len(board.variables))
+        self.assertNotIn((0, 3, 4, 1), board.variables)
+        self.assertIn((0, 3, 4, 0), board.variables)
+        decoded = board.variables.decode_model(range(1, len(board.variables) + 1))
+        self.assertEqual(len(decoded), len(set(decoded)))
+        for variable, key in enumerate(decoded, start=1):
+            self.assertEqual(variable, board.variables[key])
+
+
+class TestDimacsStream(unittest.TestCase):
+    """
+    Test class for streaming clauses to the DIMACS file.
+    """
+
+    def test_instance_5_stream_matches_memory(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_5.txt"
+
+        for theory_name in ["3D", "4D"]:
+            board = select_theory(instance_path, theory_name)
+            with open(board.get_cnf_filename(instance_path)) as file:
+                expected = file.read().split("\n")
+
+            board = select_theory(instance_path, theory_name, stream=True)
+            with open(board.get_cnf_filename(instance_path)) as file:
+                actual = file.read().split("\n")
+
+            self.assertEqual(len(actual) - 2, len(board.clauses))
+
+            # streamed clauses cannot be removed later, so clauses subsumed by later unit clauses stay in the file
+            expected = {line for line in expected[1:] if line}
+            actual = {line for line in actual[1:] if line}
+            units = {line.split()[0] for line in actual if len(line.split()) == 2}
+            actual = {line for line in actual if len(line.split()) == 2 or units.isdisjoint(line.split())}
+            self.assertEqual(expected, actual)
+
+
+    def test_extend_array_is_written_before_close(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            writer = DimacsWriter(os.path.join(directory, "stream.cnf"))
+            store = ClauseStore(writer, deduplicate=False)
+            sizes = []
+            for first in range(1, 3 * DimacsWriter.chunk_size, 500):
+                variables = np.arange(first, first + 500)
+                store.extend_array(np.column_stack([variables, -(variables + 1)]))
+                sizes.append(os.path.getsize(writer._part_filename))
+                self.assertLess(writer._buffered, DimacsWriter.chunk_size)
+
+            self.assertGreater(sizes[-1], sizes[0])
+            writer.close(3 * DimacsWriter.chunk_size + 500)
+            with open(os.path.join(directory, "stream.cnf")) as file:
+                self.assertEqual(len(store) + 1, len(file.read().splitlines()))
+
+    def test_stream_does_not_remember_clauses(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_5.txt"
+
+        board = select_theory(instance_path, "4D", stream=True)
+        self.assertFalse(board.clauses.deduplicate)
+        self.assertEqual(0, len(board.clauses._seen))
+
+        board = select_theory(instance_path, "4D", stream=True, deduplicate=True)
+        self.assertTrue(board.clauses.deduplicate)
+
+        board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, "4D", deduplicate=False)
+        self.assertEqual(Status.SAT, instance_result)
+        self.assertFalse(board.clauses.deduplicate)
+        self.assertEqual([], cycle_detect(board))
+
+
+class TestCardinalityEncodings(unittest.TestCase):
+    """
+    Test class for the cardinality encodings.
+    """
+
+    def test_instance_1_all_encodings_solution(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+
+        expected = [['┌', '─', '┐', '4', '─', '─', '┐'],
+                    ['│', '3', '└', '─', '2', '5', '│'],
+                    ['│', '└', '─', '3', '1', '│', '│'],
+                    ['│', '┌', '─', '5', '│', '│', '│'],
+                    ['│', '│', '┌', '─', '┘', '│', '│'],
+                    ['│', '│', '1', '┌', '─', '┘', '│'],
+                    ['2', '└', '─', '┘', '4', '─', '┘']]
+
+        for cardinality in CARDINALITY_ENCODINGS:
+            for theory_name in ["3D", "4D"]:
+                board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, theory_name,
+                                                                    cardinality=cardinality)
+                self.assertEqual(expected, board.direction_board_list)
+
+    def test_instance_11_auxiliary_encodings_are_smaller(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_11.txt"
+
+        pairwise = select_theory(instance_path, "4D", cardinality="pairwise")
+        for cardinality in ["sequential", "commander", "product"]:
+            board = select_theory(instance_path, "4D", cardinality=cardinality)
+            self.assertLess(len(board.clauses) * 3, len(pairwise.clauses))
+
+
+class TestClauseStore(unittest.TestCase):
+    """
+    Test class for the clause store.
+    """
+
+    def test_canonicalisation_and_removal(self):
+
+        store = ClauseStore()
+        store.extend([[2, 1], [1, 2], [1, 2, 1], [3, -3, 4], [5], [5, 6], [-5, 6], [5]])
+        store.remove_subsumed()
+
+        self.assertEqual([[1, 2], [5], [-5, 6]], list(store))
+        self.assertEqual({"duplicates": 3, "tautologies": 1, "subsumed": 1}, store.removed)
+
+    def test_instance_4_4D_no_redundant_clauses(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_4.txt"
+
+        board = select_theory(instance_path, "4D")
+        clauses = [tuple(clause) for clause in board.clauses]
+        units = {clause[0] for clause in clauses if len(clause) == 1}
+
+        self.assertEqual(len(clauses), len(set(clauses)))
+        for clause in clauses:
+            self.assertEqual(list(clause), sorted(set(clause), key=abs))
+            if len(clause) > 1:
+                self.assertTrue(units.isdisjoint(clause))
+
+
+class TestSolverBackends(unittest.TestCase):
+    """
+    Test class for the solver backends.
+    """
+
+    def test_pysat_backend_matches_glucose(self):
+
+        for instance in ["instance_1", "instance_4", "instance_5", "instance_6", "instance_12"]:
+            instance_path = f"/root/glucose2/glucose/Numberlink/instances/{instance}.txt"
+            for theory_name in ["3D", "4D", "3D+4D"]:
+                board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, theory_name)
+                pysat_board, pysat_result, pysat_model, pysat_output = run_sat(glucose_path, instance_path,
+                                                                               theory_name, solver="pysat")
+                self.assertEqual(instance_result, pysat_result)
+                if instance_result == 1:
+                    self.assertEqual(board.direction_board_list, pysat_board.direction_board_list)
+                    self.assertEqual([], cycle_detect(pysat_board))
+
+    def test_incremental_blocking_clauses(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+
+        board = select_theory(instance_path, "4D")
+        backend = PysatBackend()
+        backend.load(board, instance_path)
+        instance_result, model, sat_output = backend.solve()
+        self.assertEqual(1, instance_result)
+
+        # blocking the shape of the path 1 as if it was a cycle makes the formula unsatisfiable,
+        # instance_1 has only one solution
+        board.get_true_variables(model)
+        path = [variable for variable in board.true_clauses if variable[2] == 1 and variable[3] != 0]
+        backend.add_clauses(board.iter_cycle_clauses([path]))
+        instance_result, model, sat_output = backend.solve()
+        backend.close()
+
+        self.assertEqual(0, instance_result)
+
+
+class TestAcyclicTheory(unittest.TestCase):
+    """
+    Test class for the acyclic theory.
+    """
+
+    def test_instance_1_acyclic_solution(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+
+        expected = [['┌', '─', '┐', '4', '─', '─', '┐'],
+                    ['│', '3', '└', '─', '2', '5', '│'],
+                    ['│', '└', '─', '3', '1', '│', '│'],
+                    ['│', '┌', '─', '5', '│', '│', '│'],
+                    ['│', '│', '┌', '─', '┘', '│', '│'],
+                    ['│', '│', '1', '┌', '─', '┘', '│'],
+                    ['2', '└', '─', '┘', '4', '─', '┘']]
+
+        board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, "acyclic")
+
+        self.assertEqual(1, instance_result)
+        self.assertEqual(expected, board.direction_board_list)
+
+    def test_instance_9_no_cycle_breaker_iterations(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_9.txt"
+
+        board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, "acyclic",
+                                                            cycle_breaker=False)
+
+        self.assertEqual(1, instance_result)
+        self.assertEqual(1, board.sat_calls)
+        self.assertEqual([], cycle_detect(board))
+
+    def test_instance_4_acyclic_unsolvable(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_4.txt"
+
+        board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, "acyclic")
+
+        self.assertEqual(0, instance_result)
+
+
+class TestCnfCache(unittest.TestCase):
+    """
+    Test class for the cache of the CNF files.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_instance_1_cache_hit(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+        cache = CnfCache(f"{self.directory}/cache")
+
+        board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, "4D", cache=cache)
+        cached_board, cached_result, cached_model, cached_output = run_sat(glucose_path, instance_path, "4D",
+                                                                           cache=cache)
+
+        self.assertEqual(1, cache.statistics["hits"])
+        self.assertEqual(1, cache.statistics["misses"])
+        self.assertEqual(len(board.clauses), len(cached_board.clauses))
+        self.assertEqual(list(board.clauses), list(cached_board.clauses))
+        self.assertEqual(board.direction_board_list, cached_board.direction_board_list)
+
+    def test_same_basename_different_boards(self):
+
+        cache = CnfCache(f"{self.directory}/cache")
+        boards = []
+        for instance in ["instance_1", "instance_5"]:
+            os.mkdir(f"{self.directory}/{instance}")
+            instance_path = f"{self.directory}/{instance}/instance.txt"
+            shutil.copy(f"/root/glucose2/glucose/Numberlink/instances/{instance}.txt", instance_path)
+            boards.append(select_theory(instance_path, "3D", cache=cache))
+
+        self.assertEqual(2, cache.statistics["misses"])
+        self.assertEqual(2, cache.statistics["entries"])
+        self.assertNotEqual(boards[0].get_cnf_filename("instance.txt"), boards[1].get_cnf_filename("instance.txt"))
+
+    def test_encoding_version_changes_key(self):
+
+        board = load_board("/root/glucose2/glucose/Numberlink/instances/instance_1.txt", "4D")
+        cache = CnfCache(f"{self.directory}/cache")
+        key = cache.key(board, "4D", "pairwise", True, [])
+
+        with unittest.mock.patch("cache.ENCODING_VERSION", cache_module.ENCODING_VERSION + 1):
+            self.assertNotEqual(key, cache.key(board, "4D", "pairwise", True, []))
+
+    def test_least_recently_used_eviction(self):
+
+        cache = CnfCache(f"{self.directory}/cache", max_bytes=0)
+        for instance in ["instance_1", "instance_5", "instance_12"]:
+            select_theory(f"/root/glucose2/glucose/Numberlink/instances/{instance}.txt", "3D", cache=cache)
+
+        # only the last generated file is kept
+        self.assertEqual(2, cache.statistics["evictions"])
+        self.assertEqual(1, cache.statistics["entries"])
+        self.assertIn("instance_12", cache.entries()[0][0])
+
+    def test_extended_copy_outside_cache(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+        cache = CnfCache(f"{self.directory}/cache")
+
+        session = SolveSession(glucose_path, instance_path, "4D", cache=cache)
+        board, instance_result, model, sat_output = session.solve()
+        board.get_true_variables(model)
+        path = [variable for variable in board.true_clauses if variable[2] == 1 and variable[3] != 0]
+        session.add_cycles([path])
+        extended_path = session.backends["4D"].cnf_path
+
+        self.assertNotEqual(os.path.abspath(cache.directory), os.path.dirname(extended_path))
+        self.assertEqual(1, cache.statistics["entries"])
+        session.solve()
+        session.close()
+        self.assertFalse(os.path.exists(extended_path))
+
+
+class TestSolveSession(unittest.TestCase):
+    """
+    Test class for the solve session.
+    """
+
+    def test_instance_9_remembers_escalation(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_9.txt"
+
+        for solver in SOLVER_BACKENDS:
+            session = SolveSession(glucose_path, instance_path, "3D+4D", solver=solver)
+            board, instance_result, model, sat_output = session.solve()
+
+            # 3D is unsatisfiable, 4D is satisfiable
+            self.assertEqual(1, instance_result)
+            self.assertEqual("4D", session.theory)
+            self.assertEqual(2, session.sat_calls)
+
+            board.get_true_variables(model)
+            path = [variable for variable in board.true_clauses if variable[2] == 1 and variable[3] != 0]
+            session.add_cycles([path])
+            session.solve()
+            session.close()
+
+            # only one call of 4D after adding the clauses
+            self.assertEqual(3, session.sat_calls)
+
+    def test_instance_1_glucose_appends_clauses(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+
+        session = SolveSession(glucose_path, instance_path, "4D")
+        board, instance_result, model, sat_output = session.solve()
+        backend = session.backends["4D"]
+        board.get_true_variables(model)
+        path = [variable for variable in board.true_clauses if variable[2] == 1 and variable[3] != 0]
+        session.add_cycles([path])
+
+        with open(backend.cnf_path) as file:
+            lines = file.read().splitlines()
+        with open(board.get_cnf_path(instance_path)) as file:
+            base_lines = file.read().splitlines()
+
+        self.assertEqual(f"p cnf {len(board.variables)} {len(board.clauses) + board.number_of_paths}",
+                         lines[0].strip())
+        self.assertEqual(base_lines[1:], lines[1:len(base_lines)])
+
+        # instance_1 has only one solution
+        board, instance_result, model, sat_output = session.solve()
+        session.close()
+        self.assertEqual(0, instance_result)
+
+
+class TestPortfolio(unittest.TestCase):
+    """
+    Test class for the parallel portfolio.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_instance_9_3D_unsat_is_inconclusive(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_9.txt"
+
+        board, instance_result, model, sat_output = run_portfolio(glucose_path, instance_path,
+                                                                  cache=CnfCache(self.directory))
+        statuses = {row["contender"]: row["status"] for row in board.portfolio}
+
+        self.assertEqual(1, instance_result)
+        self.assertEqual("4D", board.theory)
+        self.assertEqual("winner", statuses["theory=4D"])
+        self.assertIn(statuses["theory=3D"], ["inconclusive", "killed"])
+        self.assertEqual([], cycle_detect(board))
+
+    def test_instance_4_losers_are_killed(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_4.txt"
+        contenders = [{"theory": "4D"}, {"theory": "4D", "cardinality": "sequential"},
+                      {"theory": "acyclic", "solver": "pysat"}]
+
+        board, instance_result, model, sat_output = run_portfolio(glucose_path, instance_path, contenders,
+                                                                  cache=CnfCache(self.directory))
+        statuses = [row["status"] for row in board.portfolio]
+
+        self.assertEqual(0, instance_result)
+        self.assertEqual(1, statuses.count("winner"))
+        self.assertEqual(3, len(board.portfolio))
+        for row in board.portfolio:
+            self.assertIn(row["status"], ["winner", "killed"])
+            self.assertIsNotNone(row["time of run"])
+
+
+    def test_crashed_contender_does_not_win(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+        contenders = [{"theory": "3D"}, {"theory": "4D", "solver": "pysat"}]
+
+        board, instance_result, model, sat_output = run_portfolio("/nonexistent", instance_path, contenders,
+                                                                  cache=CnfCache(self.directory))
+        statuses = [row["status"] for row in board.portfolio]
+
+        self.assertEqual(Status.SAT, instance_result)
+        self.assertEqual("4D", board.theory)
+        self.assertIn(statuses[0], ["error", "killed"])
+        self.assertEqual("winner", statuses[1])
+        self.assertEqual([], cycle_detect(board))
+
+    def test_all_contenders_crashed(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+
+        board, instance_result, model, sat_output = run_portfolio("/nonexistent", instance_path,
+                                                                  cache=CnfCache(self.directory))
+
+        self.assertEqual(Status.ERROR, instance_result)
+        self.assertEqual(["error", "error"], [row["status"] for row in board.portfolio])
+
+    def test_simplified_contender(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_9.txt"
+
+        for solver in SOLVER_BACKENDS:
+            with self.subTest(solver=solver):
+                board, instance_result, model, sat_output = run_portfolio(
+                    glucose_path, instance_path, [{"theory": "4D", "solver": solver, "simplify": True}],
+                    cache=CnfCache(self.directory))
+
+                self.assertEqual(Status.SAT, instance_result)
+                self.assertEqual("winner", board.portfolio[0]["status"])
+                self.assertEqual([], cycle_detect(board))
+                self.assertTrue(board.solution.decoded[~board.solution.endpoints].all())
+
+    def test_killed_contender_kills_glucose(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+        pid_path = os.path.join(self.directory, "glucose.pid")
+        sleeping_glucose = os.path.join(self.directory, "glucose")
+        with open(sleeping_glucose, "w") as file:
+            file.write(f"#!/bin/sh\necho $$ > {pid_path}\nexec sleep 60\n")
+        os.chmod(sleeping_glucose, 0o755)
+
+        results = multiprocessing.Queue()
+        contender = multiprocessing.Process(target=sat._portfolio_contender,
+                                            args=(results, 0, sleeping_glucose, instance_path, {"theory": "4D"}, True,
+                                                  CnfCache(self.directory)))
+        contender.start()
+        deadline = time.perf_counter() + 30
+        while not os.path.exists(pid_path) or os.path.getsize(pid_path) == 0:
+            self.assertLess(time.perf_counter(), deadline)
+            time.sleep(0.05)
+        with open(pid_path) as file:
+            pid = int(file.read())
+        sat._kill_contender(contender)
+
+        # the orphaned glucose may stay as a zombie until it is reaped
+        deadline = time.perf_counter() + 5
+        state = None
+        while time.perf_counter() < deadline:
+            try:
+                with open(f"/proc/{pid}/stat") as file:
+                    state = file.read().rsplit(")", 1)[1].split()[0]
+            except FileNotFoundError:
+                state = None
+            if state in (None, "Z"):
+                break
+            time.sleep(0.05)
+        self.assertIn(state, [None, "Z"])
+
+
+class TestBatch(unittest.TestCase):
+    """
+    Test class for the batch solver.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_batch_rows_and_resume(self):
+
+        instances = "/root/glucose2/glucose/Numberlink/instances"
+
+        for output_format in BATCH_FORMATS:
+            results_path = run_batch(glucose_path, [f"{instances}/instance_1.txt", f"{instances}/instance_4.txt"],
+                                     "3D+4D", workers=2, output_format=output_format, results_dir=self.directory)
+            rows = read_results(results_path)
+
+            self.assertEqual(2, len(rows))
+            rows = {row["instance"].split("/")[-1]: row for row in rows}
+            self.assertEqual("T", rows["instance_1.txt"]["solvable"])
+            self.assertEqual("F", rows["instance_4.txt"]["solvable"])
+            self.assertEqual(7, int(rows["instance_1.txt"]["width"]))
+            self.assertEqual(1385, int(rows["instance_1.txt"]["num of clauses"]))
+
+            # solved instances are skipped, the new one is appended
+            results_path = run_batch(glucose_path, f"{instances}/instance_[145].txt", "3D+4D", workers=2,
+                                     output_format=output_format, results_dir=self.directory)
+            rows = read_results(results_path)
+
+            self.assertEqual(3, len(rows))
+            self.assertEqual("instance_5.txt", rows[-1]["instance"].split("/")[-1])
+
+
+    def test_invalid_instance_is_an_error_row(self):
+
+        instances = "/root/glucose2/glucose/Numberlink/instances"
+        invalid_path = os.path.join(self.directory, "invalid.txt")
+        with open(invalid_path, "w") as file:
+            file.write("1,.,.\n.,.,.\n")
+
+        results_path = run_batch(glucose_path, [f"{instances}/instance_1.txt", invalid_path], "3D+4D", workers=2,
+                                 results_dir=self.directory)
+        rows = {row["instance"].split("/")[-1]: row for row in read_results(results_path)}
+
+        self.assertEqual("T", rows["instance_1.txt"]["solvable"])
+        self.assertIsNone(rows["invalid.txt"]["solvable"])
+        self.assertIn("SystemExit", rows["invalid.txt"]["error"])
+
+    def test_same_file_names_in_different_directories(self):
+
+        instances = "/root/glucose2/glucose/Numberlink/instances"
+        for directory, instance in [("a", "instance_1.txt"), ("b", "instance_4.txt")]:
+            os.makedirs(os.path.join(self.directory, directory))
+            shutil.copyfile(f"{instances}/{instance}", os.path.join(self.directory, directory, "board.txt"))
+
+        results_path = run_batch(glucose_path, f"{self.directory}/*/board.txt", "3D+4D", workers=2,
+                                 results_dir=self.directory, cache=CnfCache(os.path.join(self.directory, "cache")))
+        rows = {row["instance"].split("/")[-2]: row for row in read_results(results_path)}
+
+        self.assertEqual("T", rows["a"]["solvable"])
+        self.assertEqual("F", rows["b"]["solvable"])
+        # 3D+4D proves 3D unsatisfiable and solves 4D in the same iteration
+        self.assertEqual(2, rows["b"]["sat calls"])
+        self.assertEqual(1, rows["b"]["iterations"])
+
+
+class TestBenchmark(unittest.TestCase):
+    """
+    Test class for the benchmark harness.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_benchmark_phases(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+
+        row = benchmark_instance(glucose_path, instance_path, "3D")
+        self.assertEqual("T", row["solvable"])
+        self.assertEqual(1385, row["num of clauses"])
+        self.assertAlmostEqual(row["time of run"], sum(row[phase] for phase in BENCHMARK_PHASES))
+
+        # the fake solver measures only the encoder
+        row = benchmark_instance(glucose_path, instance_path, "4D", fake_solver=True)
+        self.assertEqual("-", row["solvable"])
+        self.assertEqual(0.0, row["solve"])
+        self.assertEqual(0.0, row["cycle_detect"])
+        self.assertGreater(row["clauses"], 0.0)
+
+    def test_synthetic_sweep(self):
+
+        rows = run_benchmark(glucose_path, [synthetic_instance(n, n, self.directory) for n in [3, 6]], ["3D"])
+
+        self.assertEqual(["synthetic_3x3.txt", "synthetic_6x6.txt"], [row["instance"] for row in rows])
+        self.assertEqual(["T", "T"], [row["solvable"] for row in rows])
+        self.assertEqual(6, rows[1]["num of paths"])
+
+    def test_regressions(self):
+
+        rows = run_benchmark(glucose_path, [synthetic_instance(4, 4, self.directory)], ["3D"], fake_solver=True)
+        baseline_path = os.path.join(self.directory, "baseline.json")
+        save_baseline(rows, baseline_path)
+        with open(baseline_path, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+
+        self.assertEqual([], check_regressions(rows, baseline))
+
+        rows[0]["clauses"] = baseline["results"]["synthetic_4x4.txt|3D"]["clauses"] * 2 + 1
+        regressions = check_regressions(rows, baseline, tolerance=0.25)
+        self.assertEqual([("synthetic_4x4.txt", "3D", "clauses")], [regression[:3] for regression in regressions])
+
+
+class TestTracing(unittest.TestCase):
+    """
+    Test class for the tracing of the phases of run_sat.
+    """
+
+    def test_trace_events(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_9.txt"
+
+        events = []
+        tracer = Tracer(memory=True, callbacks=[events.append])
+        board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, "4D", tracer=tracer)
+
+        self.assertIs(tracer, board.trace)
+        self.assertEqual(tracer.events, events)
+        self.assertEqual(board.sat_calls, len([event for event in events if event["name"] == "solve"]))
+        self.assertEqual(board.sat_calls, tracer.iteration)
+        self.assertEqual(["parse", "variables", "clauses", "dimacs", "generate"], [event["name"] for event in events[:5]])
+
+        for event in events:
+            self.assertGreaterEqual(event["wall"], 0.0)
+            self.assertGreaterEqual(event["cpu"], 0.0)
+            self.assertGreater(event["peak_memory"], 0)
+            self.assertEqual("4D", event["theory"])
+
+        # the peak of a phase includes its nested phases
+        generate = events[4]
+        self.assertEqual(max(event["peak_memory"] for event in events[:5]), generate["peak_memory"])
+        self.assertAlmostEqual(board.timings["solve"], sum(event["wall"] for event in events if event["name"] == "solve"))
+
+    def test_trace_export(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+        board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, "3D")
+
+        self.assertIsNone(board.trace.events[0]["peak_memory"])
+
+        with tempfile.TemporaryDirectory() as directory:
+            board.trace.to_json(os.path.join(directory, "trace.json"))
+            board.trace.to_chrome_trace(os.path.join(directory, "chrome.json"))
+
+            with open(os.path.join(directory, "trace.json"), "r", encoding="utf-8") as file:
+                self.assertEqual(board.trace.events, json.load(file))
+            with open(os.path.join(directory, "chrome.json"), "r", encoding="utf-8") as file:
+                trace_events = json.load(file)["traceEvents"]
+
+        self.assertEqual(len(board.trace.events), len(trace_events))
+        self.assertTrue(all(event["ph"] == "X" and event["dur"] >= 0 for event in trace_events))
+
+
+class TestBudgets(unittest.TestCase):
+    """
+    Test class for the time and memory budgets of the solver.
+    """
+
+    def setUp(self):
+        # pigeonhole principle with 11 pigeons, unsatisfiable and hard for CDCL solvers
+        self.directory = tempfile.mkdtemp()
+        self.cnf_path = os.path.join(self.directory, "php.cnf")
+        variable = lambda pigeon, hole: pigeon * 10 + hole + 1
+        self.clauses = [[variable(pigeon, hole) for hole in range(10)] for pigeon in range(11)]
+        self.clauses += [[-variable(a, hole), -variable(b, hole)] for hole in range(10)
+                         for a in range(11) for b in range(a + 1, 11)]
+        with open(self.cnf_path, "w") as file:
+            file.write(f"p cnf 110 {len(self.clauses)}\n")
+            file.writelines(" ".join(map(str, clause)) + " 0\n" for clause in self.clauses)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_glucose_limits(self):
+
+        start = time.perf_counter()
+        instance_result, model, sat_output = run_glucose(self.cnf_path, glucose_path, timeout=1)
+        self.assertEqual(Status.TIMEOUT, instance_result)
+        self.assertEqual("No model", model)
+        self.assertLess(time.perf_counter() - start, 5)
+
+        instance_result, model, sat_output = run_glucose(self.cnf_path, glucose_path, cpu_limit=1)
+        self.assertEqual(Status.TIMEOUT, instance_result)
+
+        instance_result, model, sat_output = run_glucose(self.cnf_path, glucose_path, memory_limit=20 * 1024 ** 2)
+        self.assertEqual(Status.MEMOUT, instance_result)
+        self.assertEqual("memout", solvable_mark(instance_result))
+
+    def test_glucose_limits_keep_other_results(self):
+
+        def solver(name, script):
+            path = os.path.join(self.directory, name)
+            with open(path, "w") as file:
+                file.write(f"#!/bin/sh\n{script}\n")
+            os.chmod(path, 0o755)
+            return path
+
+        budgets = {"cpu_limit": 30, "memory_limit": 1 << 30}
+        unknown = solver("unknown", "echo 's UNKNOWN'")
+        crash = solver("crash", "echo 'c parsing'; exit 3")
+        bad_alloc = solver("bad_alloc", "echo \"terminate called after throwing an instance of 'std::bad_alloc'\" >&2; "
+                                        "kill -ABRT $$")
+
+        self.assertEqual(Status.UNKNOWN, run_glucose(self.cnf_path, unknown, **budgets)[0])
+        self.assertEqual(Status.ERROR, run_glucose(self.cnf_path, crash, **budgets)[0])
+        self.assertEqual(Status.MEMOUT, run_glucose(self.cnf_path, bad_alloc, **budgets)[0])
+        # without the memory budget the crash is not a memout
+        self.assertEqual(Status.ERROR, run_glucose(self.cnf_path, bad_alloc, cpu_limit=30)[0])
+
+    def test_pysat_timeout(self):
+
+        backend = PysatBackend()
+        backend.solver = backend._solver_class(name=backend.solver_name, bootstrap_with=self.clauses)
+
+        instance_result, model, sat_output = backend.solve(timeout=0.5)
+        self.assertEqual(Status.TIMEOUT, instance_result)
+        self.assertLess(float(retrieve_real_time(sat_output)), 5)
+        backend.close()
+
+    def test_run_sat_budgets(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_9.txt"
+
+        board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, "3D+4D", total_timeout=0)
+        self.assertEqual(Status.TIMEOUT, instance_result)
+        self.assertEqual(0, board.sat_calls)
+
+        # budgets large enough do not change the result
+        board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, "4D", timeout=30,
+                                                            cpu_limit=30, memory_limit=1 << 30, total_timeout=60)
+        self.assertEqual(Status.SAT, instance_result)
+        self.assertEqual(2, board.sat_calls)
+
+
+class TestPipe(unittest.TestCase):
+    """
+    Test class for the zero-disk mode writing the formula to the standard input of glucose.
+    """
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.directory = tempfile.mkdtemp()
+        os.chdir(self.directory)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.directory)
+
+    def test_pipe_same_result(self):
+
+        instances = "/root/glucose2/glucose/Numberlink/instances"
+
+        # nothing is written in the zero-disk mode
+        for instance in ["instance_9", "instance_4", "instance_1"]:
+            run_sat(glucose_path, f"{instances}/{instance}.txt", "3D+4D", pipe=True)
+        self.assertEqual([], os.listdir("CNFS"))
+
+        for instance, theory, calls in [("instance_9", "4D", 2), ("instance_4", "3D+4D", 2), ("instance_1", "3D+4D", 1)]:
+            board, instance_result, model, sat_output = run_sat(glucose_path, f"{instances}/{instance}.txt", theory,
+                                                                pipe=True)
+            reference = run_sat(glucose_path, f"{instances}/{instance}.txt", theory)[0]
+            self.assertEqual(reference.instance_result, instance_result)
+            self.assertEqual(calls, board.sat_calls)
+            if instance_result == Status.SAT:
+                self.assertEqual([], cycle_detect(board))
+            self.assertNotIn("dimacs", [event["name"] for event in board.trace.events])
+
+        with self.assertRaises(ValueError):
+            run_sat(glucose_path, f"{instances}/instance_1.txt", "4D", pipe=True, stream=True)
+
+    def test_pipe_timeout(self):
+
+        variable = lambda pigeon, hole: pigeon * 10 + hole + 1
+        clauses = [[variable(pigeon, hole) for hole in range(10)] for pigeon in range(11)]
+        clauses += [[-variable(a, hole), -variable(b, hole)] for hole in range(10)
+                    for a in range(11) for b in range(a + 1, 11)]
+
+        instance_result, model, sat_output = run_glucose(None, glucose_path, timeout=1,
+                                                         formula=(110, len(clauses), clauses))
+        self.assertEqual(Status.TIMEOUT, instance_result)
+
+        instance_result, model, sat_output = run_glucose(None, glucose_path, formula=(110, len(clauses[:12]),
+                                                                                      clauses[:12]))
+        self.assertEqual(Status.SAT, instance_result)
+
+
+class TestSolverOutput(unittest.TestCase):
+    """
+    Test class for the parser of the solver output.
+    """
+
+    def test_multiline_model(self):
+
+        lines = [b"c glucose", b"c real time : 0.25 s", b"s SATISFIABLE", b"v 1 -2 3", b"v -4 5", b"v -6 0"]
+        result = parse_solver_output(lines)
+
+        self.assertEqual(Status.SAT, result.status)
+        self.assertEqual([1, 3, 5], result.model.true_variables().tolist())
+        self.assertEqual(6, len(result.model))
+        self.assertTrue(result.model[3])
+        self.assertFalse(result.model[4])
+        self.assertEqual("v 1 -2 3 -4 5 -6 0", str(result.model))
+        self.assertEqual("0.25", retrieve_real_time(result.output))
+        self.assertNotIn("v", result.output.split())
+
+        # the model may be printed before the status line
+        result = parse_solver_output(["v -1 2", "v 0", "s SATISFIABLE"])
+        self.assertEqual([2], result.model.true_variables().tolist())
+
+    def test_other_results(self):
+
+        self.assertEqual(Status.UNSAT, parse_solver_output(["c x", "s UNSATISFIABLE"]).status)
+        self.assertIsNone(parse_solver_output(["s UNSATISFIABLE"]).model)
+        self.assertEqual(Status.UNKNOWN, parse_solver_output(["s UNKNOWN"]).status)
+        self.assertEqual(Status.UNKNOWN, parse_solver_output(["s INDETERMINATE"]).status)
+        self.assertEqual(Status.ERROR, parse_solver_output(["s SATISFIABLE"]).status)
+        self.assertIsNone(parse_solver_output(["c only comments"]).status)
+
+        # solver which crashes without output
+        instance_result, model, sat_output = run_glucose("/dev/null", "/bin/false")
+        self.assertEqual(Status.ERROR, instance_result)
+        self.assertEqual("error", solvable_mark(instance_result))
+
+    def test_model_decoding(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+        board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, "4D")
+
+        # the model as the text line is decoded the same way
+        text_board = load_board(instance_path, "4D")
+        text_board.get_true_variables(str(model))
+        self.assertEqual(sorted(board.true_clauses), sorted(text_board.true_clauses))
+        self.assertEqual(len(board.variables), len(model))
+
+
+class TestSimplify(unittest.TestCase):
+    """
+    Test class for the simplification of the clauses.
+    """
+
+    def test_units_and_pure_literals(self):
+
+        # 1 is a unit, 2 is false then, 3 or 4 remains, 5 is pure
+        simplification = Simplification([[1], [-1, -2], [2, 3, 4], [-3, -4], [5, 3]], 6)
+
+        self.assertEqual(2, simplification.units)
+        self.assertEqual(1, len(simplification.pure))
+        self.assertEqual([[1, 2], [-1, -2]], simplification.clauses)
+        self.assertEqual(2, simplification.count)
+        self.assertEqual([1, 3, 5], simplification.true_variables([1]).tolist())
+
+        # clause with the negation of the pure literal restores it with the clauses it satisfied
+        mapped = simplification.map_clauses([[-5, 4], [1, 6], [-1, 6]])
+        self.assertEqual([[3, 1], [-3, 2], [4]], mapped)
+        self.assertEqual(0, len(simplification.pure))
+        self.assertEqual(4, simplification.count)
+
+        # conflict of units
+        self.assertEqual([[]], Simplification([[1], [-1, 2], [-2]], 2).clauses)
+
+    def test_simplified_solutions(self):
+
+        for instance in ["instance_1", "instance_5", "instance_9", "instance_12", "instance_4", "instance_6"]:
+            instance_path = f"/root/glucose2/glucose/Numberlink/instances/{instance}.txt"
+            for theory_name in ["3D", "4D", "3D+4D", "acyclic"]:
+                board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, theory_name)
+                for solver in ["glucose", "pysat"]:
+                    simplified_board, simplified_result, simplified_model, simplified_output = \
+                        run_sat(glucose_path, instance_path, theory_name, solver=solver, simplify=True)
+
+                    self.assertEqual(instance_result, simplified_result)
+                    statistics = simplified_board.simplification.statistics
+                    self.assertLess(statistics["simplified clauses"], statistics["clauses"])
+                    self.assertLessEqual(statistics["simplified variables"], statistics["variables"])
+                    if instance_result == 1:
+                        self.assertEqual([], cycle_detect(simplified_board))
+                        self.assertEqual(sum(len(path) for path in board.paths.values()),
+                                         sum(len(path) for path in simplified_board.paths.values()))
+
+        # instance_1 has only one solution
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+        board = run_sat(glucose_path, instance_path, "4D")[0]
+        simplified_board = run_sat(glucose_path, instance_path, "4D", simplify=True, pipe=True)[0]
+        self.assertEqual(board.direction_board_list, simplified_board.direction_board_list)
+
+        with self.assertRaises(ValueError):
+            run_sat(glucose_path, instance_path, "4D", simplify=True, stream=True)
+
+
+class TestDomains(unittest.TestCase):
+    """
+    Test class for the pruning of the path domains.
+    """
+
+    def test_path_domains(self):
+
+        # instance_2 - the cells behind the endpoints of other paths are dead ends
+        board = load_board("/root/glucose2/glucose/Numberlink/instances/instance_2.txt", "3D")
+        domains = path_domains(board)
+        self.assertEqual((board.height, board.width, board.number_of_paths + 1), domains.shape)
+        self.assertFalse(domains[:, :, 0].any())
+        for p, points in board.start_end_points.items():
+            for i, j in points:
+                self.assertTrue(domains[i, j, p])
+                for other in board.start_end_points:
+                    if other != p:
+                        self.assertFalse(domains[i, j, other])
+        self.assertIsNone(unsat_reason(board, domains))
+
+        # parity
+        board = load_board("/root/glucose2/glucose/Numberlink/instances/instance_4.txt", "3D")
+        self.assertTrue(unsat_reason(board, path_domains(board)).startswith("parity"))
+
+    def test_pruned_solutions(self):
+
+        for instance in ["instance_1", "instance_2", "instance_5", "instance_9", "instance_13", "instance_16"]:
+            instance_path = f"/root/glucose2/glucose/Numberlink/instances/{instance}.txt"
+            for theory_name in ["3D", "4D", "3D+4D", "acyclic"]:
+                board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, theory_name)
+                pruned_board, pruned_result, pruned_model, pruned_output = \
+                    run_sat(glucose_path, instance_path, theory_name, prune=True)
+
+                self.assertEqual(instance_result, pruned_result)
+                self.assertIsNone(pruned_board.unsat_reason)
+                self.assertLess(pruned_board.variables.base_count, board.variables.base_count)
+                self.assertLess(len(pruned_board.clauses), len(board.clauses))
+                if instance_result == 1:
+                    self.assertEqual([], cycle_detect(pruned_board))
+                    self.assertEqual(sum(len(path) for path in board.paths.values()),
+                                     sum(len(path) for path in pruned_board.paths.values()))
+
+        # instance_1 has only one solution
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+        board = run_sat(glucose_path, instance_path, "4D")[0]
+        pruned_board = run_sat(glucose_path, instance_path, "4D", prune=True, solver="pysat")[0]
+        self.assertEqual(board.direction_board_list, pruned_board.direction_board_list)
+
+    def test_trivially_unsatisfiable(self):
+
+        for instance in ["instance_4", "instance_6"]:
+            instance_path = f"/root/glucose2/glucose/Numberlink/instances/{instance}.txt"
+            for theory_name in ["3D", "4D", "3D+4D", "acyclic"]:
+                board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, theory_name,
+                                                                    prune=True)
+                self.assertEqual(0, instance_result)
+                self.assertEqual(0, board.sat_calls)
+                self.assertEqual(0, len(board.clauses))
+                self.assertIn("trivially unsatisfiable", sat_output)
+
+
+class TestForcedMoves(unittest.TestCase):
+    """
+    Test class for the deduction of the forced moves.
+    """
+
+    def test_forced_moves(self):
+
+        # instance_12 is solved by the forced moves alone
+        board = load_board("/root/glucose2/glucose/Numberlink/instances/instance_12.txt", "4D", forced_moves=True)
+        statistics = board.forced_moves.statistics
+        self.assertIsNone(board.unsat_reason)
+        self.assertEqual(statistics["cells"] - statistics["endpoints"], statistics["fixed cells"])
+        self.assertEqual(statistics["fixed cells"], statistics["fixed signs"])
+        for p, (start, end) in board.start_end_points.items():
+            self.assertEqual(end, board.forced_moves.segment(start)[-1])
+
+        # corners of the board have only two neighbours
+        board = load_board("/root/glucose2/glucose/Numberlink/instances/instance_1.txt", "3D", forced_moves=True)
+        for corner in [(0, 0), (0, board.width - 1), (board.height - 1, 0), (board.height - 1, board.width - 1)]:
+            if corner not in board.start_end_points_locs:
+                self.assertEqual(set(board.get_neighbors(*corner)), board.forced_moves.links[corner])
+
+        # contradiction
+        board = load_board("/root/glucose2/glucose/Numberlink/instances/instance_6.txt", "3D", forced_moves=True)
+        self.assertEqual(board.forced_moves.contradiction, board.unsat_reason)
+        self.assertIsNotNone(board.unsat_reason)
+
+    def test_forced_solutions(self):
+
+        for instance in ["instance_1", "instance_3", "instance_5", "instance_9", "instance_12", "instance_16"]:
+            instance_path = f"/root/glucose2/glucose/Numberlink/instances/{instance}.txt"
+            for theory_name in ["3D", "4D", "3D+4D", "acyclic"]:
+                board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, theory_name)
+                forced_board, forced_result, forced_model, forced_output = \
+                    run_sat(glucose_path, instance_path, theory_name, forced_moves=True)
+
+                self.assertEqual(instance_result, forced_result)
+                if instance_result == 1:
+                    self.assertEqual([], cycle_detect(forced_board))
+                    self.assertEqual(sum(len(path) for path in board.paths.values()),
+                                     sum(len(path) for path in forced_board.paths.values()))
+                    for (i, j), p in forced_board.forced_moves.fixed_cells().items():
+                        self.assertIn((i, j), forced_board.paths[p])
+
+        for instance in ["instance_4", "instance_6"]:
+            instance_path = f"/root/glucose2/glucose/Numberlink/instances/{instance}.txt"
+            board = run_sat(glucose_path, instance_path, "3D+4D", forced_moves=True)[0]
+            self.assertEqual(0, board.instance_result)
+            self.assertEqual(0, board.sat_calls)
+
+
+class TestVectorized(unittest.TestCase):
+    """
+    Test class for the clauses generated by numpy.
+    """
+
+    @staticmethod
+    def read_fixture(path):
+        """
+        Reads clauses of the CNF file in tests/CNFS without the clauses subsumed by its unit clauses.
+        """
+        clauses = set()
+        with open(path) as file:
+            for line in file:
+                if line.strip() and line[0] not in "pc":
+                    clauses.add(tuple(sorted(set(map(int, line.split()[:-1])), key=abs)))
+        units = {clause[0] for clause in clauses if len(clause) == 1}
+        return {clause for clause in clauses if len(clause) == 1 or units.isdisjoint(clause)}
+
+    @staticmethod
+    def generate(instance, theory, vectorized, **options):
+        board = load_board(f"/root/glucose2/glucose/Numberlink/instances/{instance}.txt", theory, **options)
+        board.vectorized = vectorized
+        if theory == "3D":
+            board.generate_clausess_3D()
+        elif theory == "4D":
+            board.generate_clauses_4D()
+        else:
+            board.generate_clauses_acyclic()
+        return board
+
+    def test_fixtures(self):
+
+        # the other fixtures were generated by an older version of the encodings
+        current = ["3D-instance_1", "3D-instance_2", "3D-instance_3", "3D-instance_4", "3D-instance_5",
+                   "3D-instance_6", "3D-instance_7", "3D-instance_12", "4D-instance_1", "4D-instance_2",
+                   "4D-instance_3", "4D-instance_4", "4D-instance_6"]
+        fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), "CNFS")
+        for name in sorted(os.listdir(fixtures)):
+            name = name[:-len(".cnf")]
+            theory, instance = name.split("-")
+            board = self.generate(instance, theory, False)
+            vectorized_board = self.generate(instance, theory, True)
+
+            clauses = {tuple(clause) for clause in vectorized_board.clauses}
+            self.assertEqual(len(board.clauses), len(vectorized_board.clauses))
+            self.assertEqual({tuple(clause) for clause in board.clauses}, clauses)
+            if name in current:
+                self.assertEqual(self.read_fixture(os.path.join(fixtures, f"{name}.cnf")), clauses)
+
+    def test_pruned_and_forced(self):
+
+        for instance in ["instance_1", "instance_5", "instance_9", "instance_13", "instance_16"]:
+            for theory in ["3D", "4D", "acyclic"]:
+                for options in [{"prune": True}, {"forced_moves": True}]:
+                    board = self.generate(instance, theory, False, **options)
+                    vectorized_board = self.generate(instance, theory, True, **options)
+                    self.assertEqual(len(board.clauses), len(vectorized_board.clauses))
+                    self.assertEqual({tuple(clause) for clause in board.clauses},
+                                     {tuple(clause) for clause in vectorized_board.clauses})
+
+        # other cardinality encodings allocate auxiliary variables and use the loops
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+        board = select_theory(instance_path, "4D", cardinality="sequential", save=False)
+        self.assertGreater(len(board.variables), board.variables.base_count)
+
+    def test_extend_array(self):
+
+        rows = [[3, -1, 2], [2, 3, -1], [1, -1, 4], [5, 5, 0], [6, 0, 0], [-6, 7, 8], [0, 0, 0], [9, -2, 9], [10, 11, 12]]
+        store = ClauseStore(false_variable=12)
+        reference = ClauseStore(false_variable=12)
+        store.extend_array(np.array(rows))
+        reference.extend([literal for literal in row if literal != 0] for row in rows)
+        # the rows are stored grouped by their length
+        self.assertEqual(sorted(reference.target), sorted(store.target))
+        self.assertEqual(sorted([[], [5], [6], [-2, 9], [10, 11], [-1, 2, 3], [-6, 7, 8]]), sorted(store.target))
+
+
+class TestClauseBuffer(unittest.TestCase):
+    """
+    Test class for the flat clause buffer.
+    """
+
+    def test_buffer(self):
+
+        clauses = [[1, -2], [3], [], [-4, 5, 6], [7, 8]]
+        buffer = ClauseBuffer(clauses[:2])
+        buffer.append(clauses[2])
+        buffer.extend_array(np.array([clauses[3]]))
+        buffer.extend([clauses[4]])
+
+        self.assertEqual(clauses, list(buffer))
+        self.assertEqual(5, len(buffer))
+        self.assertEqual([-4, 5, 6], buffer[3])
+        self.assertEqual([7, 8], buffer[-1])
+        self.assertEqual(4 * 8 + 8 * 5, buffer.nbytes)
+
+        # the bulk formatting of the buffer matches the formatting of single clauses
+        expected = "".join(" ".join(map(str, clause)) + " 0\n" for clause in clauses)
+        self.assertEqual(expected, "".join(dimacs_chunks(clauses)))
+        self.assertEqual(expected, "".join(dimacs_chunks(buffer)))
+        self.assertEqual(expected, "".join(buffer.dimacs_chunks(2)))
+
+        buffer.filter(np.array([True, False, True, True, False]))
+        self.assertEqual([[1, -2], [], [-4, 5, 6]], list(buffer))
+
+        stream = io.BytesIO()
+        write_dimacs(stream, 8, 4, buffer, [[-8]])
+        self.assertEqual(b"p cnf 8 4\n1 -2 0\n 0\n-4 5 6 0\n-8 0\n", stream.getvalue())
+
+    def test_store_keeps_clauses_in_buffer(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+        for theory_name in ["3D", "4D", "acyclic"]:
+            board = select_theory(instance_path, theory_name, save=False)
+            self.assertIsInstance(board.clauses.target, ClauseBuffer)
+            self.assertEqual(len(board.clauses.target.literals),
+                             sum(len(clause) for clause in board.clauses))
+
+            store = ClauseStore(target=[])
+            store.extend(board.clauses)
+            self.assertEqual(list(store), list(board.clauses))
+
+
+class TestCnfFormats(unittest.TestCase):
+    """
+    Test class for the gzip-compressed and binary CNF files.
+    """
+
+    def test_fixtures_round_trip(self):
+
+        fixtures = os.path.join(os.path.dirname(os.path.abspath(__file__)), "CNFS")
+        directory = tempfile.mkdtemp()
+        try:
+            for name in sorted(os.listdir(fixtures))[:6]:
+                reader = DimacsReader(os.path.join(fixtures, name))
+                clauses = list(reader)
+
+                buffer = ClauseBuffer(reader)
+                buffer.save_binary(os.path.join(directory, "fixture.cnfb"), reader.num_variables)
+                loaded = ClauseBuffer.load_binary(os.path.join(directory, "fixture.cnfb"))
+                self.assertIsInstance(loaded.literals, np.memmap)
+                self.assertEqual(reader.num_variables, loaded.num_variables)
+                self.assertEqual(clauses, list(loaded))
+
+                writer = DimacsWriter(os.path.join(directory, "fixture.cnf.gz"))
+                writer.extend(loaded)
+                writer.close(reader.num_variables)
+                self.assertEqual(clauses, list(DimacsReader(os.path.join(directory, "fixture.cnf.gz"))))
+
+            # a loaded buffer is copied to memory before it is modified
+            loaded.append([1, 2])
+            self.assertEqual(clauses + [[1, 2]], list(loaded))
+
+            with open(os.path.join(directory, "fixture.cnf.gz"), "rb") as file:
+                self.assertEqual(b"\x1f\x8b", file.read(2))
+            with self.assertRaises(ValueError):
+                ClauseBuffer.load_binary(os.path.join(directory, "fixture.cnf.gz"))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_solve_formats(self):
+
+        for instance in ["instance_1", "instance_4", "instance_5"]:
+            instance_path = f"/root/glucose2/glucose/Numberlink/instances/{instance}.txt"
+            board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, "4D")
+            for cnf_format in ["gzip", "binary"]:
+                for options in [{}, {"solver": "pysat"}]:
+                    format_board, format_result, format_model, format_output = run_sat(
+                        glucose_path, instance_path, "4D", cnf_format=cnf_format, **options)
+                    self.assertEqual(instance_result, format_result)
+                    self.assertTrue(format_board.get_cnf_filename(instance_path).endswith(CNF_EXTENSIONS[cnf_format]))
+                    if instance_result == 1:
+                        self.assertEqual(board.direction_board_list, format_board.direction_board_list)
+
+        with self.assertRaises(ValueError):
+            select_theory(instance_path, "3D", stream=True, cnf_format="binary")
+
+    def test_cached_binary_is_memory_mapped(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+        directory = tempfile.mkdtemp()
+        try:
+            cache = CnfCache(directory)
+            board = select_theory(instance_path, "3D", cache=cache, cnf_format="binary")
+            cached_board = select_theory(instance_path, "3D", cache=cache, cnf_format="binary")
+            self.assertEqual(1, cache.hits)
+            self.assertEqual(1, cache.statistics["entries"])
+            self.assertIsInstance(cached_board.clauses.target.literals, np.memmap)
+            self.assertEqual(list(board.clauses), list(cached_board.clauses))
+            self.assertEqual(len(board.variables), len(cached_board.variables))
+        finally:
+            shutil.rmtree(directory)
+
+
+class TestCycleDetect(unittest.TestCase):
+    """
+    Test class for the detection of detached cycles.
+    """
+
+    def assert_detached_cycles(self, board, cycles):
+        paths, signs, endpoints = solution_grids(board)
+        cells = [tuple(cell[:2]) for cycle in cycles for cell in cycle.tolist()]
+        self.assertEqual(len(cells), len(set(cells)))
+        for cycle in cycles:
+            self.assertEqual((len(cycle), 4), cycle.shape)
+            self.assertEqual(1, len(set(cycle[:, 2].tolist())))
+            self.assertFalse(endpoints[cycle[:, 0], cycle[:, 1]].any())
+            self.assertTrue((signs[cycle[:, 0], cycle[:, 1]] == cycle[:, 3]).all())
+            # every cell of the cycle continues to two other cells of the cycle
+            members = set(map(tuple, cycle[:, :2].tolist()))
+            for i, j, p, d in cycle.tolist():
+                following = {(i + di, j + dj) for di, dj in SIGN_OPENINGS[d]}
+                self.assertTrue(following <= members)
+
+    def test_instance_9_4D_cycle(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_9.txt"
+        board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, "4D", cycle_breaker=False)
+        cycles = cycle_detect(board)
+
+        self.assertEqual(1, len(cycles))
+        self.assertEqual(4, len(cycles[0]))
+        self.assert_detached_cycles(board, cycles)
+
+        # one clause for every path, it must not occupy all cells of the cycle with the same signs again
+        clauses = list(board.iter_cycle_clauses(cycles))
+        self.assertEqual(board.number_of_paths, len(clauses))
+        self.assertEqual([4] * board.number_of_paths, [len(set(clause)) for clause in clauses])
+
+        board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, "4D")
+        self.assertEqual(1, instance_result)
+        self.assertEqual([], cycle_detect(board))
+
+    def test_long_cycle(self):
+
+        # path 2 forms a detached cycle of 8 cells between the paths 1 and 3
+        signs = [[0, 2, 2, 0], [6, 2, 2, 5], [4, 2, 2, 3], [0, 2, 2, 0]]
+        paths = [[1] * 4, [2] * 4, [2] * 4, [3] * 4]
+        true_variables = [(i, j, paths[i][j], signs[i][j]) for i in range(4) for j in range(4)]
+        board = types.SimpleNamespace(height=4, width=4, number_of_paths=3, theory="4D",
+                                      board=[["1", ".", ".", "1"], ["."] * 4, ["."] * 4, ["3", ".", ".", "3"]],
+                                      start_end_points={1: [(0, 0), (0, 3)], 3: [(3, 0), (3, 3)]})
+        board.solution = Solution(board, true_variables)
+        cycles = cycle_detect(board)
+
+        self.assertEqual(1, len(cycles))
+        self.assertEqual(8, len(cycles[0]))
+        self.assertEqual({2}, set(cycles[0][:, 2].tolist()))
+        self.assert_detached_cycles(board, cycles)
+        self.assertEqual(8, len(board.solution.paths[2]))
+
+        # the same shape attached to the endpoints of its path is not a cycle
+        true_variables[4], true_variables[8] = (1, 0, 2, 0), (2, 0, 2, 0)
+        board.start_end_points[2] = [(1, 0), (2, 0)]
+        board.solution = Solution(board, true_variables)
+        self.assertEqual([], cycle_detect(board))
+        self.assertEqual([(1, 0), (1, 1), (1, 2), (1, 3), (2, 3), (2, 2), (2, 1), (2, 0)], board.solution.paths[2])
+
+
+class TestDecoder(unittest.TestCase):
+    """
+    Test class for the decoding of the models.
+    """
+
+    def test_ordered_paths(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+        for theory_name in ["3D", "4D"]:
+            with self.subTest(theory=theory_name):
+                board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, theory_name)
+
+                self.assertEqual(1, instance_result)
+                for p, (start, end) in board.start_end_points.items():
+                    path = board.paths[p]
+                    self.assertEqual((start, end), (path[0], path[-1]))
+                    for (i1, j1), (i2, j2) in zip(path, path[1:]):
+                        self.assertEqual(1, abs(i1 - i2) + abs(j1 - j2))
+                self.assertEqual(board.height * board.width, sum(len(path) for path in board.paths.values()))
+
+    def test_lazy_views(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+        board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, "4D")
+
+        # nothing is rendered until the boards are used
+        self.assertNotIn("direction_board_list", vars(board.solution))
+        self.assertNotIn("numbered_board", vars(board.solution))
+
+        rows = board.direction_board_list
+        self.assertEqual("".join("".join(row) + "\n" for row in rows), board.direction_board_string)
+        for i, row in enumerate(board.numbered_board):
+            for j, path in enumerate(row):
+                self.assertEqual(path, board.solution.paths_grid[i, j])
+                self.assertEqual(str(path) if (i, j) in board.start_end_points_locs else "", rows[i][j].strip("│─┘└┐┌"))
+
+        board.direction_board_list = []
+        self.assertEqual([], board.direction_board_list)
+        board.clear_solution()
+        self.assertEqual(({}, ""), (board.paths, board.direction_board_string))
+
+
+class TestEnumeration(unittest.TestCase):
+    """
+    Test class for the enumeration of solutions and the uniqueness check.
+    """
+
+    def test_all_solutions(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_2.txt"
+        for theory_name, solver in [("3D+4D", "pysat"), ("4D", "pysat"), ("acyclic", "pysat"), ("3D+4D", "glucose")]:
+            with self.subTest(theory=theory_name, solver=solver):
+                solutions, instance_result = enumerate_solutions(glucose_path, instance_path, theory_name,
+                                                                 limit=None, solver=solver)
+
+                self.assertEqual(Status.UNSAT, instance_result)
+                self.assertEqual(2, len(solutions))
+                self.assertEqual(2, len({solution.direction_board_string for solution in solutions}))
+                for solution in solutions:
+                    self.assertEqual([], solution.cycles)
+
+    def test_limit(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_13.txt"
+        solutions, instance_result = enumerate_solutions(glucose_path, instance_path, "4D", limit=3)
+        self.assertEqual((3, Status.SAT), (len(solutions), instance_result))
+
+        solutions, instance_result = enumerate_solutions(glucose_path, instance_path, "4D", limit=None)
+        self.assertEqual((6, Status.UNSAT), (len(solutions), instance_result))
+
+    def test_is_unique(self):
+
+        instances = "/root/glucose2/glucose/Numberlink/instances/"
+        self.assertTrue(is_unique(glucose_path, instances + "instance_1.txt"))
+        self.assertTrue(is_unique(glucose_path, instances + "instance_5.txt", forced_moves=True))
+        self.assertFalse(is_unique(glucose_path, instances + "instance_9.txt"))
+        # no solution
+        self.assertFalse(is_unique(glucose_path, instances + "instance_4.txt"))
+
+    def test_solution_clauses(self):
+
+        instance_path = "/root/glucose2/glucose/Numberlink/instances/instance_1.txt"
+        for theory_name in ["3D", "4D"]:
+            with self.subTest(theory=theory_name):
+                board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, theory_name)
+                assignment = board.solution.assignment
+                clause, = board.iter_solution_clauses([assignment])
+
+                # one literal for every cell which is not a starting or ending point, false in the found model
+                self.assertEqual(board.height * board.width - len(board.start_end_points_locs), len(clause))
+                true_variables = set(board.variables[variable] for variable in board.true_clauses)
+                self.assertTrue(all(-literal in true_variables for literal in clause))
+
+
+class TestGenerator(unittest.TestCase):
+    """
+    Test class for the generator of random instances.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_hamiltonian_path(self):
+
+        height, width = 7, 9
+        path = hamiltonian_path(height, width, np.random.default_rng(1))
+
+        self.assertEqual(list(range(height * width)), sorted(path.tolist()))
+        i, j = np.divmod(path, width)
+        self.assertTrue((np.abs(np.diff(i)) + np.abs(np.diff(j)) == 1).all())
+        # the serpentine starting path is changed
+        self.assertFalse((path == hamiltonian_path(height, width, np.random.default_rng(1), moves=0)).all())
+
+    def test_random_instance(self):
+
+        board, solution = random_instance(8, 11, 9, seed=3)
+        same_board, same_solution = random_instance(8, 11, 9, seed=3)
+        self.assertEqual(board, same_board)
+        self.assertEqual(solution.tolist(), same_solution.tolist())
+        self.assertEqual((8, 11), solution.shape)
+
+        instance_path = os.path.join(self.directory, "random.txt")
+        write_instance(instance_path, board, solution)
+        numberlink_board = NumberlinkBoard(instance_path)
+        self.assertEqual(9, numberlink_board.number_of_paths)
+        for p, points in numberlink_board.start_end_points.items():
+            self.assertGreaterEqual((solution == p).sum(), MIN_PATH_LENGTH)
+            self.assertEqual([p, p], [solution[i, j] for i, j in points])
+
+        board, instance_result, model, sat_output = run_sat(glucose_path, instance_path, "4D", solver="pysat")
+        self.assertEqual(1, instance_result)
+
+        with self.assertRaises(ValueError):
+            random_instance(3, 3, 4)
+
+    def test_corpus(self):
+
+        instance_paths = generate_corpus(self.directory, [(5, 5), (6, 8)], [3], count=2, seed=7, workers=2)
+
+        self.assertEqual(4, len(instance_paths))
+        self.assertEqual(instance_paths, find_instances(self.directory))
+        contents = [open(path, encoding="utf-8").read() for path in instance_paths]
+        solutions = [open(path[:-4] + ".sol", encoding="utf-8").read() for path in instance_paths]
+
+        # the corpus does not depend on the number of workers
+        generate_corpus(self.directory, [(5, 5), (6, 8)], [3], count=2, seed=7, workers=1)
+        self.assertEqual(contents, [open(path, encoding="utf-8").read() for path in instance_paths])
+        self.assertEqual(solutions, [open(path[:-4] + ".sol", encoding="utf-8").read() for path in instance_paths])
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)
@@ -0,0 +1,113 @@
+import contextlib
+import json
+import os
+import time
+import tracemalloc
+
+
+class Tracer:
+    """
+    Event log of the phases of run_sat. Every phase records its wall time, CPU time and optionally the peak
+    of the memory traced by tracemalloc, together with the iteration of the cycle breaker and the theory.
+    Phases can be nested, e.g. "clauses" inside "generate", the peak memory of a phase includes its nested phases.
+    """
+
+    def __init__(self, memory: bool = False, callbacks: list = None):
+        """
+        :param memory: whether to trace the memory with tracemalloc, slows the run down considerably
+        :param callbacks: functions called with every finished event
+        """
+        self.memory = memory
+        self.callbacks = list(callbacks or [])
+        self.events = []
+        # current iteration of the cycle breaker and the theory, recorded in the events
+        self.iteration = 0
+        self.theory = None
+        self._origin = time.perf_counter()
+        self._stack = []
+        self._started_tracemalloc = False
+
+    @contextlib.contextmanager
+    def phase(self, name: str, **args):
+        """
+        Measures the block as one event.
+        :param name: name of the phase
+        :param args: additional values stored in the event
+        """
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+        entry = {"peak": 0}
+        if self.memory:
+            # the peak is reset for the nested phase, the parent keeps the peak reached so far
+            if self._stack:
+                self._stack[-1]["peak"] = max(self._stack[-1]["peak"], tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self._stack.append(entry)
+
+        start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start
+            cpu = time.process_time() - cpu_start
+            self._stack.pop()
+
+            peak = None
+            if self.memory:
+                peak = max(entry["peak"], tracemalloc.get_traced_memory()[1])
+                if self._stack:
+                    self._stack[-1]["peak"] = max(self._stack[-1]["peak"], peak)
+
+            event = {"name": name, "iteration": self.iteration, "theory": self.theory,
+                     "start": start - self._origin, "wall": wall, "cpu": cpu, "peak_memory": peak,
+                     "depth": len(self._stack)}
+            event.update(args)
+            self.events.append(event)
+            for callback in self.callbacks:
+                callback(event)
+
+    def totals(self, names: list = None) -> dict:
+        """
+        :param names: phases to sum, all phases by default, missing phases are 0
+        :return: dictionary phase -> total wall time in seconds
+        """
+        totals = dict.fromkeys(names or [], 0.0)
+        for event in self.events:
+            if names is None or event["name"] in totals:
+                totals[event["name"]] = totals.get(event["name"], 0.0) + event["wall"]
+        return totals
+
+    def close(self):
+        """
+        Stops tracemalloc if it was started by the tracer.
+        :return:
+        """
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def to_json(self, path: str):
+        """
+        Saves the events as JSON list.
+        :param path: path to the .json file
+        :return:
+        """
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.events, file, indent=2)
+
+    def to_chrome_trace(self, path: str):
+        """
+        Saves the events in the Chrome trace event format, which can be opened in chrome://tracing or Perfetto.
+        :param path: path to the .json file
+        :return:
+        """
+        trace_events = []
+        for event in self.events:
+            args = {key: value for key, value in event.items() if key not in ("name", "start", "wall")}
+            trace_events.append({"name": event["name"], "cat": "numberlink", "ph": "X", "pid": os.getpid(), "tid": 0,
+                                 "ts": event["start"] * 1e6, "dur": event["wall"] * 1e6, "args": args})
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms"}, file)
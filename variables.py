@@ -0,0 +1,240 @@
+import numpy as np
+
+
+class VariableLayout:
+    """
+    Numbering of the (i, j, p, d) variables of one theory.
+    Variables are numbered from 1 in the order i, j, p, d by closed-form index arithmetic,
+    so encoding a tuple and decoding a variable are both constant-time.
+    Auxiliary variables of the encodings are allocated after the (i, j, p, d) variables.
+    """
+
+    # variable which is always false, used by PrunedLayout for the infeasible combinations
+    false_variable = None
+
+    def __init__(self, height: int, width: int, number_of_paths: int):
+        self.height = height
+        self.width = width
+        self.number_of_paths = number_of_paths
+        self.base_count = 0
+        self.count = 0
+
+    def __getitem__(self, key: tuple) -> int:
+        return self.encode(*key)
+
+    def __contains__(self, key: tuple) -> bool:
+        try:
+            self.encode(*key)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self) -> int:
+        return self.count
+
+    def new_variables(self, n: int) -> int:
+        """
+        Allocates n auxiliary variables.
+        :param n:
+        :return: first allocated variable, the others follow consecutively
+        """
+        first = self.count + 1
+        self.count += n
+        return first
+
+    def encode(self, i: int, j: int, p: int, d: int) -> int:
+        """
+        Returns variable of the (i, j, p, d) tuple.
+        :raises KeyError: if the tuple has no variable
+        """
+        raise NotImplementedError
+
+    def encode_array(self, i, j, p, d) -> np.ndarray:
+        """
+        Encodes arrays of valid (i, j, p, d) tuples at once, the arrays are broadcast against each other.
+        :return: array of variables
+        """
+        raise NotImplementedError
+
+    def decode_array(self, variables: np.ndarray) -> tuple:
+        """
+        Decodes array of variables to arrays of i, j, p, d.
+        :param variables: array of variables from 1 to base_count
+        :return: (i, j, p, d) arrays
+        """
+        raise NotImplementedError
+
+    def decode(self, variable: int) -> tuple:
+        """
+        Returns (i, j, p, d) tuple of the variable.
+        :param variable: variable from 1 to base_count
+        :return: (i, j, p, d)
+        """
+        if not 0 < variable <= self.base_count:
+            raise KeyError(variable)
+        i, j, p, d = self.decode_array(np.array([variable]))
+        return int(i[0]), int(j[0]), int(p[0]), int(d[0])
+
+    def decode_model(self, literals) -> list:
+        """
+        Decodes all positive literals of the model in a single pass.
+        :param literals: iterable or array of literals, negative literals, 0 and auxiliary variables are skipped
+        :return: list of (i, j, p, d) tuples in the order of the literals
+        """
+        literals = np.asarray(literals, dtype=np.int64)
+        positive = literals[(literals > 0) & (literals <= self.base_count)]
+        i, j, p, d = self.decode_array(positive)
+        return list(zip(i.tolist(), j.tolist(), p.tolist(), d.tolist()))
+
+    def cell_variables(self, i: int, j: int) -> list:
+        """
+        Returns all variables of the cell i, j.
+        :return: list of ((i, j, p, d), variable) ordered by variable
+        """
+        raise NotImplementedError
+
+
+class VariableLayout3D(VariableLayout):
+    """
+    Layout for 3D theory - one variable (i, j, p, 0) for every cell and path.
+    """
+
+    def __init__(self, height: int, width: int, number_of_paths: int):
+        super().__init__(height, width, number_of_paths)
+        self.base_count = self.count = height * width * number_of_paths
+
+    def encode(self, i: int, j: int, p: int, d: int) -> int:
+        if d != 0 or not (0 <= i < self.height and 0 <= j < self.width and 0 < p <= self.number_of_paths):
+            raise KeyError((i, j, p, d))
+        return (i * self.width + j) * self.number_of_paths + p
+
+    def encode_array(self, i, j, p, d) -> np.ndarray:
+        return (np.asarray(i, dtype=np.int64) * self.width + j) * self.number_of_paths + p
+
+    def decode_array(self, variables: np.ndarray) -> tuple:
+        index = variables - 1
+        cell, p = np.divmod(index, self.number_of_paths)
+        i, j = np.divmod(cell, self.width)
+        return i, j, p + 1, np.zeros_like(p)
+
+    def cell_variables(self, i: int, j: int) -> list:
+        first = self.encode(i, j, 1, 0)
+        return [((i, j, p, 0), first + p - 1) for p in range(1, self.number_of_paths + 1)]
+
+
+class VariableLayout4D(VariableLayout):
+    """
+    Layout for 4D theory - six direction variables (i, j, p, 1..6) for every cell and path,
+    except a single variable (i, j, p, 0) for the starting and ending points of the path p.
+    """
+
+    def __init__(self, height: int, width: int, number_of_paths: int, start_end_points: dict):
+        super().__init__(height, width, number_of_paths)
+
+        # path of the starting or ending point in the cell, 0 for other cells
+        endpoint_path = np.zeros(height * width, dtype=np.int64)
+        for p, points in start_end_points.items():
+            for i, j in points:
+                endpoint_path[i * width + j] = p
+
+        sizes = np.where(endpoint_path == 0, 6 * number_of_paths, 6 * number_of_paths - 5)
+        cell_offset = np.zeros(height * width + 1, dtype=np.int64)
+        np.cumsum(sizes, out=cell_offset[1:])
+
+        self.endpoint_path = endpoint_path
+        self.cell_offset = cell_offset
+        self.cell_of_variable = np.repeat(np.arange(height * width, dtype=np.int32), sizes)
+        self.base_count = self.count = int(cell_offset[-1])
+
+        # plain lists are faster than numpy scalars for single lookups
+        self._endpoint_path = endpoint_path.tolist()
+        self._cell_offset = cell_offset.tolist()
+
+    def encode(self, i: int, j: int, p: int, d: int) -> int:
+        if not (0 <= i < self.height and 0 <= j < self.width and 0 < p <= self.number_of_paths):
+            raise KeyError((i, j, p, d))
+        cell = i * self.width + j
+        endpoint_path = self._endpoint_path[cell]
+        if p == endpoint_path:
+            if d != 0:
+                raise KeyError((i, j, p, d))
+            return self._cell_offset[cell] + (p - 1) * 6 + 1
+        if not 0 < d < 7:
+            raise KeyError((i, j, p, d))
+        local = (p - 1) * 6 + d - 1
+        if endpoint_path and p > endpoint_path:
+            local -= 5
+        return self._cell_offset[cell] + local + 1
+
+    def encode_array(self, i, j, p, d) -> np.ndarray:
+        cell = np.asarray(i, dtype=np.int64) * self.width + j
+        endpoint_path = self.endpoint_path[cell]
+        local = (np.asarray(p, dtype=np.int64) - 1) * 6 + d - 1
+        local = np.where((endpoint_path > 0) & (p > endpoint_path), local - 5, local)
+        local = np.where(p == endpoint_path, (np.asarray(p, dtype=np.int64) - 1) * 6, local)
+        return self.cell_offset[cell] + local + 1
+
+    def decode_array(self, variables: np.ndarray) -> tuple:
+        index = variables - 1
+        cell = self.cell_of_variable[index]
+        local = index - self.cell_offset[cell]
+        endpoint_path = self.endpoint_path[cell]
+
+        # cells after the single endpoint variable are shifted by the 5 missing directions
+        endpoint_local = (endpoint_path - 1) * 6
+        is_endpoint = (endpoint_path > 0) & (local == endpoint_local)
+        local = np.where((endpoint_path > 0) & (local > endpoint_local), local + 5, local)
+
+        p, d = np.divmod(local, 6)
+        p = np.where(is_endpoint, endpoint_path, p + 1)
+        d = np.where(is_endpoint, 0, d + 1)
+        i, j = np.divmod(cell.astype(np.int64), self.width)
+        return i, j, p, d
+
+    def cell_variables(self, i: int, j: int) -> list:
+        cell = i * self.width + j
+        first = self._cell_offset[cell] + 1
+        last = self._cell_offset[cell + 1]
+        return list(zip(self.decode_model(np.arange(first, last + 1)), range(first, last + 1)))
+
+
+class PrunedLayout(VariableLayout):
+    """
+    Layout restricted to the feasible (cell, path) combinations, see domains.path_domains.
+    Variables of the feasible combinations of the underlying layout are numbered densely in the same order,
+    all other combinations are encoded as false_variable, which the ClauseStore removes from the clauses.
+    """
+
+    def __init__(self, layout: VariableLayout, feasible: np.ndarray):
+        """
+        :param layout: layout of the theory without auxiliary variables
+        :param feasible: boolean array [height, width, number_of_paths + 1]
+        """
+        super().__init__(layout.height, layout.width, layout.number_of_paths)
+        self.layout = layout
+
+        variables = np.arange(1, layout.base_count + 1, dtype=np.int64)
+        i, j, p, d = layout.decode_array(variables)
+        self.old_variables = variables[feasible[i, j, p]]
+        self.false_variable = len(self.old_variables) + 1
+        # variable of the underlying layout -> new variable or false_variable
+        self.new_numbering = np.full(layout.base_count + 1, self.false_variable, dtype=np.int64)
+        self.new_numbering[self.old_variables] = np.arange(1, len(self.old_variables) + 1)
+
+        # plain list is faster than numpy scalars for single lookups
+        self._new_variables = self.new_numbering.tolist()
+        self.base_count = len(self.old_variables)
+        self.count = self.false_variable
+
+    def encode(self, i: int, j: int, p: int, d: int) -> int:
+        return self._new_variables[self.layout.encode(i, j, p, d)]
+
+    def encode_array(self, i, j, p, d) -> np.ndarray:
+        return self.new_numbering[self.layout.encode_array(i, j, p, d)]
+
+    def decode_array(self, variables: np.ndarray) -> tuple:
+        return self.layout.decode_array(self.old_variables[variables - 1])
+
+    def cell_variables(self, i: int, j: int) -> list:
+        return [(key, self._new_variables[variable]) for key, variable in self.layout.cell_variables(i, j)
+                if self._new_variables[variable] != self.false_variable]
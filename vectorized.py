@@ -0,0 +1,136 @@
+import itertools
+
+import numpy as np
+
+# Offsets of the neighbours in the order of NumberlinkBoard.get_neighbors.
+NEIGHBOR_OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+
+# Offsets of the two neighbours every 4D sign is connected to, 1 = │, 2 = ─, 3 = ┘, 4 = └, 5 = ┐, 6 = ┌.
+SIGN_OPENINGS = {1: [(-1, 0), (1, 0)], 2: [(0, -1), (0, 1)], 3: [(-1, 0), (0, -1)],
+                 4: [(-1, 0), (0, 1)], 5: [(1, 0), (0, -1)], 6: [(1, 0), (0, 1)]}
+
+# Signs of the neighbour in the direction of the offset which continue the connection, as get_not_se_points_neighbours.
+CONTINUATIONS = {(-1, 0): [1, 5, 6], (1, 0): [1, 3, 4], (0, -1): [2, 4, 6], (0, 1): [2, 3, 5]}
+
+# Approximate number of clauses in one array of pairwise at-most-one clauses, bounds the memory of a single array.
+CHUNK_SIZE = 1 << 20
+
+
+def _negated_pairs(literals: np.ndarray):
+    """
+    Pairwise at-most-one constraint for every row of literals.
+    :param literals: array [number of constraints, number of literals]
+    :return: generator of arrays [number of clauses, 2]
+    """
+    first, second = np.triu_indices(literals.shape[1], 1)
+    rows = max(1, CHUNK_SIZE // max(1, len(first)))
+    for start in range(0, len(literals), rows):
+        chunk = literals[start:start + rows]
+        yield np.stack([-chunk[:, first], -chunk[:, second]], axis=2).reshape(-1, 2)
+
+
+def _endpoint_mask(board) -> np.ndarray:
+    """
+    :return: array [height, width] with the path of the starting or ending point in the cell, 0 for other cells
+    """
+    endpoints = np.zeros((board.height, board.width), dtype=np.int64)
+    for p, points in board.start_end_points.items():
+        for i, j in points:
+            endpoints[i, j] = p
+    return endpoints
+
+
+def clause_arrays_3D(board):
+    """
+    Yields the clauses of the rules 2 and 3 of NumberlinkBoard.iter_clauses_3D as integer arrays,
+    every rule is built for all cells and paths at once. The pairwise encoding is used.
+    :param board: NumberlinkBoard with the 3D variables
+    :return: generator of arrays [number of clauses, literals]
+    """
+    variables = board.variables
+    endpoints = _endpoint_mask(board)
+    paths = np.arange(1, board.number_of_paths + 1)
+    cells = np.argwhere(endpoints == 0)
+    i, j = cells[:, :1], cells[:, 1:]
+    current = variables.encode_array(i, j, paths, 0)
+
+    # 2. Every cell which is not start or end point has exactly one path.
+    yield current
+    yield from _negated_pairs(current)
+
+    # 3. Points which are not start or end points have exactly two neighbors with same path.
+    # Cells are grouped by the neighbours they have - inner cells, sides and corners.
+    inside = np.stack([(i + di >= 0) & (i + di < board.height) & (j + dj >= 0) & (j + dj < board.width)
+                       for di, dj in NEIGHBOR_OFFSETS], axis=1)[:, :, 0]
+    for pattern in np.unique(inside, axis=0):
+        selected = (inside == pattern).all(axis=1)
+        condition = -current[selected]
+        neighbors = [variables.encode_array(i[selected] + di, j[selected] + dj, paths, 0)
+                     for (di, dj), present in zip(NEIGHBOR_OFFSETS, pattern) if present]
+        n = len(neighbors)
+
+        # At least 2 neighbors are true - every n - 1 neighbors contain a true one.
+        if n < 2:
+            yield condition.reshape(-1, 1)
+        else:
+            for subset in itertools.combinations(neighbors, n - 1):
+                yield np.stack([condition, *subset], axis=2).reshape(-1, n)
+
+        # At most 2 neighbors are true - every 3 neighbors contain a false one.
+        for subset in itertools.combinations(neighbors, 3):
+            yield np.stack([condition] + [-neighbor for neighbor in subset], axis=2).reshape(-1, 4)
+
+        if n == 4:
+            yield np.stack([condition] + [-neighbor for neighbor in neighbors], axis=2).reshape(-1, 5)
+
+
+def clause_arrays_4D(board):
+    """
+    Yields the clauses of the rules 2 and 4 of NumberlinkBoard.iter_clauses_4D as integer arrays,
+    every rule is built for all cells, paths and signs at once. The pairwise encoding is used.
+    :param board: NumberlinkBoard with the 4D variables
+    :return: generator of arrays [number of clauses, literals]
+    """
+    variables = board.variables
+    endpoints = _endpoint_mask(board)
+    paths = np.arange(1, board.number_of_paths + 1)
+    cells = np.argwhere(endpoints == 0)
+    i, j = cells[:, :1], cells[:, 1:]
+    current = variables.encode_array(i[:, :, None], j[:, :, None], paths[:, None], np.arange(1, 7))
+
+    # 4. Every non-starting and non-ending point has exactly two neighbors with the same path and possible direction.
+    # The unit clauses of the impossible signs go first, so that the clause store drops the clauses they subsume.
+    signs = []
+    for d, openings in SIGN_OPENINGS.items():
+        condition = -current[:, :, d - 1]
+        neighbors = []
+        impossible = np.zeros(condition.shape, dtype=bool)
+        for di, dj in openings:
+            i1, j1 = i + di, j + dj
+            inside = (i1 >= 0) & (i1 < board.height) & (j1 >= 0) & (j1 < board.width)
+            path = np.where(inside, endpoints[np.clip(i1, 0, board.height - 1), np.clip(j1, 0, board.width - 1)], -1)
+            # outside of the board or the starting or ending point of another path
+            impossible |= (path == -1) | ((path > 0) & (path != paths))
+            neighbors.append((i1[:, 0], j1[:, 0], path, CONTINUATIONS[(di, dj)]))
+
+        yield condition[impossible].reshape(-1, 1)
+        signs.append((condition, impossible, neighbors))
+
+    # 2. Every cell has exactly one path and direction.
+    literals = current.reshape(len(cells), -1)
+    yield literals
+    yield from _negated_pairs(literals)
+
+    for condition, impossible, neighbors in signs:
+        for i1, j1, path, continuations in neighbors:
+            # the starting or ending point of the same path has a single variable
+            rows, columns = np.nonzero(~impossible & (path == paths))
+            yield np.column_stack([condition[rows, columns],
+                                   variables.encode_array(i1[rows], j1[rows], columns + 1, 0)])
+
+            # exactly one of the signs of the neighbour which continue the connection
+            rows, columns = np.nonzero(~impossible & (path == 0))
+            group = [variables.encode_array(i1[rows], j1[rows], columns + 1, d1) for d1 in continuations]
+            yield np.column_stack([condition[rows, columns], *group])
+            for first, second in itertools.combinations(group, 2):
+                yield np.column_stack([condition[rows, columns], -first, -second])